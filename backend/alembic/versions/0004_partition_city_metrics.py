@@ -0,0 +1,48 @@
+"""partition city_metrics by month
+
+Rebuilds city_metrics on Postgres as a RANGE-partitioned table with one
+partition per month and a default partition; the primary key becomes
+(id, timestamp). SQLite has no partitioning and keeps the plain table,
+with old months rotated into their own tables at startup instead.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:12:05.117402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    partitions.convert_to_partitioned(conn)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql' or not partitions.is_partitioned(conn):
+        return
+    op.execute('ALTER TABLE city_metrics RENAME TO city_metrics_partitioned')
+    op.execute('CREATE TABLE city_metrics (LIKE city_metrics_partitioned INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO city_metrics SELECT * FROM city_metrics_partitioned')
+    op.execute('ALTER SEQUENCE city_metrics_id_seq OWNED BY city_metrics.id')
+    op.execute('DROP TABLE city_metrics_partitioned CASCADE')
+    op.create_primary_key('city_metrics_pkey', 'city_metrics', ['id'])
+    op.create_index('ix_city_metrics_id', 'city_metrics', ['id'], unique=False)
+    op.create_index('ix_city_metrics_metric_type', 'city_metrics', ['metric_type'], unique=False)
+    op.create_index('ix_city_metrics_timestamp', 'city_metrics', ['timestamp'], unique=False)
+    op.create_index('ix_city_metrics_city_type_ts', 'city_metrics', ['city', 'metric_type', 'timestamp'], unique=False, postgresql_include=['value', 'unit'])
@@ -0,0 +1,138 @@
+"""dictionary-encode city, metric type and source
+
+Moves the repeated city, metric_type and source strings of city_metrics
+(and city / metric_type of metric_rollups) into the cities, metric_types
+and sources lookup tables, replacing them with small-integer *_id columns.
+On SQLite the month tables rotated out of city_metrics are converted too.
+Lookup tables and id columns that already exist, e.g. created by an
+earlier ``create_all``, are kept and filled in rather than recreated.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:40:12.602871
+
+"""
+from typing import List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DIMENSION_ID = sa.SmallInteger().with_variant(sa.Integer(), 'sqlite')
+
+# (dimension table, string column, id column, nullable)
+METRIC_DIMENSIONS = [
+    ('cities', 'city', 'city_id', False),
+    ('metric_types', 'metric_type', 'metric_type_id', False),
+    ('sources', 'source', 'source_id', True),
+]
+ROLLUP_DIMENSIONS = METRIC_DIMENSIONS[:2]
+
+
+def _month_tables() -> List[str]:
+    """SQLite month tables; Postgres partitions follow their parent"""
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        return []
+    names = sa.inspect(conn).get_table_names()
+    return sorted(name for name in names if partitions.partition_month(name) is not None)
+
+
+def _metric_tables(to_ids: bool):
+    """(table, dimensions, old indexes, new indexes) to convert, indexes as (name, columns, options)
+
+    Only tables that exist and still hold the columns being replaced are
+    listed: ``create_all`` may already have created some of them with
+    the new columns.
+    """
+    tables = [
+        ('city_metrics', METRIC_DIMENSIONS,
+         [('ix_city_metrics_metric_type', ['metric_type'], {}),
+          ('ix_city_metrics_city_type_ts', ['city', 'metric_type', 'timestamp'], {'postgresql_include': ['value', 'unit']})],
+         [('ix_city_metrics_metric_type_id', ['metric_type_id'], {}),
+          ('ix_city_metrics_city_type_ts', ['city_id', 'metric_type_id', 'timestamp'], {'postgresql_include': ['value', 'unit']})]),
+        ('metric_rollups', ROLLUP_DIMENSIONS,
+         [('ux_metric_rollups_bucket', ['city', 'metric_type', 'resolution', 'bucket_start', 'unit'], {'unique': True})],
+         [('ux_metric_rollups_bucket', ['city_id', 'metric_type_id', 'resolution', 'bucket_start', 'unit'], {'unique': True})]),
+    ]
+    for name in _month_tables():
+        tables.append((
+            name, METRIC_DIMENSIONS,
+            [(f'ix_{name}_city_type_ts', ['city', 'metric_type', 'timestamp'], {})],
+            [(f'ix_{name}_city_type_ts', ['city_id', 'metric_type_id', 'timestamp'], {})],
+        ))
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    column = 'city' if to_ids else 'city_id'
+    return [
+        entry for entry in tables
+        if entry[0] in existing and any(c['name'] == column for c in inspector.get_columns(entry[0]))
+    ]
+
+
+def _convert(table, dimensions, old_indexes, new_indexes, to_ids: bool):
+    """Swap the string columns of ``table`` for id columns, or back"""
+    for dimension, name_column, id_column, _ in dimensions:
+        old, new = (name_column, id_column) if to_ids else (id_column, name_column)
+        op.add_column(table, sa.Column(new, DIMENSION_ID if to_ids else sa.String(), nullable=True))
+        if to_ids:
+            lookup = f'SELECT id FROM {dimension} WHERE name = {table}.{old}'
+        else:
+            lookup = f'SELECT name FROM {dimension} WHERE id = {table}.{old}'
+        op.execute(f'UPDATE {table} SET {new} = ({lookup})')
+
+    for index_name, _, _ in old_indexes:
+        op.drop_index(index_name, table_name=table)
+    with op.batch_alter_table(table) as batch_op:
+        for _, name_column, id_column, nullable in dimensions:
+            old, new = (name_column, id_column) if to_ids else (id_column, name_column)
+            batch_op.drop_column(old)
+            if not nullable:
+                batch_op.alter_column(new, existing_type=DIMENSION_ID if to_ids else sa.String(), nullable=False)
+    for index_name, columns, options in new_indexes:
+        op.create_index(index_name, table, columns, **options)
+
+
+def upgrade() -> None:
+    tables = _metric_tables(to_ids=True)
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for dimension, name_column, _, _ in METRIC_DIMENSIONS:
+        if dimension not in existing:
+            op.create_table(dimension,
+            sa.Column('id', DIMENSION_ID, nullable=False),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+            )
+        names = ' UNION '.join(
+            f'SELECT {name_column} FROM {table}'
+            for table, dimensions, _, _ in tables
+            if any(column == name_column for _, column, _, _ in dimensions)
+        )
+        if not names:
+            continue
+        op.execute(
+            f'INSERT INTO {dimension} (name) SELECT DISTINCT {name_column} FROM ({names}) AS names '
+            f'WHERE {name_column} IS NOT NULL AND {name_column} NOT IN (SELECT name FROM {dimension}) '
+            f'ORDER BY {name_column}'
+        )
+
+    for table, dimensions, old_indexes, new_indexes in tables:
+        _convert(table, dimensions, old_indexes, new_indexes, to_ids=True)
+
+
+def downgrade() -> None:
+    for table, dimensions, old_indexes, new_indexes in _metric_tables(to_ids=False):
+        # Indexes swap roles: drop the id indexes, recreate the name ones
+        _convert(table, dimensions, new_indexes, old_indexes, to_ids=False)
+
+    for dimension, _, _, _ in reversed(METRIC_DIMENSIONS):
+        op.drop_table(dimension)
@@ -1,5 +1,6 @@
-from typing import Generator
-from app.db.base import SessionLocal
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.base import AsyncSessionLocal, SessionLocal
 
 def get_db() -> Generator:
     db = SessionLocal()
@@ -7,3 +8,7 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
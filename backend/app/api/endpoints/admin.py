@@ -0,0 +1,72 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.config import settings
+from app.db import pool
+from app.db.slow_queries import SLOW_QUERY_SORTS, slow_query_log
+from app.schemas.admin import (
+    JobStatus,
+    LiveStats,
+    PartitionInfo,
+    PartitionMaintenance,
+    PoolStats,
+    RecentStoreStats,
+    SlowQueryStats
+)
+from app.services import partitions
+from app.services.live import live_hub
+from app.services.recent_store import recent_store
+from app.services.scheduler import scheduler
+
+router = APIRouter()
+
+@router.get("/pool", response_model=List[PoolStats])
+def get_pool_stats():
+    """Get connection pool occupancy, checkout wait times and overflow/timeout counts"""
+    return pool.snapshot()
+
+@router.get("/live", response_model=LiveStats)
+def get_live_stats():
+    """Get live stream subscription counts and delivery totals"""
+    return live_hub.stats()
+
+@router.get("/recent", response_model=RecentStoreStats)
+def get_recent_store_stats():
+    """Get the size of the in-memory recent readings store"""
+    return recent_store.stats()
+
+@router.get("/partitions", response_model=List[PartitionInfo])
+def get_partitions(db: Session = Depends(deps.get_db)):
+    """Get the monthly partitions of city_metrics, oldest first"""
+    return partitions.list_partitions(db)
+
+@router.post("/partitions/maintain", response_model=PartitionMaintenance)
+def maintain_partitions(db: Session = Depends(deps.get_db)):
+    """Create upcoming partitions or rotate old months out, then apply retention"""
+    if not settings.METRICS_PARTITIONING:
+        raise HTTPException(status_code=409, detail="Partitioning is disabled; set METRICS_PARTITIONING to enable it")
+    return partitions.maintain(db)
+
+@router.get("/jobs", response_model=List[JobStatus])
+def get_jobs(db: Session = Depends(deps.get_db)):
+    """Get background job intervals, leases and last-run timings"""
+    return scheduler.status(db)
+
+@router.get("/slow-queries", response_model=List[SlowQueryStats])
+def get_slow_queries(
+    sort: str = Query("total", description="Rank by total, mean, p95 or max time, calls or slow_calls"),
+    limit: int = Query(20, ge=1, description="Number of fingerprints to return")
+):
+    """Get SQL statements grouped by fingerprint, with latency stats and the
+    plans captured for slow executions, most expensive first"""
+    if sort not in SLOW_QUERY_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort, expected one of {', '.join(SLOW_QUERY_SORTS)}")
+    return slow_query_log.report(sort, limit)
+
+@router.delete("/slow-queries")
+def reset_slow_queries():
+    """Forget the statement stats gathered so far, e.g. to measure a fix"""
+    slow_query_log.reset()
+    return {"message": "Slow query stats reset"}
@@ -0,0 +1,106 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from app.api import deps
+from app.schemas.metrics import AnalyticsSeriesResponse, PercentilesResponse
+from app.services import analytics, downsample
+
+router = APIRouter()
+
+def _load_series(db: Session, city: str, metric_type: str, time_range: str) -> analytics.MetricSeries:
+    window = downsample.parse_range(time_range)
+    if window is None:
+        raise HTTPException(status_code=400, detail="Invalid range")
+    return analytics.load_series(db, city, metric_type, datetime.now() - window)
+
+@router.get("/rolling", response_model=AnalyticsSeriesResponse)
+def get_rolling_mean(
+    db: Session = Depends(deps.get_db),
+    city: str = Query(..., description="City name"),
+    metric_type: str = Query(..., description="Metric type"),
+    time_range: str = Query("7d", alias="range", description="Window such as 1h, 24h, 7d, 30d"),
+    window: str = Query("1h", description="Trailing window such as 30min, 1h, 1D")
+):
+    """Get the rolling mean of a metric series"""
+    series = _load_series(db, city, metric_type, time_range)
+    try:
+        rolled = analytics.rolling_mean(series, window)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid rolling window")
+    
+    return {
+        "city": city,
+        "metric_type": metric_type,
+        "count": len(series),
+        "points": analytics.to_points(rolled.index, rolled.to_numpy())
+    }
+
+@router.get("/percentiles", response_model=PercentilesResponse)
+def get_percentiles(
+    db: Session = Depends(deps.get_db),
+    city: str = Query(..., description="City name"),
+    metric_type: str = Query(..., description="Metric type"),
+    time_range: str = Query("7d", alias="range", description="Window such as 1h, 24h, 7d, 30d"),
+    q: List[float] = Query([50, 90, 95, 99], description="Percentiles between 0 and 100")
+):
+    """Get percentiles of a metric series"""
+    if any(p < 0 or p > 100 for p in q):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    
+    series = _load_series(db, city, metric_type, time_range)
+    return {
+        "city": city,
+        "metric_type": metric_type,
+        "count": len(series),
+        "percentiles": analytics.percentiles(series, q)
+    }
+
+@router.get("/rate", response_model=AnalyticsSeriesResponse)
+def get_rate_of_change(
+    db: Session = Depends(deps.get_db),
+    city: str = Query(..., description="City name"),
+    metric_type: str = Query(..., description="Metric type"),
+    time_range: str = Query("7d", alias="range", description="Window such as 1h, 24h, 7d, 30d"),
+    per: str = Query("1h", description="Rate unit such as 1m, 1h, 1d")
+):
+    """Get the rate of change between consecutive readings"""
+    per_delta = downsample.parse_range(per)
+    if per_delta is None:
+        raise HTTPException(status_code=400, detail="Invalid rate unit")
+    
+    series = _load_series(db, city, metric_type, time_range)
+    timestamps, rates = analytics.rate_of_change(series, per_delta)
+    return {
+        "city": city,
+        "metric_type": metric_type,
+        "count": len(series),
+        "points": analytics.to_points(timestamps, rates)
+    }
+
+@router.get("/resample", response_model=AnalyticsSeriesResponse)
+def get_resampled(
+    db: Session = Depends(deps.get_db),
+    city: str = Query(..., description="City name"),
+    metric_type: str = Query(..., description="Metric type"),
+    time_range: str = Query("7d", alias="range", description="Window such as 1h, 24h, 7d, 30d"),
+    rule: str = Query("1h", description="Bin width such as 15min, 1h, 1D"),
+    how: str = Query("mean", description="Aggregation: mean, min, max, sum, count, median, first, last")
+):
+    """Get a metric series resampled onto a regular time grid"""
+    if how not in analytics.RESAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail="Invalid resample aggregation")
+    
+    series = _load_series(db, city, metric_type, time_range)
+    try:
+        resampled = analytics.resample(series, rule, how)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid resample rule")
+    
+    return {
+        "city": city,
+        "metric_type": metric_type,
+        "count": len(series),
+        "points": analytics.to_points(resampled.index, resampled.to_numpy())
+    }
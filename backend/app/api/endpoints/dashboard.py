@@ -1,83 +1,139 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.base import get_db
-from app.models.models import Dashboard, Widget
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from app.api import deps
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.models.models import Dashboard
 from app.schemas.dashboard import (
-    DashboardCreate, 
-    DashboardUpdate, 
+    DashboardCreate,
+    DashboardUpdate,
     DashboardResponse,
-    DashboardListResponse
+    DashboardListResponse,
+    DashboardSnapshot,
+    WidgetResponse
 )
+from app.services import snapshot
+from app.services.response_cache import dashboard_tag, response_cache
 
 router = APIRouter()
 
-@router.get("/", response_model=List[DashboardListResponse])
-def get_dashboards(
+def _dashboard_query(*options):
+    """Select dashboards with relationship loading spelled out.
+
+    ``raiseload`` turns any relationship not listed in ``options`` into an
+    error instead of a hidden query per dashboard during serialization
+    (async sessions cannot lazy-load at all).
+    """
+    return select(Dashboard).options(*options, raiseload("*"))
+
+async def _get_dashboard_or_404(db: AsyncSession, dashboard_id: int) -> Dashboard:
+    """Load a dashboard and its widgets in a single joined query"""
+    result = await db.execute(
+        _dashboard_query(joinedload(Dashboard.widgets))
+        .where(Dashboard.id == dashboard_id)
+        .execution_options(populate_existing=True)
+    )
+    dashboard = result.unique().scalars().first()
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return dashboard
+
+# Listings omit ``widgets`` unless include_widgets is set: handlers return
+# schema instances and unset fields are left out of the response
+@router.get("/", response_model=List[DashboardResponse], response_model_exclude_unset=True)
+async def get_dashboards(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    include_widgets: bool = Query(False, description="Embed each dashboard's widgets"),
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
-    """Get all dashboards"""
-    dashboards = db.query(Dashboard).offset(skip).limit(limit).all()
-    return dashboards
+    """Get all dashboards, ordered by id.
+
+    With ``include_widgets`` the widgets of the whole page are fetched in
+    one additional query, however many dashboards it holds.
+    """
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+
+    if include_widgets:
+        query, schema = _dashboard_query(selectinload(Dashboard.widgets)), DashboardResponse
+    else:
+        query, schema = _dashboard_query(), DashboardListResponse
+    if cursor:
+        (last_id,) = decode_cursor(cursor, 1)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(Dashboard.id > last_id)
+
+    result = await db.execute(query.order_by(Dashboard.id).offset(skip).limit(limit + 1))
+    dashboards = result.scalars().all()
+    if dashboards and len(dashboards) > limit:
+        dashboards = dashboards[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(dashboards[-1].id)
+    return [schema.model_validate(dashboard) for dashboard in dashboards]
 
 @router.get("/{dashboard_id}", response_model=DashboardResponse)
-def get_dashboard(dashboard_id: int, db: Session = Depends(get_db)):
+async def get_dashboard(dashboard_id: int, db: AsyncSession = Depends(deps.get_async_db)):
     """Get a specific dashboard by ID"""
-    dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
-    if not dashboard:
-        raise HTTPException(status_code=404, detail="Dashboard not found")
-    return dashboard
+    async def load():
+        return await _get_dashboard_or_404(db, dashboard_id)
+    return await response_cache.cached(
+        "dashboard", {"id": dashboard_id}, [dashboard_tag(dashboard_id)], load, DashboardResponse
+    )
+
+@router.get("/{dashboard_id}/snapshot", response_model=DashboardSnapshot)
+async def get_dashboard_snapshot(dashboard_id: int, db: AsyncSession = Depends(deps.get_async_db)):
+    """Get a dashboard's layout together with the data for all of its widgets.
+
+    Widgets that ask for the same series share one entry in ``series``.
+    """
+    dashboard = await _get_dashboard_or_404(db, dashboard_id)
+    return await db.run_sync(snapshot.build_snapshot, dashboard)
 
 @router.post("/", response_model=DashboardResponse)
-def create_dashboard(
+async def create_dashboard(
     dashboard: DashboardCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Create a new dashboard"""
     db_dashboard = Dashboard(**dashboard.dict())
     db.add(db_dashboard)
-    db.commit()
-    db.refresh(db_dashboard)
-    return db_dashboard
+    await db.commit()
+    return await _get_dashboard_or_404(db, db_dashboard.id)
 
 @router.put("/{dashboard_id}", response_model=DashboardResponse)
-def update_dashboard(
+async def update_dashboard(
     dashboard_id: int,
     dashboard: DashboardUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Update a dashboard"""
-    db_dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
-    if not db_dashboard:
-        raise HTTPException(status_code=404, detail="Dashboard not found")
-    
+    db_dashboard = await _get_dashboard_or_404(db, dashboard_id)
+
     update_data = dashboard.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_dashboard, field, value)
-    
-    db.commit()
-    db.refresh(db_dashboard)
-    return db_dashboard
+
+    await db.commit()
+    await response_cache.invalidate([dashboard_tag(dashboard_id)])
+    return await _get_dashboard_or_404(db, dashboard_id)
 
 @router.delete("/{dashboard_id}")
-def delete_dashboard(dashboard_id: int, db: Session = Depends(get_db)):
+async def delete_dashboard(dashboard_id: int, db: AsyncSession = Depends(deps.get_async_db)):
     """Delete a dashboard"""
-    db_dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
-    if not db_dashboard:
-        raise HTTPException(status_code=404, detail="Dashboard not found")
-    
-    db.delete(db_dashboard)
-    db.commit()
+    db_dashboard = await _get_dashboard_or_404(db, dashboard_id)
+
+    await db.delete(db_dashboard)
+    await db.commit()
+    await response_cache.invalidate([dashboard_tag(dashboard_id)])
     return {"message": "Dashboard deleted successfully"}
 
-@router.get("/{dashboard_id}/widgets")
-def get_dashboard_widgets(dashboard_id: int, db: Session = Depends(get_db)):
+@router.get("/{dashboard_id}/widgets", response_model=List[WidgetResponse])
+async def get_dashboard_widgets(dashboard_id: int, db: AsyncSession = Depends(deps.get_async_db)):
     """Get all widgets for a dashboard"""
-    dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
-    if not dashboard:
-        raise HTTPException(status_code=404, detail="Dashboard not found")
-    
-    widgets = db.query(Widget).filter(Widget.dashboard_id == dashboard_id).all()
-    return widgets
+    dashboard = await _get_dashboard_or_404(db, dashboard_id)
+    return dashboard.widgets
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from typing import List
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.live import Topic, live_hub, parse_topic
+
+router = APIRouter()
+
+TOPIC_DESCRIPTION = "city:metric_type, e.g. Seattle:temperature; use city:* for every metric of a city"
+
+def _parse_topics(topics: List[str]) -> List[Topic]:
+    parsed = [parse_topic(topic) if isinstance(topic, str) else None for topic in topics]
+    if None in parsed:
+        raise ValueError("Topics must look like city:metric_type")
+    return parsed
+
+@router.get("/sse")
+async def stream_events(topic: List[str] = Query(..., description=TOPIC_DESCRIPTION)):
+    """Stream new readings for the given topics as Server-Sent Events.
+
+    Each reading is sent as a ``metric`` event whose data is the reading in
+    the same shape as ``GET /metrics``; comment lines keep idle connections
+    open through proxies.
+    """
+    try:
+        topics = _parse_topics(topic)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    subscription = live_hub.subscribe(topics)
+
+    async def events():
+        try:
+            while True:
+                payloads = await subscription.get_batch(settings.LIVE_HEARTBEAT_SECONDS)
+                if not payloads:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(b"event: metric\ndata: " + payload + b"\n\n" for payload in payloads)
+        finally:
+            # Runs when the client disconnects and the response is cancelled
+            live_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def stream_websocket(websocket: WebSocket):
+    """Stream new readings over a WebSocket.
+
+    Clients send ``{"action": "subscribe" | "unsubscribe", "topics": [...]}``
+    at any time; each reading arrives as one JSON text message.
+    """
+    await websocket.accept()
+    subscription = live_hub.subscribe([])
+
+    async def receive():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if not isinstance(message, dict) or message.get("action") not in ("subscribe", "unsubscribe"):
+                    raise ValueError("Expected an object with action subscribe or unsubscribe")
+                if not isinstance(message.get("topics"), list):
+                    raise ValueError("Expected topics to be a list")
+                topics = _parse_topics(message["topics"])
+            except (TypeError, ValueError) as e:
+                # Replies go through the subscription so only send() writes
+                subscription.put(json.dumps({"error": str(e)}).encode())
+                continue
+            if message["action"] == "subscribe":
+                live_hub.add_topics(subscription, topics)
+            else:
+                live_hub.remove_topics(subscription, topics)
+
+    async def send():
+        while True:
+            for payload in await subscription.get_batch():
+                await websocket.send_text(payload.decode())
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exception = task.exception()
+            if exception is not None and not isinstance(exception, WebSocketDisconnect):
+                raise exception
+    finally:
+        for task in tasks:
+            task.cancel()
+        live_hub.unsubscribe(subscription)
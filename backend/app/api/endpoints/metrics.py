@@ -1,57 +1,153 @@
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
 from app.api import deps
-from app.models.models import CityMetric
-from app.schemas.metrics import MetricResponse, MetricCreate, MetricAggregate
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.api.streaming import STREAM_FORMATS, stream_metrics
+from app.core.config import settings
+from app.core.fast_json import FastJSONResponse
+from app.schemas.metrics import (
+    METRIC_FIELDS,
+    MetricResponse,
+    MetricCreate,
+    MetricAggregate,
+    BulkIngestResponse,
+    LatestCacheCheck,
+    SeriesInfo,
+    SeriesResponse
+)
+from app.services import archive, catalog, downsample, ingest, latest_cache, partitions, rollups
+from app.services.latest_cache import latest_values
+from app.services.response_cache import CATALOG_TAG, latest_tag, response_cache, series_tag
 
 router = APIRouter()
 
 @router.get("/", response_model=List[MetricResponse])
-def get_metrics(
-    db: Session = Depends(deps.get_db),
+async def get_metrics(
+    db: AsyncSession = Depends(deps.get_async_db),
     city: Optional[str] = Query(None, description="Filter by city name"),
     metric_type: Optional[str] = Query(None, description="Filter by metric type"),
     days: int = Query(7, description="Number of days to retrieve"),
     skip: int = 0,
-    limit: int = 100
+    limit: Optional[int] = Query(None, ge=1, description="Page size; 100 for json, unlimited when streaming"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    format: str = Query("json", description="json, or ndjson / csv to stream every matching row")
 ):
-    """Get city metrics with optional filters"""
-    query = db.query(CityMetric)
+    """Get city metrics with optional filters.
+
+    Results are ordered newest first with ``id`` as a tie-break. Pass the
+    ``X-Next-Cursor`` response header back as ``cursor`` to fetch the next
+    page at constant cost; ``skip`` still works but degrades on deep pages.
+
+    ``format=ndjson`` or ``format=csv`` streams the rows in chunks instead,
+    with constant memory however many match; ``cursor`` then sets where the
+    stream starts, and no next cursor is returned.
+    """
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either cursor or skip, not both")
+    if format != "json" and format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format, expected json, ndjson or csv")
+
+    # Filter by date range
+    start_date = datetime.now() - timedelta(days=days)
+    # Reaches into older month tables where partitioning needs it
+    source = await db.run_sync(partitions.metrics_source, start_date)
+    # Plain column tuples: rows go out as they are, with no ORM objects or
+    # per-row model validation in between
+    query = select(*[getattr(source, field) for field in METRIC_FIELDS])
     
     # Apply filters
     if city:
-        query = query.filter(CityMetric.city == city)
+        query = query.where(source.city == city)
     if metric_type:
-        query = query.filter(CityMetric.metric_type == metric_type)
+        query = query.where(source.metric_type == metric_type)
     
-    # Filter by date range
-    start_date = datetime.now() - timedelta(days=days)
-    query = query.filter(CityMetric.timestamp >= start_date)
+    query = query.where(source.timestamp >= start_date)
+    
+    # Resume strictly after the last (timestamp, id) of the previous page.
+    # The plain timestamp bound keeps the condition usable as an index range.
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor, 2)
+        try:
+            last_timestamp = datetime.fromisoformat(last_timestamp)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            source.timestamp <= last_timestamp,
+            or_(
+                source.timestamp < last_timestamp,
+                source.id < last_id
+            )
+        )
+    
+    query = query.order_by(source.timestamp.desc(), source.id.desc())
+
+    if format in STREAM_FORMATS:
+        return stream_metrics(query.offset(skip or None).limit(limit), format, "metrics")
+
+    # Apply pagination; fetch one extra row to learn whether another page follows
+    limit = 100 if limit is None else limit
+    result = await db.execute(query.offset(skip).limit(limit + 1))
+    metrics = [dict(row) for row in result.mappings()]
     
-    # Order by timestamp descending and apply pagination
-    metrics = query.order_by(CityMetric.timestamp.desc()).offset(skip).limit(limit).all()
+    headers = {}
+    if metrics and len(metrics) > limit:
+        metrics = metrics[:limit]
+        last = metrics[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last["timestamp"], last["id"])
     
-    return metrics
+    return FastJSONResponse(metrics, headers=headers)
 
 @router.get("/cities", response_model=List[str])
-def get_cities(db: Session = Depends(deps.get_db)):
+async def get_cities(db: AsyncSession = Depends(deps.get_async_db)):
     """Get list of all cities with metrics"""
-    cities = db.query(CityMetric.city).distinct().all()
-    return [city[0] for city in cities]
+    async def load():
+        # From the series catalog, not a DISTINCT over every reading
+        return await db.run_sync(catalog.cities)
+    return await response_cache.cached("cities", {}, [CATALOG_TAG], load, List[str])
 
 @router.get("/types", response_model=List[str])
-def get_metric_types(db: Session = Depends(deps.get_db)):
+async def get_metric_types(db: AsyncSession = Depends(deps.get_async_db)):
     """Get list of all metric types"""
-    types = db.query(CityMetric.metric_type).distinct().all()
-    return [metric_type[0] for metric_type in types]
+    async def load():
+        return await db.run_sync(catalog.metric_types)
+    return await response_cache.cached("types", {}, [CATALOG_TAG], load, List[str])
+
+@router.get("/catalog", response_model=List[SeriesInfo])
+async def get_series_catalog(
+    db: AsyncSession = Depends(deps.get_async_db),
+    prefix: Optional[str] = Query(None, description="City or metric type prefix, case-insensitive"),
+    city: Optional[str] = Query(None, description="Filter by city name"),
+    metric_type: Optional[str] = Query(None, description="Filter by metric type"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page")
+):
+    """Discover series: each (city, metric type, unit) with its first and
+    last reading and row count, ordered by city, metric type and unit"""
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, 3)
+        if not all(isinstance(value, str) for value in after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    series = await db.run_sync(catalog.find_series, prefix, city, metric_type, after, limit + 1)
+    headers = {}
+    if len(series) > limit:
+        series = series[:limit]
+        last = series[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last["city"], last["metric_type"], last["unit"] or "")
+    return FastJSONResponse(series, headers=headers)
 
 @router.get("/aggregate", response_model=List[MetricAggregate])
-def get_aggregated_metrics(
-    db: Session = Depends(deps.get_db),
+async def get_aggregated_metrics(
+    db: AsyncSession = Depends(deps.get_async_db),
     city: str = Query(..., description="City name"),
     metric_type: str = Query(..., description="Metric type"),
     days: int = Query(7, description="Number of days to aggregate"),
@@ -62,78 +158,166 @@ def get_aggregated_metrics(
     
     # Select the appropriate aggregation function
     agg_functions = {
-        "avg": func.avg,
-        "min": func.min,
-        "max": func.max,
-        "sum": func.sum
+        "avg": lambda stats: stats["sum"] / stats["count"],
+        "min": lambda stats: stats["min"],
+        "max": lambda stats: stats["max"],
+        "sum": lambda stats: stats["sum"]
     }
     
     if aggregation not in agg_functions:
         raise HTTPException(status_code=400, detail="Invalid aggregation type")
     
-    agg_func = agg_functions[aggregation]
+    async def load():
+        # Read from pre-aggregated rollups instead of grouping raw rows
+        results = await db.run_sync(rollups.aggregate_daily, city, metric_type, start_date)
+        cutoff = partitions.retention_cutoff()
+        if archive.enabled() and cutoff is not None and start_date < cutoff:
+            # Days whose raw rows were dropped come from the Parquet archive
+            # where it has them; rollups cover the rest
+            archived = await run_in_threadpool(
+                archive.aggregate_daily, city, metric_type, start_date, rollups.truncate(cutoff, "day")
+            )
+            archived_dates = {result["date"] for result in archived}
+            results = sorted(
+                archived + [result for result in results if result["date"] not in archived_dates],
+                key=lambda result: (result["date"], result["unit"])
+            )
+        return [
+            {
+                "date": result["date"],
+                "value": agg_functions[aggregation](result),
+                "unit": result["unit"],
+                "aggregation_type": aggregation
+            }
+            for result in results
+        ]
     
-    # Query with aggregation
-    results = db.query(
-        func.date(CityMetric.timestamp).label("date"),
-        agg_func(CityMetric.value).label("value"),
-        CityMetric.unit
-    ).filter(
-        CityMetric.city == city,
-        CityMetric.metric_type == metric_type,
-        CityMetric.timestamp >= start_date
-    ).group_by(
-        func.date(CityMetric.timestamp),
-        CityMetric.unit
-    ).order_by("date").all()
+    # start_date moves with the clock, so key on days rather than the date
+    params = {"city": city, "metric_type": metric_type, "days": days, "aggregation": aggregation}
+    return await response_cache.cached(
+        "aggregate", params, [series_tag(city, metric_type)], load, List[MetricAggregate]
+    )
+
+@router.get("/series", response_model=SeriesResponse)
+async def get_metric_series(
+    db: AsyncSession = Depends(deps.get_async_db),
+    city: str = Query(..., description="City name"),
+    metric_type: str = Query(..., description="Metric type"),
+    time_range: str = Query("24h", alias="range", description="Window such as 1h, 24h, 7d, 30d"),
+    points: int = Query(300, ge=3, le=5000, description="Target number of points"),
+    method: str = Query("lttb", description="Downsampling method: lttb, minmax")
+):
+    """Get a chart-ready series downsampled to roughly ``points`` points"""
+    window = downsample.parse_range(time_range)
+    if window is None:
+        raise HTTPException(status_code=400, detail="Invalid range")
+    if method not in downsample.METHODS:
+        raise HTTPException(status_code=400, detail="Invalid downsampling method")
     
-    return [
-        {
-            "date": result.date,
-            "value": result.value,
-            "unit": result.unit,
-            "aggregation_type": aggregation
-        }
-        for result in results
-    ]
+    return await db.run_sync(downsample.get_series, city, metric_type, window, points, method)
 
 @router.get("/latest", response_model=List[MetricResponse])
-def get_latest_metrics(
-    db: Session = Depends(deps.get_db),
+async def get_latest_metrics(
+    db: AsyncSession = Depends(deps.get_async_db),
     city: Optional[str] = Query(None, description="Filter by city name")
 ):
     """Get the latest metric for each type in a city"""
-    subquery = db.query(
-        CityMetric.city,
-        CityMetric.metric_type,
-        func.max(CityMetric.timestamp).label("max_timestamp")
-    )
-    
-    if city:
-        subquery = subquery.filter(CityMetric.city == city)
-    
-    subquery = subquery.group_by(
-        CityMetric.city,
-        CityMetric.metric_type
-    ).subquery()
-    
-    latest_metrics = db.query(CityMetric).join(
-        subquery,
-        (CityMetric.city == subquery.c.city) &
-        (CityMetric.metric_type == subquery.c.metric_type) &
-        (CityMetric.timestamp == subquery.c.max_timestamp)
-    ).all()
-    
-    return latest_metrics
+    if settings.LATEST_CACHE_ENABLED and latest_values.warmed:
+        return FastJSONResponse(latest_values.get(city))
+
+    async def load():
+        return await db.run_sync(latest_cache.query_latest, city)
+    # Plain rows in the response shape, so the cache dumps them unvalidated
+    return await response_cache.cached("latest", {"city": city}, [latest_tag(city)], load, None)
+
+@router.get("/latest/check", response_model=LatestCacheCheck)
+async def check_latest_cache(
+    db: AsyncSession = Depends(deps.get_async_db),
+    city: Optional[str] = Query(None, description="Filter by city name")
+):
+    """Compare the in-memory latest values against the database"""
+    return await db.run_sync(latest_values.check, city)
 
 @router.post("/", response_model=MetricResponse)
-def create_metric(
+async def create_metric(
     metric: MetricCreate,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """Create a new city metric"""
-    db_metric = CityMetric(**metric.dict())
-    db.add(db_metric)
-    db.commit()
-    db.refresh(db_metric)
+    new_series = not latest_values.known(metric.city, metric.metric_type)
+    db_metric = await db.run_sync(ingest.create_metric, metric)
+    await response_cache.invalidate_series([(metric.city, metric.metric_type)], new_series)
     return db_metric
+
+@router.post("/bulk", response_model=BulkIngestResponse)
+async def bulk_create_metrics(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    batch_size: Optional[int] = Query(None, ge=1, description="Rows per transaction")
+):
+    """Bulk-ingest metrics from a JSON array or an NDJSON stream.
+
+    Records are validated and written in batches of ``batch_size`` rows, one
+    transaction per batch, and acknowledged per batch. Send
+    ``Content-Type: application/x-ndjson`` to stream one record per line.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    acks = []
+    pending = []
+    start_index = 0
+
+    async def flush():
+        nonlocal pending, start_index
+        # Check for unseen series before ingestion records them
+        series = {
+            (record.get("city"), record.get("metric_type"))
+            for record in pending if isinstance(record, dict)
+        }
+        new_series = any(not latest_values.known(*key) for key in series)
+        ack = await db.run_sync(ingest.ingest_batch, len(acks), start_index, pending)
+        acks.append(ack)
+        if ack["accepted"]:
+            await response_cache.invalidate_series(series, new_series)
+        start_index += len(pending)
+        pending = []
+
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        # Parse lines as they arrive so memory stays bounded by one batch
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    pending.append(_parse_ndjson_line(line))
+                    if len(pending) >= batch_size:
+                        await flush()
+        if buffer.strip():
+            pending.append(_parse_ndjson_line(buffer))
+    else:
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of metrics")
+        for offset in range(0, len(records), batch_size):
+            pending = records[offset:offset + batch_size]
+            await flush()
+
+    if pending:
+        await flush()
+
+    return {
+        "accepted": sum(ack["accepted"] for ack in acks),
+        "rejected": sum(ack["rejected"] for ack in acks),
+        "batches": acks
+    }
+
+def _parse_ndjson_line(line: bytes):
+    """Decode one NDJSON line, passing undecodable lines on to fail validation"""
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line.decode("utf-8", errors="replace")
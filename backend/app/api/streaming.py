@@ -0,0 +1,79 @@
+"""Chunked NDJSON / CSV responses for result sets too large to buffer.
+
+Rows are fetched through a server-side cursor ``STREAM_CHUNK_ROWS`` at a
+time and each chunk is serialized and sent before the next is fetched, so
+memory stays flat and the first bytes go out as soon as the first chunk
+arrives. The stream owns its session: it outlives the request handler.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.core import fast_json
+from app.core.config import settings
+from app.core.telemetry import phase
+from app.db.base import AsyncSessionLocal
+from app.schemas.metrics import METRIC_FIELDS
+
+STREAM_FORMATS = ("ndjson", "csv")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def _partitions(query: Select) -> AsyncIterator[Sequence]:
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.STREAM_CHUNK_ROWS))
+        async for partition in result.mappings().partitions():
+            yield partition
+
+
+async def _ndjson(query: Select) -> AsyncIterator[bytes]:
+    async for rows in _partitions(query):
+        # Rows come straight from the database, so no validation; one send per chunk
+        with phase("encode"):
+            chunk = b"".join(fast_json.dumps_line(dict(row)) for row in rows)
+        yield chunk
+
+
+async def _csv(query: Select, columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in _partitions(query):
+        with phase("encode"):
+            for row in rows:
+                writer.writerow([
+                    json.dumps(row[column]) if column == "meta_data" and row[column] is not None
+                    else row[column].isoformat() if hasattr(row[column], "isoformat")
+                    else row[column]
+                    for column in columns
+                ])
+            chunk = buffer.getvalue().encode()
+        yield chunk
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_metrics(query: Select, format: str, filename: str) -> StreamingResponse:
+    """Stream the ``MetricResponse`` rows selected by ``query`` as ``format``.
+
+    ``query`` must select the ``METRIC_FIELDS`` columns.
+    """
+    if format == "ndjson":
+        body = _ndjson(query)
+    else:
+        body = _csv(query, list(METRIC_FIELDS))
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
@@ -0,0 +1,131 @@
+"""In-memory stand-in for the subset of ``redis.asyncio.Redis`` the app uses.
+
+Set ``REDIS_URL=fakeredis://`` to run the Redis-backed code paths without a
+server, e.g. in benchmarks or offline development. State lives in the
+process, so it is shared by nothing else.
+"""
+import asyncio
+import fnmatch
+import time
+from typing import Any, Dict, List, Optional, Set
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakePubSub:
+    """Pattern subscriptions on a ``FakeRedis``; messages are delivered in-process"""
+
+    def __init__(self, server: "FakeRedis"):
+        self._server = server
+        self._patterns: Set[str] = set()
+        self._messages: asyncio.Queue = asyncio.Queue()
+
+    async def psubscribe(self, *patterns):
+        self._patterns.update(_encode(pattern).decode() for pattern in patterns)
+        self._server._pubsubs.add(self)
+
+    async def punsubscribe(self, *patterns):
+        self._patterns.difference_update(_encode(pattern).decode() for pattern in patterns or list(self._patterns))
+        if not self._patterns:
+            self._server._pubsubs.discard(self)
+
+    def _receive(self, channel: bytes, data: bytes) -> bool:
+        for pattern in self._patterns:
+            if fnmatch.fnmatchcase(channel.decode(), pattern):
+                self._messages.put_nowait({
+                    "type": "pmessage",
+                    "pattern": pattern.encode(),
+                    "channel": channel,
+                    "data": data,
+                })
+                return True
+        return False
+
+    async def listen(self):
+        while True:
+            yield await self._messages.get()
+
+    async def aclose(self):
+        self._patterns.clear()
+        self._server._pubsubs.discard(self)
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data: Dict[bytes, bytes] = {}
+        self._expires: Dict[bytes, float] = {}
+        self._pubsubs: Set[FakePubSub] = set()
+
+    def _alive(self, key: bytes) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def ping(self) -> bool:
+        return True
+
+    async def get(self, name) -> Optional[bytes]:
+        key = _encode(name)
+        return self._data[key] if self._alive(key) else None
+
+    async def set(self, name, value, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        key = _encode(name)
+        if nx and self._alive(key):
+            return None
+        self._data[key] = _encode(value)
+        self._expires.pop(key, None)
+        if ex is not None:
+            self._expires[key] = time.monotonic() + ex
+        return True
+
+    async def delete(self, *names) -> int:
+        deleted = 0
+        for name in names:
+            key = _encode(name)
+            if self._alive(key):
+                deleted += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return deleted
+
+    async def expire(self, name, seconds: int) -> bool:
+        key = _encode(name)
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.monotonic() + seconds
+        return True
+
+    async def mget(self, keys, *args) -> List[Optional[bytes]]:
+        names = [keys] + list(args) if isinstance(keys, (str, bytes)) else list(keys) + list(args)
+        return [await self.get(name) for name in names]
+
+    async def incr(self, name, amount: int = 1) -> int:
+        key = _encode(name)
+        value = int(self._data[key]) + amount if self._alive(key) else amount
+        self._data[key] = _encode(value)
+        return value
+
+    async def publish(self, channel, message) -> int:
+        channel, data = _encode(channel), _encode(message)
+        return sum(pubsub._receive(channel, data) for pubsub in list(self._pubsubs))
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def keys(self, pattern="*"):
+        pattern = _encode(pattern).decode()
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+
+    async def flushdb(self) -> bool:
+        self._data.clear()
+        self._expires.clear()
+        return True
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,32 @@
+"""orjson serialization for read paths that skip response-model validation.
+
+Rows selected as plain columns are already the right types, so validating
+them through a Pydantic model only to dump them again is wasted work.
+``dumps`` produces the same JSON Pydantic would for those rows: ISO 8601
+datetimes with ``Z`` for UTC, and floats and nested JSON as they are.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.core.telemetry import phase
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=OPTIONS)
+
+
+def dumps_line(content: Any) -> bytes:
+    """``dumps`` plus a trailing newline, for NDJSON"""
+    return orjson.dumps(content, option=OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson and no model validation"""
+
+    def render(self, content: Any) -> bytes:
+        with phase("encode"):
+            return dumps(content)
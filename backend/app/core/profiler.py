@@ -0,0 +1,148 @@
+"""Opt-in sampling profiler for individual requests.
+
+With ``PROFILE_ENABLED``, a random ``PROFILE_SAMPLE_RATE`` share of
+requests, plus any request sent with an ``X-Profile: 1`` header, are
+profiled: while one is in flight a background thread samples the stack of
+every busy thread every ``PROFILE_INTERVAL_MS``. Requests that take at
+least ``PROFILE_SLOW_MS`` (header-requested ones always) are written to
+``PROFILE_DIR`` as folded stacks, one ``frame;frame;frame count`` line per
+distinct stack, which flamegraph.pl, speedscope and inferno read as is.
+
+Samples cannot be tied to a single request: async handlers share the
+event loop thread and SQLAlchemy runs async sessions in greenlets whose
+frames do not chain back to the request. So a profile holds everything the
+process ran while the request was in flight; profile at low concurrency,
+or on a worker taken out of rotation, for a clean picture.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+# Innermost frames of threads that are blocked waiting for work
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+}
+
+
+class Profile:
+    def __init__(self, method: str, path: str, forced: bool):
+        self.method = method
+        self.path = path
+        self.forced = forced
+        self.started_at = datetime.now()
+        self.samples: Counter = Counter()
+
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: List[Profile] = []
+        self._finished: List[tuple] = []
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._names: Dict[str, str] = {}
+
+    def begin(self, scope) -> Optional[Profile]:
+        """Start profiling the request in ``scope`` if it is picked"""
+        if not settings.PROFILE_ENABLED:
+            return None
+        forced = any(name == PROFILE_HEADER and value == b"1" for name, value in scope["headers"])
+        if not forced and random.random() >= settings.PROFILE_SAMPLE_RATE:
+            return None
+        profile = Profile(scope["method"], scope["path"], forced)
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return profile
+
+    def end(self, profile: Profile, route: str, seconds: float):
+        """Stop sampling for ``profile``; slow ones are written out by the
+        sampler thread, off the event loop"""
+        with self._lock:
+            self._active.remove(profile)
+            if profile.forced or seconds * 1000 >= settings.PROFILE_SLOW_MS:
+                self._finished.append((profile, route, seconds))
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = bool(self._active)
+                finished, self._finished = self._finished, []
+            for profile, route, seconds in finished:
+                self._write(profile, route, seconds)
+            if active:
+                self._sample()
+                time.sleep(settings.PROFILE_INTERVAL_MS / 1000)
+            else:
+                self._wake.wait()
+                self._wake.clear()
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            code = frame.f_code
+            if ident == me or (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stacks.append(";".join(reversed(stack)))
+        with self._lock:
+            for profile in self._active:
+                profile.samples.update(stacks)
+
+    def _frame_name(self, code) -> str:
+        key = f"{code.co_filename}:{code.co_name}:{code.co_firstlineno}"
+        name = self._names.get(key)
+        if name is None:
+            filename = code.co_filename
+            # Shortest path relative to an import root, e.g. app/api/endpoints/metrics.py
+            for root in sorted({os.path.abspath(path) for path in sys.path}, key=len, reverse=True):
+                if filename.startswith(root + os.sep):
+                    filename = filename[len(root) + 1:]
+                    break
+            name = self._names[key] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return name
+
+    def _write(self, profile: Profile, route: str, seconds: float):
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        path = os.path.join(
+            settings.PROFILE_DIR,
+            f"{profile.started_at:%Y%m%dT%H%M%S.%f}-{profile.method}-{slug}-{seconds * 1000:.0f}ms.folded"
+        )
+        try:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            with open(path, "w") as out:
+                for stack, count in profile.samples.most_common():
+                    out.write(f"{stack} {count}\n")
+        except OSError:
+            logger.exception("Could not write the profile of %s %s", profile.method, profile.path)
+            return
+        logger.info("Profiled %s %s (%.0f ms, %d samples) to %s",
+                    profile.method, profile.path, seconds * 1000, sum(profile.samples.values()), path)
+
+
+profiler = Profiler()
@@ -0,0 +1,114 @@
+"""Prometheus text exposition of the process's telemetry, served at /metrics.
+
+Covers per-route request counts, durations and phase times
+(``app.core.telemetry``), SQL statements by engine and operation
+(``app.db.instrumentation``) and connection pool usage (``app.db.pool``).
+Every worker process keeps its own counters, so scrape each worker or
+aggregate by instance.
+"""
+from typing import Dict, Iterable, List
+
+from app.core import telemetry
+from app.db import instrumentation, pool
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class _Exposition:
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, **labels):
+        self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, buckets: Iterable[Dict], total: float, unit_divisor: float = 1.0, **labels):
+        """Samples of one histogram from a cumulative ``[{"le", "count"}]`` list"""
+        count = 0
+        for bucket in buckets:
+            bound = bucket["le"] if bucket["le"] == "+Inf" else repr(float(bucket["le"]) / unit_divisor)
+            count = bucket["count"]
+            self.sample(f"{name}_bucket", count, **labels, le=bound)
+        self.sample(f"{name}_sum", total, **labels)
+        self.sample(f"{name}_count", count, **labels)
+
+
+def render() -> str:
+    out = _Exposition()
+    routes = telemetry.request_telemetry.snapshot()
+
+    out.family("citypulse_http_requests_in_flight", "gauge", "HTTP requests being handled")
+    out.sample("citypulse_http_requests_in_flight", telemetry.request_telemetry.in_flight)
+
+    out.family("citypulse_http_requests_total", "counter", "HTTP requests by route and status")
+    for route in routes:
+        for status, count in sorted(route["statuses"].items()):
+            out.sample("citypulse_http_requests_total", count,
+                       method=route["method"], route=route["route"], status=status)
+
+    out.family("citypulse_http_request_duration_seconds", "histogram",
+               "HTTP request duration until the last body chunk is sent")
+    for route in routes:
+        out.histogram("citypulse_http_request_duration_seconds", route["duration_histogram"],
+                      route["duration_seconds_sum"], method=route["method"], route=route["route"])
+
+    out.family("citypulse_http_request_phase_seconds_total", "counter",
+               "Time spent in each phase of HTTP requests: pool, sql, orm, validate, encode, app")
+    for route in routes:
+        for phase, seconds in route["phase_seconds"].items():
+            out.sample("citypulse_http_request_phase_seconds_total", seconds,
+                       method=route["method"], route=route["route"], phase=phase)
+
+    for name, key, help_text in (
+        ("citypulse_http_request_sql_statements_total", "sql_statements", "SQL statements run for HTTP requests"),
+        ("citypulse_http_request_sql_rows_total", "sql_rows", "Rows the database driver reported for those statements"),
+        ("citypulse_http_request_orm_objects_total", "orm_objects", "ORM objects loaded for HTTP requests"),
+    ):
+        out.family(name, "counter", help_text)
+        for route in routes:
+            out.sample(name, route[key], method=route["method"], route=route["route"])
+
+    statements = instrumentation.statement_telemetry.snapshot()
+    out.family("citypulse_sql_statement_duration_seconds", "histogram",
+               "SQL statement duration in the database driver, by engine and operation")
+    for stats in statements:
+        out.histogram("citypulse_sql_statement_duration_seconds", stats["duration_histogram"],
+                      stats["duration_seconds_sum"], engine=stats["engine"], operation=stats["operation"])
+    out.family("citypulse_sql_rows_total", "counter", "Rows the database driver reported, by engine and operation")
+    for stats in statements:
+        out.sample("citypulse_sql_rows_total", stats["rows"], engine=stats["engine"], operation=stats["operation"])
+
+    pools = pool.snapshot()
+    for name, key, kind, help_text in (
+        ("citypulse_db_pool_size", "pool_size", "gauge", "Connections the pool keeps open"),
+        ("citypulse_db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out"),
+        ("citypulse_db_pool_overflow", "overflow", "gauge", "Overflow connections currently open"),
+        ("citypulse_db_pool_checkouts_total", "checkouts", "counter", "Successful connection checkouts"),
+        ("citypulse_db_pool_overflow_checkouts_total", "overflow_checkouts", "counter",
+         "Checkouts that held an overflow connection"),
+        ("citypulse_db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out"),
+    ):
+        out.family(name, kind, help_text)
+        for stats in pools:
+            if stats[key] is not None:
+                out.sample(name, stats[key], pool=stats["name"])
+    out.family("citypulse_db_pool_wait_seconds", "histogram", "Time spent waiting for a connection checkout")
+    for stats in pools:
+        out.histogram("citypulse_db_pool_wait_seconds", stats["wait_histogram_ms"], stats["wait_seconds_sum"],
+                      unit_divisor=1000, pool=stats["name"])
+
+    out.lines.append("")
+    return "\n".join(out.lines)
@@ -0,0 +1,36 @@
+"""Shared async Redis client.
+
+``REDIS_URL=fakeredis://`` selects the in-process ``FakeRedis``; an empty
+``REDIS_URL`` disables Redis entirely. The client is opened by the app's
+lifespan and bound to its event loop, so it is closed again on shutdown.
+"""
+from typing import Any, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.fake_redis import FakeRedis
+
+_client: Optional[Any] = None
+
+
+def get_client() -> Optional[Any]:
+    """The shared client, created on first use; None when Redis is disabled"""
+    global _client
+    if _client is None and settings.REDIS_URL:
+        if settings.REDIS_URL.startswith("fakeredis://"):
+            _client = FakeRedis()
+        else:
+            _client = redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=settings.REDIS_TIMEOUT,
+                socket_timeout=settings.REDIS_TIMEOUT
+            )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
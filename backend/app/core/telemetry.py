@@ -0,0 +1,201 @@
+"""Per-request timings, split by phase, aggregated per route.
+
+``InstrumentationMiddleware`` gives each HTTP request a ``RequestStats``
+in a context variable, which the hooks along the request path add to:
+
+- ``pool``: waiting for a database connection (``app.db.pool``)
+- ``sql``: time in the database driver (``app.db.instrumentation``)
+- ``orm``: ORM statement execution beyond its SQL, which for async
+  sessions includes hydrating the rows into objects
+- ``validate``: response model validation and conversion to JSON types
+- ``encode``: rendering JSON, NDJSON and CSV bodies
+- ``app``: the rest of the request, i.e. handler code, dependencies and
+  the framework
+
+When the request finishes its stats are added to its route's totals,
+labelled with the route template rather than the path, so ``/metrics``
+has one series per endpoint. Threads the request hands work to copy the
+context, so their time lands on the same request.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import routing
+from fastapi.responses import JSONResponse
+
+from app.core import profiler
+
+PHASES = ("pool", "sql", "orm", "validate", "encode", "app")
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label of requests that matched no route, e.g. 404s
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    __slots__ = ("scope", "phases", "statements", "rows", "orm_objects")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.statements = 0
+        self.rows = 0  # rows the driver reported for SQL statements
+        self.orm_objects = 0
+
+    def route(self) -> str:
+        """The template of the matched route, once routing has run"""
+        return getattr(self.scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current() -> Optional[RequestStats]:
+    """The stats of the request being handled, if any"""
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's ``name`` phase"""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] += time.perf_counter() - started
+
+
+class RouteStats:
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.statements = 0
+        self.rows = 0
+        self.orm_objects = 0
+
+
+class RequestTelemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        bucket = next(
+            (i for i, bound in enumerate(DURATION_BUCKETS) if seconds <= bound),
+            len(DURATION_BUCKETS)
+        )
+        # Whatever the hooks did not claim was spent in the application
+        stats.phases["app"] = max(0.0, seconds - sum(stats.phases.values()))
+        with self._lock:
+            route_stats = self._routes.get((method, route))
+            if route_stats is None:
+                route_stats = self._routes[(method, route)] = RouteStats()
+            route_stats.statuses[status] = route_stats.statuses.get(status, 0) + 1
+            route_stats.buckets[bucket] += 1
+            route_stats.duration_sum += seconds
+            for name, elapsed in stats.phases.items():
+                route_stats.phases[name] += elapsed
+            route_stats.statements += stats.statements
+            route_stats.rows += stats.rows
+            route_stats.orm_objects += stats.orm_objects
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Totals per (method, route), with a cumulative duration histogram"""
+        with self._lock:
+            routes = []
+            for (method, route), stats in sorted(self._routes.items()):
+                cumulative, histogram = 0, []
+                for bound, count in zip(list(DURATION_BUCKETS) + ["+Inf"], stats.buckets):
+                    cumulative += count
+                    histogram.append({"le": str(bound), "count": cumulative})
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "statuses": dict(stats.statuses),
+                    "duration_seconds_sum": stats.duration_sum,
+                    "duration_histogram": histogram,
+                    "phase_seconds": dict(stats.phases),
+                    "sql_statements": stats.statements,
+                    "sql_rows": stats.rows,
+                    "orm_objects": stats.orm_objects,
+                })
+            return routes
+
+
+request_telemetry = RequestTelemetry()
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware timing each HTTP request until its last body
+    chunk is sent, so streamed responses count in full"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        profile = profiler.profiler.begin(scope)
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        request_telemetry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_telemetry.in_flight -= 1
+            _current.reset(token)
+            route = stats.route()
+            request_telemetry.observe(scope["method"], route, status, elapsed, stats)
+            if profile is not None:
+                profiler.profiler.end(profile, route, elapsed)
+
+
+class TimedJSONResponse(JSONResponse):
+    """The default JSON response, with rendering counted as ``encode``"""
+
+    def render(self, content: Any) -> bytes:
+        with phase("encode"):
+            return super().render(content)
+
+
+def instrument_fastapi():
+    """Count response model validation as ``validate``.
+
+    FastAPI validates and serializes a handler's return value in
+    ``fastapi.routing.serialize_response``, which has no hook, so it is
+    wrapped; the request handlers look it up on every call.
+    """
+    serialize = routing.serialize_response
+    if getattr(serialize, "instrumented", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        with phase("validate"):
+            return await serialize(*args, **kwargs)
+
+    serialize_response.instrumented = True
+    routing.serialize_response = serialize_response
@@ -1,14 +1,83 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db import instrumentation, slow_queries
+from app.db.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
 
-# Create engine
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers for the sync drivers DATABASE_URL may name
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url() -> str:
+    """Return the async driver URL for the configured database"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    if url.drivername not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {url.drivername}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[url.drivername]).render_as_string(hide_password=False)
+
+def engine_options(url: str, name: str) -> dict:
+    """Pool and connection options from settings for the engine at ``url``"""
+    url = make_url(url)
+    options = {}
+    
+    # In-memory SQLite needs its single shared connection; leave its pool alone
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options.update(
+            poolclass=InstrumentedAsyncAdaptedQueuePool if url.get_dialect().is_async else InstrumentedQueuePool,
+            pool_logging_name=name,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    
+    return options
+
+# Create engine (scripts, migrations and startup tasks)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL, "sync"))
+
+# Create async engine (API request handling)
+async_engine = create_async_engine(
+    get_async_database_url(),
+    **engine_options(get_async_database_url(), "async")
+)
+
+if settings.INSTRUMENTATION_ENABLED:
+    instrumentation.instrument(engine, "sync")
+    instrumentation.instrument(async_engine.sync_engine, "async")
+    instrumentation.instrument_orm()
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_queries.attach(engine, "sync")
+    slow_queries.attach(async_engine.sync_engine, "async")
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions keep attributes loaded after commit, since lazy refreshes
+# cannot run outside the event loop
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class
 Base = declarative_base()
 
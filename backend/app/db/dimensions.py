@@ -0,0 +1,153 @@
+"""Dictionary encoding of repeated metric strings.
+
+City, metric type and source names are stored once in the ``cities``,
+``metric_types`` and ``sources`` tables, and metric rows hold their
+small-integer ids. Columns typed ``Dimension`` translate at the driver
+boundary through a process-wide id<->name cache, so queries keep comparing
+and selecting names (``CityMetric.city == "Seattle"``) while the database
+compares and indexes integers.
+
+Names must exist before rows referencing them are written: writers call
+``ensure_names`` first (the ingestion service does). The caches are loaded
+at startup and refreshed by ``ensure`` and the scheduler's cache warming,
+never from a query: binding a name the cache does not know yields NULL, so
+a filter on it matches nothing, and an id it does not know reads as NULL
+until the next refresh picks up names other processes registered. Scripts
+that skip the app's startup load each table on its first use.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import SmallInteger, column, select, table
+from sqlalchemy.types import TypeDecorator
+
+from app.db.base import engine
+
+
+class DimensionCache:
+    """id<->name map for one dimension table"""
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        self._table = table(table_name, column("id"), column("name"))
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._loaded = False
+
+    def load(self):
+        """Reload the whole table"""
+        with engine.connect() as conn:
+            rows = conn.execute(select(self._table.c.id, self._table.c.name)).all()
+        with self._lock:
+            for row_id, name in rows:
+                self._ids[name] = row_id
+                self._names[row_id] = name
+            self._loaded = True
+
+    def id_for(self, name: str) -> Optional[int]:
+        if not self._loaded:
+            self.load()
+        return self._ids.get(name)
+
+    def name_for(self, row_id: int) -> Optional[str]:
+        if not self._loaded:
+            self.load()
+        return self._names.get(row_id)
+
+    def ensure(self, names: Iterable[str]):
+        """Register any of ``names`` not in the table yet"""
+        if not self._loaded:
+            self.load()
+        missing = {name for name in names if name is not None and name not in self._ids}
+        if not missing:
+            return
+        # Committed on its own connection before the caller's transaction
+        # writes, so an id is never cached for a row that was rolled back
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            conn.execute(
+                upsert(self._table).on_conflict_do_nothing(index_elements=["name"]),
+                [{"name": name} for name in sorted(missing)]
+            )
+            rows = conn.execute(
+                select(self._table.c.id, self._table.c.name).where(self._table.c.name.in_(missing))
+            ).all()
+        with self._lock:
+            for row_id, name in rows:
+                self._ids[name] = row_id
+                self._names[row_id] = name
+
+    def names(self) -> List[str]:
+        self.load()
+        with self._lock:
+            return sorted(self._ids)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+            self._loaded = False
+
+
+cities = DimensionCache("cities")
+metric_types = DimensionCache("metric_types")
+sources = DimensionCache("sources")
+
+# Row dict keys holding dimension names, as the ingestion service builds them
+ROW_DIMENSIONS = {
+    "city": cities,
+    "metric_type": metric_types,
+    "source": sources,
+}
+
+
+def ensure_names(rows: Iterable[Dict[str, Any]]):
+    """Register every city, metric type and source named in ``rows``"""
+    rows = list(rows)
+    for key, cache in ROW_DIMENSIONS.items():
+        cache.ensure(row.get(key) for row in rows)
+
+
+def reload():
+    """Reload every dimension table, picking up names other processes added"""
+    for cache in ROW_DIMENSIONS.values():
+        cache.load()
+
+
+def clear():
+    """Forget cached names, e.g. after the tables were recreated"""
+    for cache in ROW_DIMENSIONS.values():
+        cache.clear()
+
+
+class Dimension(TypeDecorator):
+    """A name stored as the small-integer id of a dimension table row"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, dimension: DimensionCache):
+        super().__init__()
+        self.dimension = dimension
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[int]:
+        if value is None:
+            return None
+        return self.dimension.id_for(value)
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return self.dimension.name_for(value)
+
+    def process_literal_param(self, value: Optional[str], dialect) -> str:
+        row_id = self.process_bind_param(value, dialect)
+        return "NULL" if row_id is None else str(row_id)
+
+    @property
+    def python_type(self):
+        return str
@@ -2,14 +2,56 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
 from app.db.base import engine
 from app.models.models import Base
 
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def migration_scripts() -> ScriptDirectory:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return ScriptDirectory.from_config(config)
+
+
 def init_db():
-    """Initialize the database by creating all tables"""
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+    """Create the tables of a new database, or check an existing one is
+    migrated.
+
+    An empty database is created from the models and stamped with the
+    latest migration. Any other database belongs to Alembic: creating the
+    tables of newer models next to older ones would leave it matching no
+    revision, so one that is behind is refused until it is upgraded.
+    """
+    scripts = migration_scripts()
+    head = scripts.get_current_head()
+    with engine.begin() as conn:
+        migration = MigrationContext.configure(conn)
+        current = migration.get_current_revision()
+        if current == head:
+            return
+        if current is None:
+            inspector = inspect(conn)
+            if "city_metrics" in inspector.get_table_names() and not any(
+                column["name"] == "city_id" for column in inspector.get_columns("city_metrics")
+            ):
+                raise RuntimeError(
+                    "The database predates migrations: back it up, then run "
+                    "`alembic stamp 0001` and `alembic upgrade head`"
+                )
+            # Empty, or created by create_all from the current models
+            Base.metadata.create_all(bind=conn)
+            migration.stamp(scripts, "head")
+            return
+    raise RuntimeError(f"The database schema is at revision {current}, not {head}: run `alembic upgrade head`")
+
 
 if __name__ == "__main__":
+    print("Creating database tables...")
     init_db()
+    print("Database tables created successfully!")
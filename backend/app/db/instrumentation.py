@@ -0,0 +1,129 @@
+"""SQL statement and ORM instrumentation.
+
+``instrument`` hooks an engine's cursor events to time every statement the
+driver runs, recorded against the engine's name and the statement's
+operation (SELECT, INSERT, ...), whether or not it ran for a request.
+Statements run for a request also add to its ``RequestStats``: the
+``sql`` phase, the statement count and the rows the driver reported
+(affected rows for writes; rows returned only where the driver counts
+them, e.g. psycopg2, not SQLite). ``instrument_orm`` adds the ORM side:
+the ``orm`` phase and the number of objects hydrated, less the time its
+statements spent waiting for a connection or in the driver.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper, Session
+
+from app.core import telemetry
+
+# Upper bounds (seconds) of the statement duration histogram buckets
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE", "DROP", "ALTER"}
+
+
+def operation(statement: str) -> str:
+    words = statement.lstrip()[:10].split(None, 1)
+    keyword = words[0].upper() if words else ""
+    return keyword if keyword in OPERATIONS else "OTHER"
+
+
+class StatementStats:
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.duration_sum = 0.0
+        self.rows = 0
+
+
+class StatementTelemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], StatementStats] = {}
+
+    def observe(self, engine: str, op: str, seconds: float, rows: int):
+        bucket = next(
+            (i for i, bound in enumerate(DURATION_BUCKETS) if seconds <= bound),
+            len(DURATION_BUCKETS)
+        )
+        with self._lock:
+            stats = self._stats.get((engine, op))
+            if stats is None:
+                stats = self._stats[(engine, op)] = StatementStats()
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.duration_sum += seconds
+            stats.rows += rows
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Totals per (engine, operation), with a cumulative duration histogram"""
+        with self._lock:
+            snapshot = []
+            for (engine, op), stats in sorted(self._stats.items()):
+                cumulative, histogram = 0, []
+                for bound, count in zip(list(DURATION_BUCKETS) + ["+Inf"], stats.buckets):
+                    cumulative += count
+                    histogram.append({"le": str(bound), "count": cumulative})
+                snapshot.append({
+                    "engine": engine,
+                    "operation": op,
+                    "count": stats.count,
+                    "rows": stats.rows,
+                    "duration_seconds_sum": stats.duration_sum,
+                    "duration_histogram": histogram,
+                })
+            return snapshot
+
+
+statement_telemetry = StatementTelemetry()
+
+
+def instrument(engine: Engine, name: str):
+    """Time the statements ``engine`` runs; ``name`` labels them"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._instrumentation_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_instrumentation_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        rows = max(cursor.rowcount, 0)
+        statement_telemetry.observe(name, operation(statement), elapsed, rows)
+        stats = telemetry.current()
+        if stats is not None:
+            stats.phases["sql"] += elapsed
+            stats.statements += 1
+            stats.rows += rows
+
+
+def instrument_orm():
+    """Time ORM statement execution and count hydrated objects, per request"""
+
+    @event.listens_for(Session, "do_orm_execute")
+    def do_orm_execute(orm_execute_state):
+        stats = telemetry.current()
+        if stats is None:
+            return None
+        phases = stats.phases
+        claimed = phases["pool"] + phases["sql"]
+        started = time.perf_counter()
+        result = orm_execute_state.invoke_statement()
+        # Statements buffered by async sessions are hydrated here too
+        elapsed = time.perf_counter() - started - (phases["pool"] + phases["sql"] - claimed)
+        phases["orm"] += max(0.0, elapsed)
+        return result
+
+    @event.listens_for(Mapper, "load")
+    def load(target, context):
+        stats = telemetry.current()
+        if stats is not None:
+            stats.orm_objects += 1
@@ -0,0 +1,115 @@
+"""Connection pool instrumentation.
+
+The engines in ``app.db.base`` use the queue pools below, which time every
+checkout and record it against the pool's logging name ("sync" or
+"async"). ``snapshot`` reports current occupancy, a cumulative checkout
+wait histogram, and counts of overflow connections and timeouts, which
+shows pool starvation before request latency does. Checkouts made for a
+request also count towards its ``pool`` phase.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core import telemetry as request_telemetry
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolTelemetry:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pool: Optional[QueuePool] = None
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_sum = 0.0
+        self._checkouts = 0
+        self._overflow_checkouts = 0
+        self._timeouts = 0
+
+    def observe(self, pool: QueuePool, seconds: float, timed_out: bool = False):
+        """Record one checkout attempt that waited ``seconds``"""
+        elapsed_ms = seconds * 1000
+        bucket = next(
+            (i for i, bound in enumerate(WAIT_BUCKETS_MS) if elapsed_ms <= bound),
+            len(WAIT_BUCKETS_MS)
+        )
+        with self._lock:
+            self._pool = pool
+            self._buckets[bucket] += 1
+            self._wait_sum += seconds
+            if timed_out:
+                self._timeouts += 1
+                return
+            self._checkouts += 1
+            # Past pool_size, every checkout holds an overflow connection
+            if pool.checkedout() > pool.size():
+                self._overflow_checkouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            pool = self._pool
+            cumulative, histogram = 0, []
+            for bound, count in zip(list(WAIT_BUCKETS_MS) + ["+Inf"], self._buckets):
+                cumulative += count
+                histogram.append({"le": str(bound), "count": cumulative})
+            stats = {
+                "name": self.name,
+                "checkouts": self._checkouts,
+                "overflow_checkouts": self._overflow_checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds_sum": self._wait_sum,
+                "wait_histogram_ms": histogram,
+            }
+        stats.update({
+            "pool_size": pool.size() if pool else None,
+            "checked_out": pool.checkedout() if pool else None,
+            "checked_in": pool.checkedin() if pool else None,
+            "overflow": pool.overflow() if pool else None,
+        })
+        return stats
+
+
+_telemetry: Dict[str, PoolTelemetry] = {}
+_telemetry_lock = threading.Lock()
+
+
+def telemetry_for(name: str) -> PoolTelemetry:
+    with _telemetry_lock:
+        if name not in _telemetry:
+            _telemetry[name] = PoolTelemetry(name)
+        return _telemetry[name]
+
+
+def snapshot() -> List[Dict[str, Any]]:
+    """Stats for every instrumented pool that has served a checkout"""
+    with _telemetry_lock:
+        telemetry = list(_telemetry.values())
+    return [t.snapshot() for t in telemetry]
+
+
+class _InstrumentedPoolMixin:
+    def connect(self):
+        # _orig_logging_name survives Pool.recreate(), e.g. after dispose()
+        telemetry = telemetry_for(self._orig_logging_name or "default")
+        with request_telemetry.phase("pool"):
+            start = time.perf_counter()
+            try:
+                connection = super().connect()
+            except PoolTimeoutError:
+                telemetry.observe(self, time.perf_counter() - start, timed_out=True)
+                raise
+            telemetry.observe(self, time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
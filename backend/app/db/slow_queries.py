@@ -0,0 +1,281 @@
+"""Slow query log with statement fingerprints.
+
+``attach`` hooks an engine's cursor events. Every statement is reduced to
+a fingerprint: comments dropped, literals and bind parameters replaced by
+``?``, IN lists and multi-row VALUES collapsed, monthly partition names
+reduced to ``_YYYY_MM`` and whitespace normalized, so each access path is
+one entry whatever its parameters. Each fingerprint keeps its call count,
+total and max time, and the durations of its latest ``SLOW_QUERY_WINDOW``
+executions for percentiles, along with the routes that issued it.
+
+Executions slower than ``SLOW_QUERY_MS`` are logged, and their plan is
+captured with EXPLAIN (EXPLAIN QUERY PLAN on SQLite) on the same
+connection, in the same transaction and with the same parameters, at most
+once per ``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds per fingerprint. Plain
+EXPLAIN only plans the statement, it does not run it again.
+
+``report`` ranks fingerprints for /admin/slow-queries, by total time by
+default: what to fix first is what costs the most overall.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import telemetry
+from app.core.config import settings
+from app.db.instrumentation import operation
+
+logger = logging.getLogger(__name__)
+
+# Statements whose plan is captured; EXPLAIN of these never writes
+EXPLAINED_OPERATIONS = {"SELECT", "WITH", "UPDATE", "DELETE"}
+
+# Normalized statements are cached by statement text, which SQLAlchemy's
+# compiled cache reuses, so most executions skip the regexes
+_FINGERPRINT_CACHE_SIZE = 4096
+
+# report() rankings and the stat each sorts on
+SLOW_QUERY_SORTS = {
+    "total": "total_ms",
+    "mean": "mean_ms",
+    "p95": "p95_ms",
+    "max": "max_ms",
+    "calls": "calls",
+    "slow_calls": "slow_calls",
+}
+
+_ROUTES_KEPT = 10  # most frequent callers reported per fingerprint
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_MONTHS = re.compile(r"\b(\w+?)_\d{4}_\d{2}\b")
+_WHITESPACE = re.compile(r"\s+")
+_TUPLE = r"\(\s*\?(?:\s*,\s*\?)*\s*\)"
+_VALUES_ROWS = re.compile(rf"({_TUPLE})(?:\s*,\s*{_TUPLE})+")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.I)
+
+
+def normalize(statement: str) -> str:
+    """``statement`` with everything that varies between calls of the same
+    access path replaced"""
+    statement = _COMMENTS.sub(" ", statement)
+    statement = _STRINGS.sub("?", statement)
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _NUMBERS.sub("?", statement)
+    statement = _MONTHS.sub(r"\1_YYYY_MM", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _VALUES_ROWS.sub(r"\1", statement)
+    return _IN_LIST.sub("IN (?)", statement)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.md5(normalized.encode()).hexdigest()[:16]
+
+
+class QueryStats:
+    def __init__(self, fingerprint: str, statement: str, op: str, window: int):
+        self.fingerprint = fingerprint
+        self.statement = statement
+        self.operation = op
+        self.durations: Deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.slow_calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.routes: Counter = Counter()
+        self.first_seen = datetime.now()
+        self.last_seen = self.first_seen
+        self.last_slow_at: Optional[datetime] = None
+        self.plan: Optional[List[str]] = None
+        self.plan_error: Optional[str] = None
+        self.plan_captured_at: Optional[datetime] = None
+        self.plan_duration: Optional[float] = None
+        self.explained_at: Optional[float] = None  # monotonic, for the explain interval
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: "OrderedDict[str, QueryStats]" = OrderedDict()
+        self._normalized: Dict[str, Tuple[str, str]] = {}
+
+    def _fingerprint(self, statement: str) -> Tuple[str, str]:
+        cached = self._normalized.get(statement)
+        if cached is None:
+            normalized = normalize(statement)
+            if len(self._normalized) >= _FINGERPRINT_CACHE_SIZE:
+                self._normalized.clear()
+            cached = self._normalized[statement] = (fingerprint(normalized), normalized)
+        return cached
+
+    def observe(self, statement: str, seconds: float, rows: int) -> Tuple[QueryStats, bool]:
+        """Record one execution; returns its stats and whether to capture
+        its plan now"""
+        key, normalized = self._fingerprint(statement)
+        stats = telemetry.current()
+        route = stats.route() if stats is not None else None
+        slow = seconds * 1000 >= settings.SLOW_QUERY_MS
+        with self._lock:
+            query = self._stats.get(key)
+            if query is None:
+                query = self._stats[key] = QueryStats(
+                    key, normalized, operation(normalized), settings.SLOW_QUERY_WINDOW
+                )
+                # Forget the longest-unseen fingerprints past the limit
+                while len(self._stats) > settings.SLOW_QUERY_MAX_FINGERPRINTS:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(key)
+            query.durations.append(seconds)
+            query.calls += 1
+            query.total += seconds
+            query.max = max(query.max, seconds)
+            query.rows += rows
+            query.last_seen = datetime.now()
+            if route is not None:
+                query.routes[route] += 1
+            explain = False
+            if slow:
+                query.slow_calls += 1
+                query.last_slow_at = query.last_seen
+                now = time.monotonic()
+                if (settings.SLOW_QUERY_EXPLAIN and query.operation in EXPLAINED_OPERATIONS
+                        and (query.explained_at is None
+                             or now - query.explained_at >= settings.SLOW_QUERY_EXPLAIN_INTERVAL)):
+                    query.explained_at = now
+                    explain = True
+        return query, explain
+
+    def record_plan(self, query: QueryStats, seconds: float, plan: Optional[List[str]], error: Optional[str]):
+        with self._lock:
+            query.plan, query.plan_error = plan, error
+            query.plan_captured_at = datetime.now()
+            query.plan_duration = seconds
+
+    def report(self, sort: str = "total", limit: int = 20) -> List[Dict[str, Any]]:
+        """The ``limit`` most expensive fingerprints by ``SLOW_QUERY_SORTS[sort]``"""
+        with self._lock:
+            queries = [(query, sorted(query.durations)) for query in self._stats.values()]
+            entries = []
+            for query, durations in queries:
+                entries.append({
+                    "fingerprint": query.fingerprint,
+                    "statement": query.statement,
+                    "operation": query.operation,
+                    "calls": query.calls,
+                    "slow_calls": query.slow_calls,
+                    "rows": query.rows,
+                    "total_ms": query.total * 1000,
+                    "mean_ms": query.total / query.calls * 1000,
+                    "p50_ms": _percentile(durations, 0.50) * 1000,
+                    "p95_ms": _percentile(durations, 0.95) * 1000,
+                    "p99_ms": _percentile(durations, 0.99) * 1000,
+                    "max_ms": query.max * 1000,
+                    "routes": dict(query.routes.most_common(_ROUTES_KEPT)),
+                    "first_seen": query.first_seen,
+                    "last_seen": query.last_seen,
+                    "last_slow_at": query.last_slow_at,
+                    "plan": query.plan,
+                    "plan_error": query.plan_error,
+                    "plan_captured_at": query.plan_captured_at,
+                    "plan_duration_ms": query.plan_duration * 1000 if query.plan_duration is not None else None,
+                })
+        entries.sort(key=lambda entry: entry[SLOW_QUERY_SORTS[sort]], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def _percentile(durations: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted ``durations``"""
+    if not durations:
+        return 0.0
+    return durations[min(len(durations) - 1, int(q * len(durations)))]
+
+
+def explain(conn, statement: str, parameters) -> List[str]:
+    """The plan of ``statement`` on ``conn``'s DBAPI connection, one line
+    per plan node"""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        sql = f"EXPLAIN QUERY PLAN {statement}"
+    elif dialect == "postgresql":
+        sql = f"EXPLAIN {statement}"
+    else:
+        raise NotImplementedError(f"No EXPLAIN for {dialect}")
+
+    cursor = conn.connection.cursor()
+    try:
+        if dialect == "postgresql":
+            # A failed statement would abort the caller's transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(sql, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            finally:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return [row[0] for row in rows]
+
+        cursor.execute(sql, parameters)
+        depths: Dict[int, int] = {}
+        plan = []
+        for node, parent, _, detail in cursor.fetchall():
+            depths[node] = depths.get(parent, -1) + 1
+            plan.append("  " * depths[node] + detail)
+        return plan
+    finally:
+        cursor.close()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def attach(engine: Engine, name: str):
+    """Feed the statements ``engine`` runs to the slow query log; ``name``
+    labels its log lines"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        query, capture = slow_query_log.observe(statement, elapsed, max(cursor.rowcount, 0))
+        if elapsed * 1000 < settings.SLOW_QUERY_MS:
+            return
+
+        logger.warning("Slow query on %s engine (%.1f ms, fingerprint %s): %s",
+                       name, elapsed * 1000, query.fingerprint, query.statement)
+        # Server-side cursors still hold their rows; batches have no single plan
+        if not capture or executemany or context.execution_options.get("stream_results"):
+            return
+        if (conn.dialect.name == "postgresql"
+                and conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT"):
+            return
+        try:
+            plan, error = explain(conn, statement, parameters), None
+        except Exception as exc:
+            plan, error = None, repr(exc)
+            logger.warning("Could not EXPLAIN slow query %s: %r", query.fingerprint, exc)
+        slow_query_log.record_plan(query, elapsed, plan, error)
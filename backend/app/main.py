@@ -1,16 +1,56 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import prometheus
 from app.core.config import settings
-from app.api.endpoints import dashboard, metrics
-from app.db.base import Base, engine
+from app.core.telemetry import InstrumentationMiddleware, TimedJSONResponse, instrument_fastapi
+from app.api.endpoints import admin, analytics, dashboard, live, metrics
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.db import dimensions
+from app.db.base import SessionLocal
+from app.db.init_db import init_db
+from app.services import catalog, partitions, rollups
+from app.services.latest_cache import latest_values
+from app.services.live import live_hub
+from app.services.recent_store import recent_store
+from app.services.response_cache import CACHE_STATUS_HEADER, response_cache
+from app.services.scheduler import scheduler
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create the tables of a new database; existing ones are upgraded with
+# `alembic upgrade head`
+init_db()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Queries translate names through these caches without loading them
+    dimensions.reload()
+    db = SessionLocal()
+    try:
+        # Backfill rollups for history loaded before they existed; before
+        # retention, which treats rollups as the record of dropped months
+        rollups.ensure_built(db)
+        catalog.ensure_built(db)
+        if settings.METRICS_PARTITIONING:
+            partitions.maintain(db)
+        latest_values.warm(db)
+        if settings.RECENT_STORE_ENABLED:
+            recent_store.warm(db)
+    finally:
+        db.close()
+    await response_cache.start()
+    await live_hub.start()
+    await scheduler.start()
+    yield
+    await scheduler.stop()
+    await live_hub.stop()
+    await response_cache.stop()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse
 )
 
 # Set up CORS
@@ -20,11 +60,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, CACHE_STATUS_HEADER],
 )
 
+# Per-route timings for /metrics; outermost, so CORS counts too
+if settings.INSTRUMENTATION_ENABLED:
+    instrument_fastapi()
+    app.add_middleware(InstrumentationMiddleware)
+
 # Include routers
 app.include_router(dashboard.router, prefix="/api/v1/dashboards", tags=["dashboards"])
 app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["metrics"])
+app.include_router(analytics.router, prefix="/api/v1/metrics/analytics", tags=["analytics"])
+app.include_router(live.router, prefix="/api/v1/live", tags=["live"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
 @app.get("/")
 def read_root():
@@ -37,3 +86,8 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics():
+    """Request, SQL and connection pool telemetry in Prometheus text format"""
+    return Response(prometheus.render(), media_type=prometheus.CONTENT_TYPE)
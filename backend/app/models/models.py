@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, String, Float, DateTime, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
+from app.db.dimensions import Dimension, cities, metric_types, sources
 
 class User(Base):
     __tablename__ = "users"
@@ -29,7 +30,7 @@ class Dashboard(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     owner = relationship("User", back_populates="dashboards")
-    widgets = relationship("Widget", back_populates="dashboard", cascade="all, delete-orphan")
+    widgets = relationship("Widget", back_populates="dashboard", cascade="all, delete-orphan", order_by="Widget.id")
 
 class Widget(Base):
     __tablename__ = "widgets"
@@ -47,15 +48,108 @@ class Widget(Base):
     
     dashboard = relationship("Dashboard", back_populates="widgets")
 
+# Dimension tables: each distinct name once, referenced by small-integer id.
+# SQLite only auto-assigns ids to INTEGER PRIMARY KEY columns.
+DIMENSION_ID = SmallInteger().with_variant(Integer, "sqlite")
+
+class City(Base):
+    __tablename__ = "cities"
+    
+    id = Column(DIMENSION_ID, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class MetricType(Base):
+    __tablename__ = "metric_types"
+    
+    id = Column(DIMENSION_ID, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class Source(Base):
+    __tablename__ = "sources"
+    
+    id = Column(DIMENSION_ID, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
 class CityMetric(Base):
     __tablename__ = "city_metrics"
     
     id = Column(Integer, primary_key=True, index=True)
-    city = Column(String, nullable=False, index=True)
-    metric_type = Column(String, nullable=False, index=True)  # population, traffic, air_quality, etc.
+    # Names in Python, dimension ids in the database (see app.db.dimensions).
+    # No foreign keys: the dimension tables are append-only, and a check per
+    # inserted row would only slow ingestion.
+    city = Column("city_id", Dimension(cities), nullable=False, key="city")
+    metric_type = Column("metric_type_id", Dimension(metric_types), nullable=False, index=True, key="metric_type")  # population, traffic, air_quality, etc.
     value = Column(Float, nullable=False)
     unit = Column(String)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
-    source = Column(String)
+    source = Column("source_id", Dimension(sources), key="source")
     meta_data = Column(JSON)  # Changed from 'metadata' to 'meta_data'
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Serves every hot read: equality on city + metric_type, then a
+        # timestamp range or ORDER BY timestamp. Leading on city also makes
+        # a separate city index redundant. On Postgres value/unit are
+        # INCLUDEd so aggregate scans are index-only.
+        Index(
+            "ix_city_metrics_city_type_ts",
+            "city", "metric_type", "timestamp",
+            postgresql_include=["value", "unit"]
+        ),
+    )
+
+class MetricRollup(Base):
+    __tablename__ = "metric_rollups"
+    
+    id = Column(Integer, primary_key=True)
+    city = Column("city_id", Dimension(cities), nullable=False, key="city")
+    metric_type = Column("metric_type_id", Dimension(metric_types), nullable=False, key="metric_type")
+    unit = Column(String, nullable=False, default="")  # '' when the raw unit is NULL
+    resolution = Column(String, nullable=False)  # 'minute', 'hour', 'day'
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    value_count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index(
+            "ux_metric_rollups_bucket",
+            "city", "metric_type", "resolution", "bucket_start", "unit",
+            unique=True
+        ),
+        # A day's buckets, for the scheduled refresh and range deletes
+        Index("ix_metric_rollups_bucket_start", "bucket_start"),
+    )
+
+class MetricSeries(Base):
+    """Catalog entry of one (city, metric_type, unit) series, kept current
+    by ingestion in the same transaction as the raw rows"""
+    __tablename__ = "metric_series"
+    
+    id = Column(Integer, primary_key=True)
+    city = Column("city_id", Dimension(cities), nullable=False, key="city")
+    metric_type = Column("metric_type_id", Dimension(metric_types), nullable=False, key="metric_type")
+    unit = Column(String, nullable=False, default="")  # '' when the raw unit is NULL
+    first_seen = Column(DateTime(timezone=True), nullable=False)  # earliest reading timestamp
+    last_seen = Column(DateTime(timezone=True), nullable=False)  # latest reading timestamp
+    row_count = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index("ux_metric_series", "city", "metric_type", "unit", unique=True),
+    )
+
+class ScheduledJob(Base):
+    """Lease and last-run record of a leader-only background job"""
+    __tablename__ = "scheduled_jobs"
+    
+    name = Column(String, primary_key=True)
+    owner = Column(String)  # worker holding the lease
+    lease_expires_at = Column(DateTime(timezone=True))
+    last_started_at = Column(DateTime(timezone=True))
+    last_finished_at = Column(DateTime(timezone=True))
+    last_duration_ms = Column(Float)
+    last_status = Column(String)  # 'running', 'ok' or 'error'
+    last_error = Column(Text)
+    runs = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,83 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class HistogramBucket(BaseModel):
+    le: str
+    count: int
+
+class PoolStats(BaseModel):
+    name: str
+    pool_size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    overflow_checkouts: int
+    timeouts: int
+    wait_seconds_sum: float
+    wait_histogram_ms: List[HistogramBucket]
+
+class LiveStats(BaseModel):
+    backend: str
+    subscriptions: int
+    topics: int
+    published: int
+    delivered: int
+    dropped: int
+
+class PartitionInfo(BaseModel):
+    name: str
+    start: datetime
+    end: datetime
+
+class PartitionMaintenance(BaseModel):
+    created: List[str]  # partitions created (Postgres) or months rotated out (SQLite)
+    dropped: List[str]
+
+class JobStatus(BaseModel):
+    name: str
+    interval_seconds: int
+    leader_only: bool  # runs on one worker at a time rather than on every worker
+    leader: Optional[str] = None  # worker holding the lease
+    is_leader: bool  # whether that is this worker
+    lease_expires_at: Optional[datetime] = None
+    next_run_in_seconds: float  # when this worker next runs or tries to take the lease
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_status: Optional[str] = None  # 'running', 'ok' or 'error'
+    last_error: Optional[str] = None
+    runs: int
+    failures: int
+    skipped: int  # times this worker found the lease held by another
+
+class RecentStoreStats(BaseModel):
+    warmed: bool
+    series: int
+    readings: int
+    bytes: int  # array memory across all series
+    capacity: int  # readings kept per series
+    hours: int
+
+class SlowQueryStats(BaseModel):
+    fingerprint: str
+    statement: str  # normalized: literals and parameters replaced by ?
+    operation: str
+    calls: int
+    slow_calls: int  # executions taking SLOW_QUERY_MS or more
+    rows: int  # rows the driver reported
+    total_ms: float
+    mean_ms: float
+    p50_ms: float  # percentiles over the latest SLOW_QUERY_WINDOW executions
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    routes: Dict[str, int]  # calls per route template, most frequent first
+    first_seen: datetime
+    last_seen: datetime
+    last_slow_at: Optional[datetime] = None
+    plan: Optional[List[str]] = None  # EXPLAIN of the latest slow execution captured
+    plan_error: Optional[str] = None
+    plan_captured_at: Optional[datetime] = None
+    plan_duration_ms: Optional[float] = None  # how long the explained execution took
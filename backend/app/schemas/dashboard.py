@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from app.schemas.metrics import SeriesResponse
 
 class WidgetBase(BaseModel):
     widget_type: str
@@ -48,3 +49,14 @@ class DashboardResponse(DashboardListResponse):
     
     class Config:
         from_attributes = True
+
+class WidgetData(BaseModel):
+    widget_id: int
+    series_key: Optional[str] = None  # key into DashboardSnapshot.series
+    error: Optional[str] = None
+
+class DashboardSnapshot(BaseModel):
+    dashboard: DashboardResponse
+    widgets: List[WidgetData]
+    series: Dict[str, SeriesResponse]
+    generated_at: datetime
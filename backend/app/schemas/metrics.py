@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class MetricBase(BaseModel):
     city: str
@@ -11,7 +11,9 @@ class MetricBase(BaseModel):
     meta_data: Optional[Dict[str, Any]] = None
 
 class MetricCreate(MetricBase):
-    pass
+    # Readings from sensor gateways carry their own timestamp; when omitted
+    # the ingestion service stamps the reading at write time.
+    timestamp: Optional[datetime] = None
 
 class MetricResponse(MetricBase):
     id: int
@@ -21,8 +23,67 @@ class MetricResponse(MetricBase):
     class Config:
         from_attributes = True
 
+# Columns read paths select to build MetricResponse JSON without validation
+METRIC_FIELDS = tuple(MetricResponse.model_fields)
+
 class MetricAggregate(BaseModel):
     date: str
     value: float
     unit: str
     aggregation_type: str
+
+class BatchAck(BaseModel):
+    batch: int
+    start_index: int
+    accepted: int
+    rejected: int
+    errors: List[Dict[str, Any]] = []
+
+class BulkIngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    batches: List[BatchAck]
+
+class SeriesKey(BaseModel):
+    city: str
+    metric_type: str
+
+class SeriesInfo(BaseModel):
+    city: str
+    metric_type: str
+    unit: Optional[str] = None
+    first_seen: datetime  # earliest reading timestamp
+    last_seen: datetime  # latest reading timestamp
+    row_count: int  # readings ingested, including any retention has since dropped
+
+class LatestCacheCheck(BaseModel):
+    consistent: bool
+    series: int
+    missing: List[SeriesKey]
+    extra: List[SeriesKey]
+    stale: List[SeriesKey]
+
+class SeriesPoint(BaseModel):
+    timestamp: datetime
+    value: float
+
+class SeriesResponse(BaseModel):
+    city: str
+    metric_type: str
+    unit: Optional[str] = None
+    source: str  # 'raw' or the rollup resolution the points were read from
+    method: str
+    total_points: int
+    points: List[SeriesPoint]
+
+class AnalyticsSeriesResponse(BaseModel):
+    city: str
+    metric_type: str
+    count: int  # raw readings the result was computed from
+    points: List[SeriesPoint]
+
+class PercentilesResponse(BaseModel):
+    city: str
+    metric_type: str
+    count: int
+    percentiles: Dict[str, Optional[float]]
@@ -0,0 +1,109 @@
+"""Vectorized analytics over a single (city, metric_type) series.
+
+Series are loaded once into contiguous datetime64[ns] / float64 arrays and
+every computation runs over whole arrays in NumPy or pandas rather than
+looping over rows in Python. Timezone-aware timestamps are normalized to
+naive UTC.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.services import partitions
+from app.services.recent_store import recent_store
+
+RESAMPLE_METHODS = ("mean", "min", "max", "sum", "count", "median", "first", "last")
+
+
+class MetricSeries:
+    """Contiguous column arrays for one metric series, ordered by time"""
+
+    __slots__ = ("timestamps", "values")
+
+    def __init__(self, timestamps: np.ndarray, values: np.ndarray):
+        self.timestamps = timestamps
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_pandas(self) -> pd.Series:
+        return pd.Series(self.values, index=pd.DatetimeIndex(self.timestamps), copy=False)
+
+
+def _to_datetime64(timestamps: List[datetime]) -> np.ndarray:
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.to_numpy(dtype="datetime64[ns]")
+
+
+def load_series(db: Session, city: str, metric_type: str, start: Optional[datetime] = None) -> MetricSeries:
+    """Load one series into column arrays, from the recent store when it
+    covers the window and straight from column tuples otherwise"""
+    if start is not None and recent_store.covers(city, metric_type, start):
+        timestamps, values = recent_store.arrays(city, metric_type, start)
+        return MetricSeries(timestamps.astype("datetime64[ns]"), values)
+
+    source = partitions.metrics_source(db, start)
+    query = select(source.timestamp, source.value).where(
+        source.city == city,
+        source.metric_type == metric_type,
+        source.timestamp.is_not(None)
+    )
+    if start is not None:
+        query = query.where(source.timestamp >= start)
+    rows = db.execute(query.order_by(source.timestamp, source.id)).all()
+
+    timestamps = _to_datetime64([row[0] for row in rows])
+    values = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return MetricSeries(timestamps, values)
+
+
+def rolling_mean(series: MetricSeries, window: str) -> pd.Series:
+    """Mean over a trailing time window such as '1h' or '30min'"""
+    return series.to_pandas().rolling(window).mean()
+
+
+def percentiles(series: MetricSeries, qs: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Value at each requested percentile (0-100); None for an empty series"""
+    if len(series) == 0:
+        return {f"p{q:g}": None for q in qs}
+    results = np.percentile(series.values, qs)
+    return {f"p{q:g}": float(result) for q, result in zip(qs, results)}
+
+
+def rate_of_change(series: MetricSeries, per: timedelta = timedelta(hours=1)) -> Tuple[np.ndarray, np.ndarray]:
+    """Change in value per ``per`` between consecutive readings.
+
+    Each rate is stamped with the later reading. Pairs sharing a timestamp
+    have no defined rate and are dropped.
+    """
+    if len(series) < 2:
+        return series.timestamps[:0], series.values[:0]
+    seconds = np.diff(series.timestamps).astype("timedelta64[ns]").astype(np.int64) / 1e9
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.diff(series.values) / seconds * per.total_seconds()
+    keep = np.isfinite(rates)
+    return series.timestamps[1:][keep], rates[keep]
+
+
+def resample(series: MetricSeries, rule: str, how: str = "mean") -> pd.Series:
+    """Aggregate onto a regular grid such as '15min' or '1D', dropping empty bins"""
+    resampled = getattr(series.to_pandas().resample(rule), how)()
+    return resampled[resampled.notna()]
+
+
+def to_points(timestamps: Any, values: Any) -> List[Dict[str, Any]]:
+    """Serialize parallel timestamp/value arrays into point dicts"""
+    timestamps = pd.DatetimeIndex(timestamps).to_pydatetime()
+    values = np.asarray(values, dtype=np.float64)
+    keep = ~np.isnan(values)
+    return [
+        {"timestamp": timestamp, "value": value}
+        for timestamp, value in zip(timestamps[keep], values[keep].tolist())
+    ]
@@ -0,0 +1,193 @@
+"""Parquet cold storage for raw city metrics.
+
+``export`` streams readings out of the database in chunks of
+``METRICS_ARCHIVE_CHUNK_ROWS`` and writes one Parquet file per city, metric
+type and day under ``METRICS_ARCHIVE_DIR``:
+
+    city=<city>/metric_type=<metric_type>/date=YYYY-MM-DD/part-0.parquet
+
+Path segments are percent-encoded and the layout is Hive-style, so the tree
+can be opened directly as a partitioned dataset by pyarrow, pandas, DuckDB
+or Spark. Re-exporting a day replaces its file.
+
+Retention exports each month before dropping it, and ``aggregate_daily``
+answers ``/metrics/aggregate`` for days past the retention cutoff by
+memory-mapping just the files for the requested series and days.
+"""
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import FromClause
+
+from app.core.config import settings
+from app.services import rollups
+
+FILE_NAME = "part-0.parquet"
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("timestamp", pa.timestamp("us")),
+    ("value", pa.float64()),
+    ("unit", pa.string()),
+    ("source", pa.string()),
+    ("meta_data", pa.string()),  # JSON text
+    ("created_at", pa.timestamp("us")),
+])
+
+
+def enabled() -> bool:
+    return bool(settings.METRICS_ARCHIVE_DIR)
+
+
+def series_dir(city: str, metric_type: str) -> Path:
+    return Path(settings.METRICS_ARCHIVE_DIR) / f"city={quote(city, safe='')}" / f"metric_type={quote(metric_type, safe='')}"
+
+
+def day_path(city: str, metric_type: str, day: date) -> Path:
+    return series_dir(city, metric_type) / f"date={day.isoformat()}" / FILE_NAME
+
+
+def _naive(timestamp: Optional[datetime]) -> Optional[datetime]:
+    return timestamp.replace(tzinfo=None) if timestamp is not None else None
+
+
+class _DayWriter:
+    """Writes one day file, replacing the old one only once it is complete"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+        self.writer = pq.ParquetWriter(self.tmp_path, SCHEMA)
+
+    def write(self, rows: List[Tuple]):
+        columns = list(zip(*rows))
+        self.writer.write_batch(pa.record_batch([
+            pa.array(columns[0], pa.int64()),
+            pa.array([_naive(timestamp) for timestamp in columns[1]], pa.timestamp("us")),
+            pa.array(columns[2], pa.float64()),
+            pa.array(columns[3], pa.string()),
+            pa.array(columns[4], pa.string()),
+            pa.array([json.dumps(meta) if meta is not None else None for meta in columns[5]], pa.string()),
+            pa.array([_naive(timestamp) for timestamp in columns[6]], pa.timestamp("us")),
+        ], schema=SCHEMA))
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def export(db: Session, source: FromClause, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+    """Write every reading of ``source`` in [start, end) to the archive.
+
+    ``source`` is a Core selectable with the ``city_metrics`` columns, e.g.
+    ``partitions.raw_source``. Bounds are widened to whole days so each
+    day file is always complete. Rows are read ``METRICS_ARCHIVE_CHUNK_ROWS``
+    at a time in (city, metric_type, timestamp) order, so only one file is
+    open at once and memory stays flat however large the range is.
+    """
+    query = select(
+        source.c.city,
+        source.c.metric_type,
+        source.c.id,
+        source.c.timestamp,
+        source.c.value,
+        source.c.unit,
+        source.c.source,
+        source.c.meta_data,
+        source.c.created_at
+    ).where(source.c.timestamp.is_not(None))
+    if start is not None:
+        query = query.where(source.c.timestamp >= rollups.truncate(start, "day"))
+    if end is not None:
+        query = query.where(source.c.timestamp < rollups.ceil(end, "day"))
+    query = query.order_by(source.c.city, source.c.metric_type, source.c.timestamp, source.c.id)
+
+    files = rows = 0
+    current_key, writer, pending = None, None, []
+    try:
+        result = db.execute(query.execution_options(yield_per=settings.METRICS_ARCHIVE_CHUNK_ROWS))
+        for chunk in result.partitions():
+            for city, metric_type, *row in chunk:
+                key = (city, metric_type, row[1].date())
+                if key != current_key:
+                    if pending:
+                        writer.write(pending)
+                        pending = []
+                    if writer is not None:
+                        writer.close()
+                        files += 1
+                    current_key, writer = key, _DayWriter(day_path(*key))
+                pending.append(row)
+                rows += 1
+            if pending:
+                writer.write(pending)
+                pending = []
+        if writer is not None:
+            writer.close()
+            files += 1
+            writer = None
+    finally:
+        if writer is not None:
+            writer.writer.close()
+            writer.tmp_path.unlink(missing_ok=True)
+    return {"files": files, "rows": rows}
+
+
+def archived_days(city: str, metric_type: str, start: date, end: date) -> List[date]:
+    """Days in [start, end) that have a file for the series"""
+    directory = series_dir(city, metric_type)
+    if not directory.is_dir():
+        return []
+    days = []
+    for entry in os.listdir(directory):
+        if not entry.startswith("date="):
+            continue
+        day = date.fromisoformat(entry[len("date="):])
+        if start <= day < end and (directory / entry / FILE_NAME).is_file():
+            days.append(day)
+    return sorted(days)
+
+
+def aggregate_daily(city: str, metric_type: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Daily count/sum/min/max per unit for archived readings in [start, end).
+
+    Same shape as ``rollups.aggregate_daily``. Only the value, unit and
+    timestamp columns of the matching day files are read, memory-mapped.
+    """
+    start, end = _naive(start), _naive(end)
+    stats = []
+    for day in archived_days(city, metric_type, start.date(), end.date() + timedelta(days=1)):
+        table = pq.read_table(day_path(city, metric_type, day), columns=["timestamp", "value", "unit"], memory_map=True)
+        day_start = datetime.combine(day, datetime.min.time())
+        if start > day_start or end < day_start + timedelta(days=1):
+            timestamps = table["timestamp"]
+            table = table.filter(pc.and_(
+                pc.greater_equal(timestamps, pa.scalar(start, pa.timestamp("us"))),
+                pc.less(timestamps, pa.scalar(end, pa.timestamp("us")))
+            ))
+        if table.num_rows == 0:
+            continue
+        table = table.set_column(2, "unit", pc.fill_null(table["unit"], ""))
+        grouped = table.group_by("unit").aggregate([
+            ("value", "count"), ("value", "sum"), ("value", "min"), ("value", "max")
+        ])
+        for group in grouped.to_pylist():
+            stats.append({
+                "date": day.isoformat(),
+                "unit": group["unit"],
+                "count": group["value_count"],
+                "sum": group["value_sum"],
+                "min": group["value_min"],
+                "max": group["value_max"],
+            })
+    return stats
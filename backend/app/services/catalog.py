@@ -0,0 +1,173 @@
+"""Catalog of known series: one ``metric_series`` row per (city,
+metric_type, unit) with its first and last reading timestamps and row
+count.
+
+Ingestion upserts the rows it writes into the catalog in the same
+transaction, so cities, metric types and series are listed from a table
+the size of the series count rather than by scanning readings. Like the
+rollups, the catalog is the record of everything ingested: retention
+dropping old months leaves counts and ``first_seen`` as they were.
+``rebuild`` recomputes it from the readings currently stored, for data
+loaded outside the ingestion service.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.models import City, MetricSeries, MetricType
+
+
+def apply_rows(db: Session, rows: Iterable[Dict[str, Any]]):
+    """Count freshly inserted metric rows into their series.
+
+    Does not commit; callers run this inside the transaction that wrote
+    the raw rows.
+    """
+    deltas: Dict[Tuple[str, str, str], List] = {}
+    for row in rows:
+        key = (row["city"], row["metric_type"], row.get("unit") or "")
+        timestamp = row["timestamp"]
+        current = deltas.get(key)
+        if current is None:
+            deltas[key] = [timestamp, timestamp, 1]
+        else:
+            current[0] = min(current[0], timestamp)
+            current[1] = max(current[1], timestamp)
+            current[2] += 1
+
+    if not deltas:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+        least, greatest = func.least, func.greatest
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+        least, greatest = func.min, func.max
+    else:
+        raise NotImplementedError(f"The series catalog is not supported on {dialect}")
+
+    table = MetricSeries.__table__
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.city, table.c.metric_type, table.c.unit],
+        set_={
+            "first_seen": least(table.c.first_seen, stmt.excluded.first_seen),
+            "last_seen": greatest(table.c.last_seen, stmt.excluded.last_seen),
+            "row_count": table.c.row_count + stmt.excluded.row_count,
+        }
+    )
+    db.execute(stmt, [
+        {
+            "city": city,
+            "metric_type": metric_type,
+            "unit": unit,
+            "first_seen": first_seen,
+            "last_seen": last_seen,
+            "row_count": count,
+        }
+        for (city, metric_type, unit), (first_seen, last_seen, count) in deltas.items()
+    ])
+
+
+def rebuild(db: Session):
+    """Recompute every series from all raw readings"""
+    from app.services.partitions import raw_source
+
+    source = raw_source(db)
+    timestamp = source.c.timestamp
+    unit = func.coalesce(source.c.unit, "")
+    table = MetricSeries.__table__
+    db.execute(delete(table))
+    db.execute(insert(table).from_select(
+        ["city", "metric_type", "unit", "first_seen", "last_seen", "row_count"],
+        select(
+            source.c.city,
+            source.c.metric_type,
+            unit,
+            func.min(timestamp),
+            func.max(timestamp),
+            func.count()
+        ).where(
+            timestamp.is_not(None)
+        ).group_by(
+            source.c.city,
+            source.c.metric_type,
+            unit
+        )
+    ))
+    db.commit()
+
+
+def ensure_built(db: Session):
+    """Build the catalog once if raw metrics exist but no series do yet"""
+    from app.services.partitions import raw_source
+
+    has_series = db.execute(select(MetricSeries.id).limit(1)).first()
+    has_metrics = db.execute(select(raw_source(db).c.id).limit(1)).first()
+    if has_metrics and not has_series:
+        rebuild(db)
+
+
+def cities(db: Session) -> List[str]:
+    """Cities with at least one series, by name"""
+    query = select(City.name).where(City.id.in_(select(MetricSeries.__table__.c.city))).order_by(City.name)
+    return list(db.execute(query).scalars())
+
+
+def metric_types(db: Session) -> List[str]:
+    """Metric types with at least one series, by name"""
+    query = select(MetricType.name).where(
+        MetricType.id.in_(select(MetricSeries.__table__.c.metric_type))
+    ).order_by(MetricType.name)
+    return list(db.execute(query).scalars())
+
+
+def find_series(
+    db: Session,
+    prefix: Optional[str] = None,
+    city: Optional[str] = None,
+    metric_type: Optional[str] = None,
+    after: Optional[Tuple[str, str, str]] = None,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    """Series ordered by (city, metric_type, unit), optionally those whose
+    city or metric type starts with ``prefix`` (case-insensitive) and those
+    after the ``after`` key"""
+    table = MetricSeries.__table__
+    query = select(
+        City.name.label("city"),
+        MetricType.name.label("metric_type"),
+        table.c.unit,
+        table.c.first_seen,
+        table.c.last_seen,
+        table.c.row_count
+    ).select_from(
+        table
+    ).join(
+        City, City.id == table.c.city
+    ).join(
+        MetricType, MetricType.id == table.c.metric_type
+    )
+    if prefix:
+        query = query.where(or_(
+            City.name.istartswith(prefix, autoescape=True),
+            MetricType.name.istartswith(prefix, autoescape=True)
+        ))
+    if city:
+        query = query.where(City.name == city)
+    if metric_type:
+        query = query.where(MetricType.name == metric_type)
+    if after is not None:
+        query = query.where(tuple_(City.name, MetricType.name, table.c.unit) > tuple_(*after))
+    query = query.order_by(City.name, MetricType.name, table.c.unit).limit(limit)
+
+    series = []
+    for row in db.execute(query).mappings():
+        entry = dict(row)
+        # Stored as '' like the rollups; reported as in the readings
+        entry["unit"] = entry["unit"] or None
+        series.append(entry)
+    return series
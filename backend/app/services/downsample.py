@@ -0,0 +1,280 @@
+"""Server-side downsampling of metric series for charts.
+
+Wide windows are read from the rollup table at the coarsest resolution that
+still has at least as many buckets as the requested point count; narrow
+windows fall back to raw rows. ``get_series_many`` serves several requests
+with one statement per source table and resolution. Windows the recent
+store fully covers are answered from its ring buffers instead, raw or
+bucketed the same way. The result is then reduced to the target
+size with LTTB (largest triangle three buckets) or per-bucket min/max, both
+of which keep peaks and troughs that plain averaging would flatten.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.models import MetricRollup
+from app.services import partitions
+from app.services.recent_store import recent_store
+
+METHODS = ("lttb", "minmax")
+
+# (city, metric_type, window, points, method)
+SeriesRequest = Tuple[str, str, timedelta, int, str]
+
+# Unit placeholder for a rollup bucket merged from rows with different units
+_MIXED = object()
+
+_RESOLUTION_STEPS = (
+    ("day", timedelta(days=1)),
+    ("hour", timedelta(hours=1)),
+    ("minute", timedelta(minutes=1)),
+)
+
+_RANGE_PATTERN = re.compile(r"^(\d+)([mhd])$")
+_RANGE_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_range(value: str) -> Optional[timedelta]:
+    """Parse a window such as '1h', '24h', '7d' or '90m'; None if malformed"""
+    match = _RANGE_PATTERN.match(value)
+    if not match or int(match.group(1)) == 0:
+        return None
+    return timedelta(**{_RANGE_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def choose_resolution(window: timedelta, points: int) -> Optional[str]:
+    """Coarsest rollup resolution with at least ``points`` buckets in the window"""
+    for resolution, step in _RESOLUTION_STEPS:
+        if window / step >= points:
+            return resolution
+    return None
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Twice the triangle area between the previous pick, each candidate
+        # in this bucket and the average of the next bucket
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def min_max(lows: np.ndarray, highs: np.ndarray, threshold: int) -> List[Tuple[int, str]]:
+    """Pick the minimum and maximum of each of ``threshold // 2`` buckets.
+
+    Returns (index, 'low' | 'high' | 'value') pairs in index order, where
+    'value' means the series is already small enough to return unchanged.
+    """
+    n = len(lows)
+    if threshold >= n:
+        return [(i, "value") for i in range(n)]
+
+    picks = []
+    for bucket in np.array_split(np.arange(n), max(threshold // 2, 1)):
+        low = int(bucket[np.argmin(lows[bucket])])
+        high = int(bucket[np.argmax(highs[bucket])])
+        if low == high:
+            picks.append((low, "high"))
+        else:
+            picks.extend(sorted([(low, "low"), (high, "high")]))
+    return picks
+
+
+def _series_filter(city_column, type_column, time_column, starts: Dict[Tuple[str, str], datetime]):
+    return or_(*[
+        and_(city_column == city, type_column == metric_type, time_column >= start)
+        for (city, metric_type), start in starts.items()
+    ])
+
+
+def _load_raw(db: Session, starts: Dict[Tuple[str, str], datetime]):
+    source = partitions.metrics_source(db, min(starts.values()))
+    rows = db.execute(
+        select(
+            source.city,
+            source.metric_type,
+            source.timestamp,
+            source.value,
+            source.unit
+        ).where(
+            _series_filter(source.city, source.metric_type, source.timestamp, starts)
+        ).order_by(source.city, source.metric_type, source.timestamp, source.id)
+    ).all()
+
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[(row.city, row.metric_type)].append(row)
+
+    loaded = {}
+    for key in starts:
+        series_rows = grouped.get(key, [])
+        timestamps = [row.timestamp for row in series_rows]
+        values = np.fromiter((row.value for row in series_rows), dtype=np.float64, count=len(series_rows))
+        loaded[key] = (timestamps, values, values, values, [row.unit for row in series_rows])
+    return loaded
+
+
+def _load_rollups(db: Session, starts: Dict[Tuple[str, str], datetime], resolution: str):
+    rows = db.execute(
+        select(
+            MetricRollup.city,
+            MetricRollup.metric_type,
+            MetricRollup.bucket_start,
+            MetricRollup.unit,
+            MetricRollup.value_count,
+            MetricRollup.value_sum,
+            MetricRollup.value_min,
+            MetricRollup.value_max
+        ).where(
+            MetricRollup.resolution == resolution,
+            _series_filter(MetricRollup.city, MetricRollup.metric_type, MetricRollup.bucket_start, starts)
+        ).order_by(MetricRollup.city, MetricRollup.metric_type, MetricRollup.bucket_start)
+    ).all()
+
+    # Buckets are stored per unit; merge units that share a bucket
+    merged: Dict[Tuple[str, str], Dict[datetime, list]] = defaultdict(dict)
+    for city, metric_type, bucket_start, unit, count, total, low, high in rows:
+        buckets = merged[(city, metric_type)]
+        stats = buckets.get(bucket_start)
+        if stats is None:
+            buckets[bucket_start] = [count, total, low, high, unit or None]
+        else:
+            stats[0] += count
+            stats[1] += total
+            stats[2] = min(stats[2], low)
+            stats[3] = max(stats[3], high)
+            if stats[4] != (unit or None):
+                stats[4] = _MIXED
+
+    loaded = {}
+    for key in starts:
+        buckets = merged.get(key, {})
+        timestamps = list(buckets)
+        stats = np.array([bucket[:4] for bucket in buckets.values()], dtype=np.float64).reshape(-1, 4)
+        units = [bucket[4] for bucket in buckets.values()]
+        loaded[key] = (timestamps, stats[:, 1] / np.maximum(stats[:, 0], 1), stats[:, 2], stats[:, 3], units)
+    return loaded
+
+
+def _load_recent(city: str, metric_type: str, start: datetime, resolution: Optional[str]):
+    """The same columns as ``_load_raw`` / ``_load_rollups``, from the recent store"""
+    if resolution is None:
+        timestamps, values, units = recent_store.readings(city, metric_type, start)
+        return timestamps, values, values, values, units
+    return recent_store.buckets(city, metric_type, start, resolution, _MIXED)
+
+
+def _first_at_or_after(timestamps: List[datetime], start: datetime) -> int:
+    if timestamps and timestamps[0].tzinfo is not None and start.tzinfo is None:
+        # Naive bounds are local time, as they are when compared in SQL
+        start = start.astimezone()
+    return bisect_left(timestamps, start)
+
+
+def _reduce(
+    city: str,
+    metric_type: str,
+    loaded,
+    first: int,
+    resolution: Optional[str],
+    points: int,
+    method: str
+) -> Dict[str, Any]:
+    timestamps, values, lows, highs, units = loaded
+    timestamps = timestamps[first:]
+    values, lows, highs = values[first:], lows[first:], highs[first:]
+    units = set(units[first:])
+
+    if method == "minmax":
+        picks = min_max(lows, highs, points)
+        series = [
+            (timestamps[i], float({"low": lows, "high": highs, "value": values}[kind][i]))
+            for i, kind in picks
+        ]
+    else:
+        x = np.array([timestamp.timestamp() for timestamp in timestamps], dtype=np.float64)
+        series = [(timestamps[i], float(values[i])) for i in lttb(x, values, points)]
+
+    return {
+        "city": city,
+        "metric_type": metric_type,
+        "unit": units.pop() if len(units) == 1 and _MIXED not in units else None,
+        "source": resolution or "raw",
+        "method": method,
+        "total_points": len(timestamps),
+        "points": [{"timestamp": timestamp, "value": value} for timestamp, value in series],
+    }
+
+
+def get_series_many(db: Session, requests: List[SeriesRequest]) -> List[Dict[str, Any]]:
+    """Downsampled series for several requests, in request order.
+
+    Requests are grouped by the source they read (raw rows or one rollup
+    resolution) and each group is fetched in a single statement covering
+    the widest window asked of each series; narrower windows of the same
+    series are sliced out of that result in memory.
+    """
+    now = datetime.now()
+    plans = []
+    starts: Dict[Optional[str], Dict[Tuple[str, str], datetime]] = defaultdict(dict)
+    for city, metric_type, window, points, method in requests:
+        resolution = choose_resolution(window, points)
+        start = now - window
+        in_memory = recent_store.covers(city, metric_type, start)
+        if not in_memory:
+            source = starts[resolution]
+            source[(city, metric_type)] = min(start, source.get((city, metric_type), start))
+        plans.append((city, metric_type, resolution, start, points, method, in_memory))
+
+    loaded = {
+        resolution: _load_raw(db, series) if resolution is None else _load_rollups(db, series, resolution)
+        for resolution, series in starts.items()
+    }
+
+    results = []
+    for city, metric_type, resolution, start, points, method, in_memory in plans:
+        if in_memory:
+            series, first = _load_recent(city, metric_type, start, resolution), 0
+        else:
+            series = loaded[resolution][(city, metric_type)]
+            first = _first_at_or_after(series[0], start)
+        results.append(_reduce(city, metric_type, series, first, resolution, points, method))
+    return results
+
+
+def get_series(
+    db: Session,
+    city: str,
+    metric_type: str,
+    window: timedelta,
+    points: int,
+    method: str = "lttb"
+) -> Dict[str, Any]:
+    """Downsampled (timestamp, value) series for the last ``window``"""
+    return get_series_many(db, [(city, metric_type, window, points, method)])[0]
@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.db import dimensions
+from app.models.models import CityMetric
+from app.schemas.metrics import MetricCreate
+from app.services import catalog, rollups
+from app.services.latest_cache import latest_values
+from app.services.live import live_hub
+from app.services.recent_store import recent_store
+
+# Validates a whole batch of raw records in a single call
+_batch_adapter = TypeAdapter(List[MetricCreate])
+
+
+def _to_row(metric: MetricCreate) -> Dict[str, Any]:
+    """Convert a validated metric into a column dict ready for insertion"""
+    row = metric.model_dump()
+    if row["timestamp"] is None:
+        row["timestamp"] = datetime.now()
+    return row
+
+
+def create_metric(db: Session, metric: MetricCreate) -> CityMetric:
+    """Write a single metric through the ORM and return the refreshed row"""
+    row = _to_row(metric)
+    dimensions.ensure_names([row])
+    db_metric = CityMetric(**row)
+    db.add(db_metric)
+    rollups.apply_rows(db, [row])
+    catalog.apply_rows(db, [row])
+    db.commit()
+    db.refresh(db_metric)
+
+    row.update(id=db_metric.id, timestamp=db_metric.timestamp, created_at=db_metric.created_at)
+    latest_values.update([row])
+    recent_store.add([row])
+    live_hub.publish([row])
+    return db_metric
+
+
+def validate_batch(records: List[Any]) -> Tuple[List[MetricCreate], List[Dict[str, Any]]]:
+    """Validate a batch of raw records in one pass.
+
+    Returns the parsed metrics, or an empty list plus one error entry per
+    failing field (indexed relative to the batch) if any record is invalid.
+    """
+    try:
+        return _batch_adapter.validate_python(records), []
+    except ValidationError as e:
+        errors = [
+            {
+                "index": error["loc"][0],
+                "loc": list(error["loc"][1:]),
+                "msg": error["msg"],
+            }
+            for error in e.errors()
+        ]
+        return [], errors
+
+
+def insert_batch(db: Session, metrics: List[MetricCreate]) -> List[Dict[str, Any]]:
+    """Insert validated metrics with one multi-row INSERT in a single transaction.
+
+    Rollup buckets and the series catalog are updated in the same
+    transaction; the latest-value cache, recent store and live subscribers
+    see the rows after commit. Returns the written rows, including the
+    generated ``id`` and ``created_at``.
+    """
+    rows = [_to_row(metric) for metric in metrics]
+    if not rows:
+        return rows
+
+    dimensions.ensure_names(rows)
+    stmt = insert(CityMetric).returning(
+        CityMetric.id,
+        CityMetric.timestamp,
+        CityMetric.created_at,
+        sort_by_parameter_order=True
+    )
+    try:
+        result = db.execute(stmt, rows)
+        # Take timestamps back as the database stored them so in-memory
+        # consumers compare like with like
+        for row, (metric_id, timestamp, created_at) in zip(rows, result):
+            row["id"] = metric_id
+            row["timestamp"] = timestamp
+            row["created_at"] = created_at
+        rollups.apply_rows(db, rows)
+        catalog.apply_rows(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    latest_values.update(rows)
+    recent_store.add(rows)
+    live_hub.publish(rows)
+    return rows
+
+
+def ingest_batch(db: Session, batch: int, start_index: int, records: List[Any]) -> Dict[str, Any]:
+    """Validate and write one batch of records, returning its acknowledgement.
+
+    A batch is atomic: if any record fails validation nothing from the batch
+    is written and the ack lists the offending records by absolute index.
+    """
+    metrics, errors = validate_batch(records)
+    if errors:
+        for error in errors:
+            error["index"] += start_index
+        return {
+            "batch": batch,
+            "start_index": start_index,
+            "accepted": 0,
+            "rejected": len(records),
+            "errors": errors
+        }
+
+    insert_batch(db, metrics)
+    return {
+        "batch": batch,
+        "start_index": start_index,
+        "accepted": len(metrics),
+        "rejected": 0,
+        "errors": []
+    }
@@ -0,0 +1,125 @@
+"""Process-local table of the most recent reading per (city, metric_type).
+
+The ingestion service pushes every committed row through ``update`` and the
+app warms the table from the database on startup, so ``/metrics/latest`` can
+answer from memory. Writes made by other processes (other workers, seed
+scripts) are not seen until the next warm; ``check`` reports such drift by
+comparing the cache against the SQL query.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session, aliased
+
+from app.models.models import City, MetricType
+from app.schemas.metrics import METRIC_FIELDS
+from app.services import partitions
+
+
+def query_latest(db: Session, city: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Latest metric per (city, metric_type) straight from the database, as
+    plain rows of the ``MetricResponse`` fields.
+
+    Every city/type pair from the dimension tables is probed for its newest
+    reading through the (city, metric_type, timestamp) index; a GROUP BY
+    over the metrics would read the whole index instead. Pairs with no
+    readings find nothing and drop out of the join.
+    """
+    # Every month: a series may have had no reading since its month rotated out
+    source = partitions.metrics_source(db)
+    newest = aliased(source)
+    latest_id = select(newest.id).where(
+        newest.city == City.id,
+        newest.metric_type == MetricType.id
+    ).order_by(newest.timestamp.desc(), newest.id.desc()).limit(1).scalar_subquery()
+    series = select(latest_id.label("id")).select_from(City).join(MetricType, true())
+
+    if city:
+        series = series.where(City.name == city)
+
+    series = series.subquery()
+
+    query = select(*[getattr(source, field) for field in METRIC_FIELDS]).join(
+        series, source.id == series.c.id
+    )
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+class LatestValueCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.warmed = False
+
+    def update(self, rows: Iterable[Dict[str, Any]]):
+        """Record committed rows, keeping the newest reading per series"""
+        with self._lock:
+            for row in rows:
+                if row.get("timestamp") is None:
+                    continue
+                key = (row["city"], row["metric_type"])
+                current = self._latest.get(key)
+                if current is None or (row["timestamp"], row["id"]) >= (current["timestamp"], current["id"]):
+                    self._latest[key] = {field: row.get(field) for field in METRIC_FIELDS}
+
+    def warm(self, db: Session):
+        """Replace the cache contents with the current database state.
+
+        Readings recorded while the query ran are kept if they are newer,
+        so re-warming a live cache loses nothing.
+        """
+        latest = {}
+        for row in query_latest(db):
+            key = (row["city"], row["metric_type"])
+            if key not in latest or row["id"] > latest[key]["id"]:
+                latest[key] = row
+        with self._lock:
+            for key, current in self._latest.items():
+                row = latest.get(key)
+                if row is None or (current["timestamp"], current["id"]) > (row["timestamp"], row["id"]):
+                    latest[key] = current
+            self._latest = latest
+            self.warmed = True
+
+    def known(self, city: str, metric_type: str) -> bool:
+        """Whether this process has seen the series, from warming or ingestion"""
+        with self._lock:
+            return (city, metric_type) in self._latest
+
+    def get(self, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Latest reading per series, optionally for one city"""
+        with self._lock:
+            rows = [
+                row for (row_city, _), row in self._latest.items()
+                if city is None or row_city == city
+            ]
+        return sorted(rows, key=lambda row: (row["city"], row["metric_type"]))
+
+    def check(self, db: Session, city: Optional[str] = None) -> Dict[str, Any]:
+        """Compare the cache against the database query for drift.
+
+        A series is stale when the database holds a newer timestamp than the
+        cache; ties on timestamp count as consistent whichever row is cached.
+        """
+        expected: Dict[Tuple[str, str], Any] = {}
+        for row in query_latest(db, city):
+            expected[(row["city"], row["metric_type"])] = row["timestamp"]
+        cached = {(row["city"], row["metric_type"]): row["timestamp"] for row in self.get(city)}
+
+        missing = sorted(key for key in expected if key not in cached)
+        extra = sorted(key for key in cached if key not in expected)
+        stale = sorted(
+            key for key in expected
+            if key in cached and cached[key] != expected[key]
+        )
+        return {
+            "consistent": not (missing or extra or stale),
+            "series": len(expected),
+            "missing": [{"city": c, "metric_type": t} for c, t in missing],
+            "extra": [{"city": c, "metric_type": t} for c, t in extra],
+            "stale": [{"city": c, "metric_type": t} for c, t in stale],
+        }
+
+
+latest_values = LatestValueCache()
@@ -0,0 +1,198 @@
+"""Push newly ingested readings to subscribers of (city, metric_type) topics.
+
+The ingestion service hands every committed batch to ``live_hub.publish``,
+which may be called from any thread. Each row is serialized once and then
+fanned out on the event loop to every subscription whose topics match; a
+topic's metric type may be ``*`` to follow every metric of a city.
+
+With ``LIVE_PUBSUB_BACKEND=redis`` rows are published to Redis instead and
+each worker relays the channel back into its local hub, so subscribers see
+readings ingested by any worker.
+
+Subscriptions buffer up to ``LIVE_QUEUE_SIZE`` readings. A subscriber that
+falls further behind loses its oldest readings rather than holding memory
+or slowing ingestion; the losses are counted in ``stats``.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import TypeAdapter
+
+from app.core import redis_client
+from app.core.config import settings
+from app.schemas.metrics import MetricResponse
+
+logger = logging.getLogger(__name__)
+
+Topic = Tuple[str, str]
+
+CHANNEL_PREFIX = "citypulse:live:"
+ALL_TYPES = "*"
+
+_row_adapter = TypeAdapter(MetricResponse)
+
+
+def parse_topic(topic: str) -> Optional[Topic]:
+    """Parse ``city:metric_type``; None when either part is missing"""
+    city, _, metric_type = topic.rpartition(":")
+    if not city or not metric_type:
+        return None
+    return city, metric_type
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.topics: Set[Topic] = set()
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def put(self, payload: bytes):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(payload)
+
+    async def get_batch(self, timeout: Optional[float] = None) -> List[bytes]:
+        """Wait for at least one payload and return everything buffered.
+
+        Returns an empty list if ``timeout`` seconds pass without one.
+        """
+        try:
+            payloads = [await asyncio.wait_for(self._queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self._queue.empty():
+            payloads.append(self._queue.get_nowait())
+        return payloads
+
+
+class LiveHub:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis: Optional[Any] = None
+        self._relay_task: Optional[asyncio.Task] = None
+        self._publisher_task: Optional[asyncio.Task] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Topic, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self):
+        """Bind to the running loop and, if configured, start the Redis relay"""
+        self._loop = asyncio.get_running_loop()
+        client = redis_client.get_client() if settings.LIVE_PUBSUB_BACKEND == "redis" else None
+        if client is not None:
+            pubsub = client.pubsub()
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            self._redis = client
+            self._outbox = asyncio.Queue()
+            self._relay_task = asyncio.create_task(self._relay(pubsub))
+            self._publisher_task = asyncio.create_task(self._publish_redis())
+
+    async def stop(self):
+        for task in (self._relay_task, self._publisher_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._relay_task = self._publisher_task = self._outbox = None
+        self._redis = None
+        self._loop = None
+
+    def subscribe(self, topics: Iterable[Topic]) -> Subscription:
+        subscription = Subscription(settings.LIVE_QUEUE_SIZE)
+        self.add_topics(subscription, topics)
+        return subscription
+
+    def add_topics(self, subscription: Subscription, topics: Iterable[Topic]):
+        with self._lock:
+            for topic in topics:
+                subscription.topics.add(topic)
+                self._subscribers[topic].add(subscription)
+
+    def remove_topics(self, subscription: Subscription, topics: Iterable[Topic]):
+        with self._lock:
+            for topic in topics:
+                subscription.topics.discard(topic)
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def unsubscribe(self, subscription: Subscription):
+        self.remove_topics(subscription, list(subscription.topics))
+        self.dropped += subscription.dropped
+
+    def publish(self, rows: Iterable[Dict[str, Any]]):
+        """Queue committed rows for delivery; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or (self._redis is None and not self._subscribers):
+            return
+        payloads = [
+            (row["city"], row["metric_type"], _row_adapter.dump_json(_row_adapter.validate_python(row)))
+            for row in rows
+        ]
+        if not payloads:
+            return
+        if self._outbox is not None:
+            loop.call_soon_threadsafe(self._outbox.put_nowait, payloads)
+        else:
+            loop.call_soon_threadsafe(self._deliver, payloads)
+
+    async def _publish_redis(self):
+        # One sender keeps readings in ingestion order
+        while True:
+            payloads = await self._outbox.get()
+            try:
+                for city, metric_type, payload in payloads:
+                    await self._redis.publish(f"{CHANNEL_PREFIX}{city}:{metric_type}", payload)
+            except Exception as exc:
+                logger.warning("Live publish to Redis failed: %s", exc)
+
+    async def _relay(self, pubsub: Any):
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                topic = parse_topic(channel[len(CHANNEL_PREFIX):])
+                if topic is not None:
+                    self._deliver([(topic[0], topic[1], message["data"])])
+        finally:
+            await pubsub.aclose()
+
+    def _deliver(self, payloads: List[Tuple[str, str, bytes]]):
+        with self._lock:
+            for city, metric_type, payload in payloads:
+                self.published += 1
+                exact = self._subscribers.get((city, metric_type))
+                wildcard = self._subscribers.get((city, ALL_TYPES))
+                targets = exact | wildcard if exact and wildcard else exact or wildcard or ()
+                for subscription in targets:
+                    subscription.put(payload)
+                self.delivered += len(targets)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscriptions = {s for subscribers in self._subscribers.values() for s in subscribers}
+            return {
+                "backend": "redis" if self._redis is not None else "local",
+                "subscriptions": len(subscriptions),
+                "topics": len(self._subscribers),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped + sum(s.dropped for s in subscriptions),
+            }
+
+
+live_hub = LiveHub()
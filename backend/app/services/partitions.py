@@ -0,0 +1,302 @@
+"""Monthly time partitioning, retention and compaction for ``city_metrics``.
+
+On Postgres ``city_metrics`` is a native RANGE-partitioned table with one
+``city_metrics_YYYY_MM`` partition per month and a default partition for
+anything outside them. ``maintain`` creates partitions for the coming months
+ahead of time; migration 0004 converts an existing plain table.
+
+SQLite has no partitioning, so ``city_metrics`` is kept as the hot table
+holding the newest ``METRICS_HOT_MONTHS`` months and ``maintain`` moves each
+older month into its own ``city_metrics_YYYY_MM`` table. Reads that reach
+past the hot months go through ``metrics_source``, which unions in the month
+tables the window overlaps.
+
+Either way the hot-path indexes only cover recent months. With
+``METRICS_RETENTION_DAYS`` set, months that ended before the cutoff are
+dropped whole, after their rollups are compacted to day buckets recomputed
+from the rows being dropped, so daily aggregates over those months keep
+working from rollups while the rollup table stays bounded. With
+``METRICS_ARCHIVE_DIR`` set the rows are exported to Parquet first.
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Index, MetaData, Table, delete, func, insert, select, text, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.models.models import CityMetric
+from app.services import archive, rollups
+
+logger = logging.getLogger(__name__)
+
+TABLE = CityMetric.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+_PARTITION_NAME = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_table(name: str) -> Table:
+    """A Core table with the ``city_metrics`` columns under another name"""
+    table = CityMetric.__table__.to_metadata(MetaData(), name=name)
+    # Index names are global, so callers creating the table add their own
+    table.indexes.clear()
+    return table
+
+
+def _months(db: Session) -> List[datetime]:
+    """Months that currently have their own partition or month table, oldest first"""
+    if db.get_bind().dialect.name == "postgresql":
+        names = db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ), {"table": TABLE}).scalars()
+    else:
+        names = db.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :pattern"
+        ), {"pattern": f"{TABLE}_%"}).scalars()
+    return sorted(month for month in map(partition_month, names) if month is not None)
+
+
+# Postgres
+
+def is_partitioned(conn: Connection) -> bool:
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": TABLE}
+    ).scalar() == "p"
+
+
+def _create_pg_partition(conn: Connection, month: datetime):
+    """Create a month partition, moving any of its rows out of the default
+    partition first (Postgres refuses to attach over them otherwise)"""
+    name = partition_name(month)
+    start, end = month.isoformat(sep=" "), add_months(month, 1).isoformat(sep=" ")
+    conn.exec_driver_sql(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    conn.exec_driver_sql(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE timestamp >= '{start}' AND timestamp < '{end}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+
+
+def convert_to_partitioned(conn: Connection) -> bool:
+    """Rebuild a plain ``city_metrics`` as a monthly partitioned table.
+
+    Rows and ids are kept. The primary key becomes (id, timestamp), since
+    Postgres requires the partition key in every unique constraint, and
+    readings without a timestamp take their ``created_at``. Returns False
+    if the table was already partitioned.
+    """
+    if is_partitioned(conn):
+        return False
+
+    old = f"{TABLE}_unpartitioned"
+    # Recreated from the live definitions rather than the models, which may
+    # be ahead of the schema being migrated
+    index_definitions = conn.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE tablename = :table AND indexname <> :pkey"),
+        {"table": TABLE, "pkey": f"{TABLE}_pkey"}
+    ).scalars().all()
+    conn.exec_driver_sql(f"UPDATE {TABLE} SET timestamp = COALESCE(created_at, now()) WHERE timestamp IS NULL")
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {old}")
+    for index_name in conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": old}
+    ).scalars():
+        conn.exec_driver_sql(f"ALTER INDEX {index_name} RENAME TO {index_name}_unpartitioned")
+
+    conn.exec_driver_sql(f"CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)")
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, timestamp)")
+    conn.exec_driver_sql(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    for definition in index_definitions:
+        conn.exec_driver_sql(definition)
+    conn.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+    first, last = conn.execute(text(f"SELECT min(timestamp), max(timestamp) FROM {old}")).one()
+    month = month_start(first or datetime.now())
+    newest = max(month_start(last) if last else month, month_start(datetime.now()))
+    last_month = add_months(newest, settings.METRICS_PARTITIONS_AHEAD)
+    while month <= last_month:
+        _create_pg_partition(conn, month)
+        month = add_months(month, 1)
+
+    conn.exec_driver_sql(f"INSERT INTO {TABLE} SELECT * FROM {old}")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+    return True
+
+
+def _ensure_pg_partitions(db: Session) -> List[str]:
+    conn = db.connection()
+    if not is_partitioned(conn):
+        if db.execute(select(CityMetric.id).limit(1)).first() is not None:
+            logger.warning("%s is not partitioned; run `alembic upgrade head` to convert it", TABLE)
+            return []
+        # A fresh create_all table: nothing to move, convert on the spot
+        convert_to_partitioned(conn)
+        db.commit()
+        return [partition_name(month) for month in _months(db)]
+
+    existing = set(_months(db))
+    month = month_start(datetime.now())
+    created = []
+    for _ in range(settings.METRICS_PARTITIONS_AHEAD + 1):
+        if month not in existing:
+            _create_pg_partition(conn, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    db.commit()
+    return created
+
+
+# SQLite
+
+def _rotate_sqlite(db: Session) -> List[str]:
+    """Move every month older than the hot window into its own table"""
+    hot_start = add_months(month_start(datetime.now()), -(settings.METRICS_HOT_MONTHS - 1))
+    oldest = db.execute(select(func.min(CityMetric.timestamp)).where(CityMetric.timestamp < hot_start)).scalar()
+    if oldest is None:
+        return []
+
+    # SQLite hands out max(id) + 1, so the newest id must stay in the hot
+    # table or ids would be reused after it moved out
+    newest_id_timestamp = db.execute(
+        select(CityMetric.timestamp).order_by(CityMetric.id.desc()).limit(1)
+    ).scalar()
+
+    moved = []
+    source = CityMetric.__table__
+    month = month_start(oldest)
+    while month < hot_start:
+        end = add_months(month, 1)
+        if newest_id_timestamp is not None and month <= newest_id_timestamp.replace(tzinfo=None) < end:
+            logger.warning("Not rotating %s: it holds the newest id", partition_name(month))
+            month = end
+            continue
+        table = partition_table(partition_name(month))
+        Index(f"ix_{table.name}_city_type_ts", table.c.city, table.c.metric_type, table.c.timestamp)
+        table.create(db.connection(), checkfirst=True)
+        in_month = (source.c.timestamp >= month) & (source.c.timestamp < end)
+        db.execute(insert(table).from_select(list(source.c.keys()), select(source).where(in_month)))
+        db.execute(delete(source).where(in_month))
+        db.commit()
+        moved.append(table.name)
+        month = end
+    return moved
+
+
+def raw_source(db: Session, start: Optional[datetime] = None):
+    """Core selectable holding every raw reading at or after ``start``.
+
+    ``city_metrics`` itself, except on SQLite when month tables overlap the
+    window: then the hot table unioned with those month tables.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return CityMetric.__table__
+    months = [
+        month for month in _months(db)
+        if start is None or add_months(month, 1) > start.replace(tzinfo=None)
+    ]
+    if not months:
+        return CityMetric.__table__
+    tables = [CityMetric.__table__] + [partition_table(partition_name(month)) for month in months]
+    return union_all(*[select(table) for table in tables]).subquery(f"{TABLE}_all")
+
+
+def metrics_source(db: Session, start: Optional[datetime] = None):
+    """The entity to read raw metrics at or after ``start`` from: ``CityMetric``
+    or an alias of it over ``raw_source``, usable anywhere ``CityMetric`` is"""
+    source = raw_source(db, start)
+    if source is CityMetric.__table__:
+        return CityMetric
+    return aliased(CityMetric, source)
+
+
+# Both
+
+def retention_cutoff() -> Optional[datetime]:
+    """Raw readings before this may have been dropped; None without retention.
+
+    Retention only runs with partitioning on, so without it nothing is
+    dropped and there is no cutoff whatever METRICS_RETENTION_DAYS says.
+    """
+    if not settings.METRICS_PARTITIONING or not settings.METRICS_RETENTION_DAYS:
+        return None
+    return datetime.now() - timedelta(days=settings.METRICS_RETENTION_DAYS)
+
+
+def apply_retention(db: Session) -> List[str]:
+    """Archive, compact and drop every partition whose month ended before the cutoff"""
+    cutoff = retention_cutoff()
+    if cutoff is None:
+        return []
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    dropped = []
+    for month in _months(db):
+        end = add_months(month, 1)
+        if end > cutoff:
+            break
+        name = partition_name(month)
+        # Day rollups become the only record of the month, so make them exact.
+        # Late readings for the month may still sit in the hot table (SQLite)
+        # or the default partition (Postgres), so read and delete through
+        # city_metrics as well.
+        if sqlite:
+            tables = [CityMetric.__table__, partition_table(name)]
+            source = union_all(*[select(table) for table in tables]).subquery(f"{TABLE}_all")
+        else:
+            source = CityMetric.__table__
+        if archive.enabled():
+            archive.export(db, source, month, end)
+        rollups.compact_range(db, month, end, source)
+        db.execute(text(f"DROP TABLE {name}"))
+        db.execute(delete(CityMetric.__table__).where(
+            CityMetric.timestamp >= month,
+            CityMetric.timestamp < end
+        ))
+        db.commit()
+        dropped.append(name)
+    return dropped
+
+
+def maintain(db: Session) -> Dict[str, List[str]]:
+    """Create upcoming partitions (Postgres) or rotate old months out of the
+    hot table (SQLite), then apply retention"""
+    if db.get_bind().dialect.name == "postgresql":
+        created = _ensure_pg_partitions(db)
+    else:
+        created = _rotate_sqlite(db)
+    return {"created": created, "dropped": apply_retention(db)}
+
+
+def list_partitions(db: Session) -> List[Dict[str, Any]]:
+    """Every month partition with its bounds, oldest first"""
+    return [
+        {"name": partition_name(month), "start": month, "end": add_months(month, 1)}
+        for month in _months(db)
+    ]
@@ -0,0 +1,299 @@
+"""Process-local ring buffers of the most recent readings per series.
+
+Each (city, metric_type) keeps its newest readings in NumPy arrays of
+timestamps, values, ids and unit codes, at most ``RECENT_STORE_CAPACITY``
+per series, so memory is bounded by capacity x series at ~26 bytes per
+reading. Arrays start small and double until they reach capacity, after
+which the oldest reading is overwritten.
+
+The app warms the store with the last ``RECENT_STORE_HOURS`` hours on
+startup and the ingestion service pushes every committed row through
+``add``. A buffer knows the point after which it holds every reading, so
+``covers`` tells whether a window can be answered from memory; range
+queries fall back to SQL otherwise. Like ``latest_cache``, writes made by
+other processes are not seen until the next warm.
+
+Timestamps are int64 microseconds: wall-clock time for naive datetimes
+(SQLite) and UTC for aware ones (Postgres), matching how ``analytics``
+normalizes them.
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services import partitions
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_INITIAL_SIZE = 64
+
+_BUCKET_STEPS = {
+    "minute": 60_000_000,
+    "hour": 3_600_000_000,
+    "day": 86_400_000_000,
+}
+
+
+def _micros(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        return (timestamp - _NAIVE_EPOCH) // timedelta(microseconds=1)
+    return (timestamp - _UTC_EPOCH) // timedelta(microseconds=1)
+
+
+class SeriesBuffer:
+    """Readings of one series ordered by (timestamp, id), oldest overwritten first"""
+
+    __slots__ = ("timestamps", "values", "ids", "units", "start", "size", "complete_after")
+
+    def __init__(self, capacity: int, complete_after: int):
+        size = min(capacity, _INITIAL_SIZE)
+        self.timestamps = np.empty(size, dtype=np.int64)
+        self.values = np.empty(size, dtype=np.float64)
+        self.ids = np.empty(size, dtype=np.int64)
+        self.units = np.empty(size, dtype=np.int16)
+        self.start = 0
+        self.size = 0
+        # Every reading with a later timestamp is held
+        self.complete_after = complete_after
+
+    def _ordered(self) -> Tuple[np.ndarray, ...]:
+        """Copies of the held readings, oldest first"""
+        order = (self.start + np.arange(self.size)) % len(self.timestamps)
+        return self.timestamps[order], self.values[order], self.ids[order], self.units[order]
+
+    def _reset(self, arrays: Tuple[np.ndarray, ...], capacity: int):
+        """Replace the contents with ordered ``arrays``, keeping the newest ``capacity``"""
+        timestamps, values, ids, units = arrays
+        if len(timestamps) > capacity:
+            self.complete_after = max(self.complete_after, int(timestamps[-capacity - 1]))
+            timestamps, values, ids, units = (a[-capacity:] for a in arrays)
+        size = max(min(capacity, max(_INITIAL_SIZE, 2 * len(timestamps))), len(timestamps))
+        for name, array in zip(("timestamps", "values", "ids", "units"), (timestamps, values, ids, units)):
+            buffer = np.empty(size, dtype=array.dtype)
+            buffer[:len(array)] = array
+            setattr(self, name, buffer)
+        self.start = 0
+        self.size = len(timestamps)
+
+    def append(self, timestamp: int, value: float, metric_id: int, unit: int, capacity: int):
+        if timestamp <= self.complete_after:
+            return
+        length = len(self.timestamps)
+        if self.size:
+            last = (self.start + self.size - 1) % length
+            if (timestamp, metric_id) < (self.timestamps[last], self.ids[last]):
+                # Late reading: rare, so re-sort rather than complicate the ring
+                arrays = self._ordered()
+                position = int(np.searchsorted(arrays[0], timestamp, side="right"))
+                self._reset(tuple(
+                    np.insert(array, position, item)
+                    for array, item in zip(arrays, (timestamp, value, metric_id, unit))
+                ), capacity)
+                return
+        if self.size == length:
+            if length < capacity:
+                self._reset(self._ordered(), capacity)
+                length = len(self.timestamps)
+            else:
+                # Full: overwrite the oldest
+                self.complete_after = max(self.complete_after, int(self.timestamps[self.start]))
+                self.start = (self.start + 1) % length
+                self.size -= 1
+        index = (self.start + self.size) % length
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+        self.ids[index] = metric_id
+        self.units[index] = unit
+        self.size += 1
+
+    def holds(self, metric_id: int) -> bool:
+        order = (self.start + np.arange(self.size)) % len(self.ids)
+        return bool((self.ids[order] == metric_id).any())
+
+    def since(self, start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(timestamps, values, unit codes) at or after ``start``, oldest first"""
+        timestamps, values, _, units = self._ordered()
+        first = int(np.searchsorted(timestamps, start, side="left"))
+        return timestamps[first:], values[first:], units[first:]
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.values.nbytes + self.ids.nbytes + self.units.nbytes
+
+
+class RecentStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], SeriesBuffer] = {}
+        # Unit strings are stored once and referenced by code
+        self._units: List[Optional[str]] = []
+        self._unit_codes: Dict[Optional[str], int] = {}
+        self._tz: Optional[Any] = None
+        self._warmed_after = 0
+        # Rows added while a re-warm queries the database, replayed after it
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self.warmed = False
+
+    def _unit_code(self, unit: Optional[str]) -> int:
+        code = self._unit_codes.get(unit)
+        if code is None:
+            code = self._unit_codes[unit] = len(self._units)
+            self._units.append(unit)
+        return code
+
+    def _bound(self, timestamp: datetime) -> int:
+        """Microseconds for a query bound; naive bounds are local time, as in SQL"""
+        if self._tz is not None and timestamp.tzinfo is None:
+            timestamp = timestamp.astimezone()
+        return _micros(timestamp)
+
+    def _to_datetimes(self, timestamps: np.ndarray) -> List[datetime]:
+        if self._tz is None:
+            return [_NAIVE_EPOCH + timedelta(microseconds=int(t)) for t in timestamps]
+        return [(_UTC_EPOCH + timedelta(microseconds=int(t))).astimezone(self._tz) for t in timestamps]
+
+    def add(self, rows: Iterable[Dict[str, Any]]):
+        """Record committed rows"""
+        if not self.warmed:
+            return
+        rows = list(rows)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(rows)
+            self._add(rows)
+
+    def _add(self, rows: Iterable[Dict[str, Any]], skip_known: bool = False):
+        capacity = settings.RECENT_STORE_CAPACITY
+        for row in rows:
+            timestamp = row.get("timestamp")
+            if timestamp is None:
+                continue
+            if timestamp.tzinfo is not None:
+                self._tz = timestamp.tzinfo
+            key = (row["city"], row["metric_type"])
+            buffer = self._series.get(key)
+            if buffer is None:
+                # A series first seen after warming has every reading since then
+                buffer = self._series[key] = SeriesBuffer(capacity, self._warmed_after)
+            elif skip_known and buffer.holds(row["id"]):
+                continue
+            buffer.append(_micros(timestamp), row["value"], row["id"], self._unit_code(row.get("unit")), capacity)
+
+    def warm(self, db: Session):
+        """Replace the contents with the last ``RECENT_STORE_HOURS`` hours from the database.
+
+        Rows added while the query runs are replayed on top of its result,
+        so re-warming a live store loses nothing.
+        """
+        with self._lock:
+            self._pending = [] if self.warmed else None
+        start = datetime.now() - timedelta(hours=settings.RECENT_STORE_HOURS)
+        source = partitions.metrics_source(db, start)
+        rows = db.execute(
+            select(source.city, source.metric_type, source.timestamp, source.value, source.id, source.unit).where(
+                source.timestamp >= start
+            ).order_by(source.city, source.metric_type, source.timestamp, source.id)
+        ).all()
+
+        tz = next((row.timestamp.tzinfo for row in rows if row.timestamp.tzinfo is not None), None)
+        if tz is None and db.get_bind().dialect.name == "postgresql":
+            tz = timezone.utc
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[(row.city, row.metric_type)].append(row)
+
+        capacity = settings.RECENT_STORE_CAPACITY
+        with self._lock:
+            self._tz = tz
+            warmed_after = self._bound(start) - 1
+            series = {}
+            for key, series_rows in grouped.items():
+                buffer = SeriesBuffer(capacity, warmed_after)
+                buffer._reset((
+                    np.fromiter((_micros(row.timestamp) for row in series_rows), dtype=np.int64, count=len(series_rows)),
+                    np.fromiter((row.value for row in series_rows), dtype=np.float64, count=len(series_rows)),
+                    np.fromiter((row.id for row in series_rows), dtype=np.int64, count=len(series_rows)),
+                    np.fromiter((self._unit_code(row.unit) for row in series_rows), dtype=np.int16, count=len(series_rows)),
+                ), capacity)
+                series[key] = buffer
+            self._series = series
+            self._warmed_after = warmed_after
+            self.warmed = True
+            pending, self._pending = self._pending, None
+            if pending:
+                self._add(pending, skip_known=True)
+
+    def covers(self, city: str, metric_type: str, start: datetime) -> bool:
+        """Whether every reading of the series at or after ``start`` is held"""
+        if not self.warmed:
+            return False
+        with self._lock:
+            buffer = self._series.get((city, metric_type))
+            complete_after = buffer.complete_after if buffer is not None else self._warmed_after
+            return self._bound(start) > complete_after
+
+    def arrays(self, city: str, metric_type: str, start: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """datetime64[us] timestamps and float64 values at or after ``start``"""
+        with self._lock:
+            buffer = self._series.get((city, metric_type))
+            if buffer is None:
+                return np.empty(0, dtype="datetime64[us]"), np.empty(0, dtype=np.float64)
+            timestamps, values, _ = buffer.since(self._bound(start))
+        return timestamps.astype("datetime64[us]"), values
+
+    def readings(self, city: str, metric_type: str, start: datetime) -> Tuple[List[datetime], np.ndarray, List[Optional[str]]]:
+        """Timestamps, values and units at or after ``start``, as SQL would return them"""
+        with self._lock:
+            buffer = self._series.get((city, metric_type))
+            if buffer is None:
+                return [], np.empty(0, dtype=np.float64), []
+            timestamps, values, units = buffer.since(self._bound(start))
+            return self._to_datetimes(timestamps), values, [self._units[code] for code in units]
+
+    def buckets(self, city: str, metric_type: str, start: datetime, resolution: str, mixed: Any):
+        """Rollup-style buckets at or after ``start``: bucket starts, means,
+        minima, maxima and units (``mixed`` where a bucket has several)"""
+        step = _BUCKET_STEPS[resolution]
+        with self._lock:
+            buffer = self._series.get((city, metric_type))
+            if buffer is None:
+                return [], np.empty(0), np.empty(0), np.empty(0), []
+            # Whole buckets only, like a rollup read from ``start``
+            timestamps, values, units = buffer.since(-(-self._bound(start) // step) * step)
+            names = list(self._units)
+        if len(timestamps) == 0:
+            return [], np.empty(0), np.empty(0), np.empty(0), []
+
+        bucket_starts = timestamps - timestamps % step
+        firsts = np.flatnonzero(np.r_[True, bucket_starts[1:] != bucket_starts[:-1]])
+        counts = np.diff(np.r_[firsts, len(values)])
+        means = np.add.reduceat(values, firsts) / counts
+        lows = np.minimum.reduceat(values, firsts)
+        highs = np.maximum.reduceat(values, firsts)
+        low_units = np.minimum.reduceat(units, firsts)
+        high_units = np.maximum.reduceat(units, firsts)
+        bucket_units = [
+            names[low] if low == high else mixed
+            for low, high in zip(low_units.tolist(), high_units.tolist())
+        ]
+        return self._to_datetimes(bucket_starts[firsts]), means, lows, highs, bucket_units
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "warmed": self.warmed,
+                "series": len(self._series),
+                "readings": sum(buffer.size for buffer in self._series.values()),
+                "bytes": sum(buffer.nbytes for buffer in self._series.values()),
+                "capacity": settings.RECENT_STORE_CAPACITY,
+                "hours": settings.RECENT_STORE_HOURS,
+            }
+
+
+recent_store = RecentStore()
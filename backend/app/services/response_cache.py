@@ -0,0 +1,230 @@
+"""Response cache for read-heavy endpoints.
+
+Responses are stored as serialized JSON under keys built from the endpoint
+namespace, its query params and the current version of every tag the
+response depends on (a series, a city's latest values, a dashboard).
+Invalidation bumps tag versions rather than deleting keys: ingestion bumps
+the (city, metric_type) series it wrote, dashboard edits bump that
+dashboard, and superseded entries simply age out. Because the versions are
+read before the database is, a response computed while a write lands is
+stored under the old version and never served. TTLs bound staleness from
+writes made outside the API, such as the seed scripts.
+
+The backend is Redis when it answers at startup, else an in-process LRU.
+Backend errors are logged and the request is served uncached.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.core import fast_json, redis_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "citypulse:cache"
+CACHE_STATUS_HEADER = "X-Cache"
+
+
+def series_tag(city: str, metric_type: str) -> str:
+    return f"series:{city}:{metric_type}"
+
+
+def latest_tag(city: Optional[str] = None) -> str:
+    return f"latest:{city}" if city else "latest"
+
+
+def dashboard_tag(dashboard_id: int) -> str:
+    return f"dashboard:{dashboard_id}"
+
+
+# Cities and metric types only change when a new series appears
+CATALOG_TAG = "catalog"
+
+
+class MemoryBackend:
+    """Process-local LRU with per-entry expiry"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, body: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    async def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class RedisBackend:
+    """Shared cache for all workers; tag versions are plain Redis integers"""
+
+    name = "redis"
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def versions(self, tags: List[str]) -> List[int]:
+        if not tags:
+            return []
+        values = await self.client.mget([f"{PREFIX}:tag:{tag}" for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, body: bytes, ttl: int):
+        await self.client.set(key, body, ex=ttl)
+
+    async def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            await self.client.incr(f"{PREFIX}:tag:{tag}")
+
+    async def clear(self):
+        keys = await self.client.keys(f"{PREFIX}:*")
+        if keys:
+            await self.client.delete(*keys)
+
+
+class ResponseCache:
+    def __init__(self):
+        self.backend: Optional[Any] = None
+        self._adapters: Dict[Any, TypeAdapter] = {}
+        self.configure()
+
+    def configure(self, redis: Optional[Any] = None):
+        """Pick the backend from settings; ``redis`` is a connected client"""
+        mode = settings.RESPONSE_CACHE_BACKEND
+        if mode == "off":
+            self.backend = None
+        elif redis is not None and mode in ("auto", "redis"):
+            self.backend = RedisBackend(redis)
+        else:
+            self.backend = MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+    async def start(self):
+        """Connect to Redis if configured, falling back to the in-process LRU"""
+        mode = settings.RESPONSE_CACHE_BACKEND
+        client = redis_client.get_client() if mode in ("auto", "redis") else None
+        if client is not None:
+            try:
+                await client.ping()
+            except Exception as exc:
+                if mode == "redis":
+                    raise
+                logger.warning("Redis unavailable (%s), using the in-process response cache", exc)
+                client = None
+        self.configure(client)
+
+    async def stop(self):
+        await redis_client.close_client()
+        self.configure()
+
+    def _adapter(self, model: Any) -> TypeAdapter:
+        if model not in self._adapters:
+            self._adapters[model] = TypeAdapter(model)
+        return self._adapters[model]
+
+    async def cached(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        tags: List[str],
+        loader: Callable[[], Awaitable[Any]],
+        model: Any,
+        ttl: Optional[int] = None
+    ) -> Response:
+        """Serve a JSON response from the cache, calling ``loader`` on a miss.
+
+        ``model`` plays the role of the route's ``response_model``: the
+        loaded value is validated and serialized with it before caching.
+        Pass None when the loader already returns rows in the response
+        shape, such as plain column selects; they are dumped as they are.
+        """
+        backend = self.backend
+        key = None
+        if backend is not None:
+            try:
+                versions = await backend.versions(tags)
+                material = json.dumps([params, tags, versions], sort_keys=True, default=str)
+                key = f"{PREFIX}:{namespace}:{hashlib.sha1(material.encode()).hexdigest()}"
+                body = await backend.get(key)
+                if body is not None:
+                    return Response(body, media_type="application/json", headers={CACHE_STATUS_HEADER: "HIT"})
+            except Exception as exc:
+                logger.warning("Response cache read failed: %s", exc)
+                key = None
+
+        if model is None:
+            body = fast_json.dumps(await loader())
+        else:
+            adapter = self._adapter(model)
+            body = adapter.dump_json(adapter.validate_python(await loader(), from_attributes=True))
+
+        if key is not None:
+            try:
+                await backend.set(key, body, ttl or settings.RESPONSE_CACHE_TTL)
+            except Exception as exc:
+                logger.warning("Response cache write failed: %s", exc)
+        return Response(body, media_type="application/json", headers={CACHE_STATUS_HEADER: "MISS"})
+
+    async def invalidate(self, tags: Iterable[str]):
+        if self.backend is None:
+            return
+        try:
+            await self.backend.bump(sorted(set(tags)))
+        except Exception as exc:
+            logger.warning("Response cache invalidation failed: %s", exc)
+
+    async def invalidate_series(self, series: Iterable[Tuple[str, str]], new_series: bool = False):
+        """Drop cached responses that read the given (city, metric_type) series"""
+        tags = {latest_tag()}
+        for city, metric_type in series:
+            tags.update((series_tag(city, metric_type), latest_tag(city)))
+        if new_series:
+            tags.add(CATALOG_TAG)
+        await self.invalidate(tags)
+
+    async def clear(self):
+        if self.backend is not None:
+            await self.backend.clear()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,367 @@
+"""Pre-aggregated minute/hour/day rollups of city metrics.
+
+Every bucket keeps count/sum/min/max per (city, metric_type, unit), which is
+enough to answer avg/min/max/sum aggregations without touching raw rows.
+Buckets are updated incrementally by the ingestion service in the same
+transaction as the raw insert; ``rebuild`` recomputes them from the raw
+readings for data loaded outside that path.
+
+Recomputing deletes buckets and inserts them again, so it must not
+interleave with ingestion upserting the same buckets: a delta committed in
+between would be lost or collide with the insert. Ingestion takes the
+rollup ``lock`` shared and recomputation takes it exclusive.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, false, func, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import FromClause
+
+from app.models.models import MetricRollup
+
+# Finest to coarsest
+RESOLUTIONS = ("minute", "hour", "day")
+
+# Postgres advisory lock key of the rollup lock ("roll")
+_LOCK_KEY = 0x726F6C6C
+
+# SQLite stores DateTime as text, so SQL-side truncation must produce exactly
+# the format SQLAlchemy writes for Python datetimes
+_SQLITE_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M:00.000000",
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+}
+
+
+def truncate(timestamp: datetime, resolution: str) -> datetime:
+    """Return the start of the bucket containing ``timestamp``"""
+    timestamp = timestamp.replace(second=0, microsecond=0)
+    if resolution in ("hour", "day"):
+        timestamp = timestamp.replace(minute=0)
+    if resolution == "day":
+        timestamp = timestamp.replace(hour=0)
+    return timestamp
+
+
+def ceil(timestamp: datetime, resolution: str) -> datetime:
+    """Return the first bucket boundary at or after ``timestamp``"""
+    start = truncate(timestamp, resolution)
+    if start == timestamp:
+        return start
+    steps = {
+        "minute": timedelta(minutes=1),
+        "hour": timedelta(hours=1),
+        "day": timedelta(days=1),
+    }
+    return start + steps[resolution]
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def lock(db: Session, exclusive: bool = False):
+    """Take the rollup lock until the end of the transaction.
+
+    On Postgres this is a transaction-level advisory lock, so ingest
+    transactions (shared) never wait on each other, only on a recompute
+    (exclusive). SQLite already serializes writers; an exclusive lock
+    takes its write lock up front, with an empty DELETE, so no ingest
+    commits between a recompute's reads and writes.
+    """
+    dialect = _dialect(db)
+    if dialect == "postgresql":
+        acquire = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+        db.execute(select(acquire(_LOCK_KEY)))
+    elif exclusive:
+        db.execute(delete(MetricRollup.__table__).where(false()))
+
+
+def _merge(stats: Dict[Any, List[float]], key: Any, count: int, total: float, low: float, high: float):
+    current = stats.get(key)
+    if current is None:
+        stats[key] = [count, total, low, high]
+    else:
+        current[0] += count
+        current[1] += total
+        current[2] = min(current[2], low)
+        current[3] = max(current[3], high)
+
+
+def apply_rows(db: Session, rows: Iterable[Dict[str, Any]]):
+    """Fold freshly inserted metric rows into their rollup buckets.
+
+    Does not commit; callers run this inside the transaction that wrote
+    the raw rows so rollups and ``city_metrics`` never diverge.
+    """
+    deltas: Dict[Tuple, List[float]] = {}
+    for row in rows:
+        value = row["value"]
+        for resolution in RESOLUTIONS:
+            key = (
+                row["city"],
+                row["metric_type"],
+                row.get("unit") or "",
+                resolution,
+                truncate(row["timestamp"], resolution)
+            )
+            _merge(deltas, key, 1, value, value, value)
+
+    if not deltas:
+        return
+
+    lock(db)
+    dialect = _dialect(db)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+        least, greatest = func.least, func.greatest
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+        least, greatest = func.min, func.max
+    else:
+        raise NotImplementedError(f"Rollups are not supported on {dialect}")
+
+    table = MetricRollup.__table__
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.city, table.c.metric_type, table.c.resolution, table.c.bucket_start, table.c.unit],
+        set_={
+            "value_count": table.c.value_count + stmt.excluded.value_count,
+            "value_sum": table.c.value_sum + stmt.excluded.value_sum,
+            "value_min": least(table.c.value_min, stmt.excluded.value_min),
+            "value_max": greatest(table.c.value_max, stmt.excluded.value_max),
+        }
+    )
+    db.execute(stmt, [
+        {
+            "city": city,
+            "metric_type": metric_type,
+            "unit": unit,
+            "resolution": resolution,
+            "bucket_start": bucket_start,
+            "value_count": count,
+            "value_sum": total,
+            "value_min": low,
+            "value_max": high,
+        }
+        for (city, metric_type, unit, resolution, bucket_start), (count, total, low, high) in deltas.items()
+    ])
+
+
+def _bucket_expression(resolution: str, dialect: str, timestamp):
+    if dialect == "postgresql":
+        return func.date_trunc(resolution, timestamp)
+    if dialect == "sqlite":
+        return func.strftime(_SQLITE_FORMATS[resolution], timestamp)
+    raise NotImplementedError(f"Rollups are not supported on {dialect}")
+
+
+def _insert_buckets(
+    db: Session,
+    source: FromClause,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolutions: Tuple[str, ...] = RESOLUTIONS
+):
+    """INSERT ... SELECT the ``resolutions`` buckets of ``source`` rows,
+    optionally in [start, end)"""
+    dialect = _dialect(db)
+    table = MetricRollup.__table__
+    timestamp = source.c.timestamp
+    unit = func.coalesce(source.c.unit, "")
+
+    for resolution in resolutions:
+        bucket = _bucket_expression(resolution, dialect, timestamp)
+        query = select(
+            source.c.city,
+            source.c.metric_type,
+            unit,
+            literal(resolution),
+            bucket,
+            func.count(),
+            func.sum(source.c.value),
+            func.min(source.c.value),
+            func.max(source.c.value)
+        ).where(
+            timestamp.is_not(None)
+        )
+        if start is not None:
+            query = query.where(timestamp >= start)
+        if end is not None:
+            query = query.where(timestamp < end)
+        query = query.group_by(
+            source.c.city,
+            source.c.metric_type,
+            unit,
+            bucket
+        )
+        db.execute(insert(table).from_select(
+            ["city", "metric_type", "unit", "resolution", "bucket_start",
+             "value_count", "value_sum", "value_min", "value_max"],
+            query
+        ))
+
+
+def rebuild(db: Session):
+    """Recompute every rollup bucket from all raw readings"""
+    # Imported here: partitions compacts through compact_range
+    from app.services.partitions import raw_source
+
+    lock(db, exclusive=True)
+    db.execute(delete(MetricRollup.__table__))
+    _insert_buckets(db, raw_source(db))
+    db.commit()
+
+
+def rebuild_range(db: Session, start: datetime, end: datetime, source: Optional[FromClause] = None):
+    """Recompute the buckets in [start, end) from ``source`` (every raw
+    reading in the range by default).
+
+    Both bounds must fall on day boundaries so no bucket straddles them.
+    Does not commit.
+    """
+    from app.services.partitions import raw_source
+
+    lock(db, exclusive=True)
+    db.execute(delete(MetricRollup.__table__).where(
+        MetricRollup.bucket_start >= start,
+        MetricRollup.bucket_start < end
+    ))
+    _insert_buckets(db, raw_source(db, start) if source is None else source, start, end)
+
+
+def refresh_range(db: Session, start: datetime, end: datetime) -> List[datetime]:
+    """Rebuild the days in [start, end) whose day buckets do not count
+    every raw reading of the day, e.g. after rows were written outside the
+    ingestion service; returns the days rebuilt.
+
+    Checking a day is a count over the timestamp indexes, so days that
+    ingestion kept current are not aggregated again. Each day is checked
+    and rebuilt in its own transaction under the exclusive lock, which
+    holds ingestion off for one day's rebuild at most. Both bounds must
+    fall on day boundaries.
+    """
+    from app.services.partitions import raw_source
+
+    rebuilt = []
+    day = start
+    while day < end:
+        next_day = day + timedelta(days=1)
+        lock(db, exclusive=True)
+        source = raw_source(db, day)
+        raw_count = db.execute(select(func.count()).select_from(source).where(
+            source.c.timestamp >= day,
+            source.c.timestamp < next_day
+        )).scalar()
+        rolled_count = db.execute(select(func.coalesce(func.sum(MetricRollup.value_count), 0)).where(
+            MetricRollup.resolution == "day",
+            MetricRollup.bucket_start == day
+        )).scalar()
+        if raw_count != rolled_count:
+            rebuild_range(db, day, next_day, source)
+            rebuilt.append(day)
+        db.commit()
+        day = next_day
+    return rebuilt
+
+
+def compact_range(db: Session, start: datetime, end: datetime, source: FromClause):
+    """Replace the buckets in [start, end) with day buckets recomputed from
+    ``source``, e.g. a partition about to be dropped.
+
+    Minute and hour buckets are only kept while their raw readings are, so
+    the rollup table stays bounded under retention. Both bounds must fall
+    on day boundaries. Does not commit.
+    """
+    lock(db, exclusive=True)
+    db.execute(delete(MetricRollup.__table__).where(
+        MetricRollup.bucket_start >= start,
+        MetricRollup.bucket_start < end
+    ))
+    _insert_buckets(db, source, start, end, resolutions=("day",))
+
+
+def ensure_built(db: Session):
+    """Build rollups once if raw metrics exist but no buckets do yet"""
+    from app.services.partitions import raw_source
+
+    has_rollups = db.execute(select(MetricRollup.id).limit(1)).first()
+    has_metrics = db.execute(select(raw_source(db).c.id).limit(1)).first()
+    if has_metrics and not has_rollups:
+        rebuild(db)
+
+
+def aggregate_daily(db: Session, city: str, metric_type: str, start: datetime) -> List[Dict[str, Any]]:
+    """Daily count/sum/min/max per unit for readings at or after ``start``.
+
+    The range is covered with the coarsest buckets that fit: whole days from
+    day buckets, the leading partial day from hour buckets, the leading
+    partial hour from minute buckets, and only the sub-minute head from raw
+    rows. Past the retention cutoff only day buckets are kept, so a range
+    starting there counts its first day whole.
+    """
+    from app.services.partitions import metrics_source, retention_cutoff
+
+    cutoff = retention_cutoff()
+    if cutoff is not None and start < cutoff:
+        start = truncate(start, "day")
+    minute_start = ceil(start, "minute")
+    hour_start = ceil(start, "hour")
+    day_start = ceil(start, "day")
+
+    stats: Dict[Tuple[str, str], List[float]] = {}
+
+    def fold(rows):
+        for bucket_start, unit, count, total, low, high in rows:
+            _merge(stats, (bucket_start.date().isoformat(), unit), count, total, low, high)
+
+    spans = [
+        ("minute", minute_start, hour_start),
+        ("hour", hour_start, day_start),
+        ("day", day_start, None),
+    ]
+    for resolution, span_start, span_end in spans:
+        if span_end is not None and span_start >= span_end:
+            continue
+        query = select(
+            MetricRollup.bucket_start,
+            MetricRollup.unit,
+            MetricRollup.value_count,
+            MetricRollup.value_sum,
+            MetricRollup.value_min,
+            MetricRollup.value_max
+        ).where(
+            MetricRollup.city == city,
+            MetricRollup.metric_type == metric_type,
+            MetricRollup.resolution == resolution,
+            MetricRollup.bucket_start >= span_start
+        )
+        if span_end is not None:
+            query = query.where(MetricRollup.bucket_start < span_end)
+        fold(db.execute(query))
+
+    if start < minute_start:
+        source = metrics_source(db, start)
+        head = db.execute(
+            select(source.timestamp, source.unit, source.value).where(
+                source.city == city,
+                source.metric_type == metric_type,
+                source.timestamp >= start,
+                source.timestamp < minute_start
+            )
+        )
+        fold((timestamp, unit or "", 1, value, value, value) for timestamp, unit, value in head)
+
+    return [
+        {
+            "date": date,
+            "unit": unit,
+            "count": count,
+            "sum": total,
+            "min": low,
+            "max": high,
+        }
+        for (date, unit), (count, total, low, high) in sorted(stats.items())
+    ]
@@ -0,0 +1,266 @@
+"""Periodic background jobs run from the application lifespan.
+
+Each worker runs one scheduler task that sleeps until the next job is due
+and runs it in the thread pool with its own session, one job at a time.
+
+Jobs that derive shared state (rollup refresh, retention, VACUUM/ANALYZE)
+are leader-only: before running, a worker takes the job's lease in
+``scheduled_jobs`` with a conditional UPDATE, which succeeds only if the
+lease expired or the worker already holds it. The lease lasts one
+interval from the end of each run, so across all workers the job runs once
+per interval, by the same worker while it stays alive, and another worker
+takes over within two intervals of it dying. The row also records the last
+run, which is what the admin endpoint reports for these jobs.
+
+Jobs that refresh process-local state (the latest-value cache, the recent
+store, the dimension caches) run on every worker. They also pick up rows
+other workers wrote, which those caches otherwise only see on restart.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import dimensions
+from app.db.base import SessionLocal, engine
+from app.models.models import ScheduledJob
+from app.services import partitions, rollups
+from app.services.latest_cache import latest_values
+from app.services.recent_store import recent_store
+
+logger = logging.getLogger(__name__)
+
+# SQLite is only vacuumed once this share of its pages is free
+_SQLITE_VACUUM_FREE_RATIO = 0.2
+
+# Postgres tables vacuumed and analyzed; partitions are covered by their parent
+_VACUUM_TABLES = ("city_metrics", "metric_rollups")
+
+
+def refresh_rollups(db: Session):
+    """Rebuild the trailing days whose rollups miss raw readings, picking
+    up rows written without going through the ingestion service"""
+    now = datetime.now()
+    start = rollups.truncate(now - timedelta(days=settings.SCHEDULER_ROLLUP_REFRESH_DAYS), "day")
+    cutoff = partitions.retention_cutoff()
+    if cutoff is not None:
+        # Months before the cutoff's may have been dropped; their day buckets
+        # are all that is left of them
+        start = max(start, partitions.month_start(cutoff))
+    rebuilt = rollups.refresh_range(db, start, rollups.ceil(now, "day"))
+    if rebuilt:
+        logger.info("Rebuilt rollups for %s", ", ".join(day.date().isoformat() for day in rebuilt))
+
+
+def warm_caches(db: Session):
+    dimensions.reload()
+    latest_values.warm(db)
+    if settings.RECENT_STORE_ENABLED:
+        recent_store.warm(db)
+
+
+def apply_retention(db: Session):
+    partitions.maintain(db)
+
+
+def vacuum_analyze(db: Session):
+    """VACUUM (ANALYZE) on Postgres; ANALYZE on SQLite, plus VACUUM once
+    enough pages are free, e.g. after retention dropped months"""
+    if db.get_bind().dialect.name == "postgresql":
+        # VACUUM cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql(f"VACUUM (ANALYZE) {', '.join(_VACUUM_TABLES)}")
+        return
+    db.execute(text("ANALYZE"))
+    db.commit()
+    free = db.execute(text("PRAGMA freelist_count")).scalar()
+    pages = db.execute(text("PRAGMA page_count")).scalar()
+    if pages and free / pages >= _SQLITE_VACUUM_FREE_RATIO:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+
+
+class Job:
+    def __init__(self, name: str, interval: int, run: Callable[[Session], Any], leader_only: bool):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.leader_only = leader_only
+        self.next_run = time.monotonic() + interval
+        # This worker's view; leader-only jobs report the shared row instead
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+
+
+def configured_jobs() -> List[Job]:
+    """The jobs enabled by settings; an interval of 0 disables a job"""
+    jobs = [
+        Job("rollup_refresh", settings.SCHEDULER_ROLLUP_REFRESH_SECONDS, refresh_rollups, leader_only=True),
+        Job("cache_warm", settings.SCHEDULER_CACHE_WARM_SECONDS, warm_caches, leader_only=False),
+        Job("vacuum_analyze", settings.SCHEDULER_VACUUM_SECONDS, vacuum_analyze, leader_only=True),
+    ]
+    if settings.METRICS_PARTITIONING:
+        jobs.append(Job("retention", settings.SCHEDULER_RETENTION_SECONDS, apply_retention, leader_only=True))
+    return [job for job in jobs if job.interval > 0]
+
+
+class Scheduler:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.jobs: Dict[str, Job] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if not settings.SCHEDULER_ENABLED:
+            return
+        self.jobs = {job.name: job for job in configured_jobs()}
+        if self.jobs:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._release_leases()
+
+    async def _loop(self):
+        while True:
+            job = min(self.jobs.values(), key=lambda job: job.next_run)
+            await asyncio.sleep(max(0.0, job.next_run - time.monotonic()))
+            await run_in_threadpool(self.run_job, job)
+
+    def _acquire(self, db: Session, job: Job, now: datetime) -> bool:
+        """Take or renew the job's lease; False while another worker holds it"""
+        table = ScheduledJob.__table__
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        db.execute(upsert(table).values(name=job.name, runs=0, failures=0).on_conflict_do_nothing(
+            index_elements=[table.c.name]
+        ))
+        acquired = db.execute(update(table).where(
+            table.c.name == job.name,
+            or_(table.c.lease_expires_at.is_(None), table.c.lease_expires_at <= now, table.c.owner == self.owner)
+        ).values(
+            owner=self.owner,
+            lease_expires_at=now + timedelta(seconds=job.interval),
+            last_started_at=now,
+            last_status="running"
+        )).rowcount == 1
+        db.commit()
+        return acquired
+
+    def _record(self, db: Session, job: Job):
+        table = ScheduledJob.__table__
+        db.execute(update(table).where(table.c.name == job.name, table.c.owner == self.owner).values(
+            lease_expires_at=job.last_finished_at + timedelta(seconds=job.interval),
+            last_finished_at=job.last_finished_at,
+            last_duration_ms=job.last_duration_ms,
+            last_status=job.last_status,
+            last_error=job.last_error,
+            runs=table.c.runs + 1,
+            failures=table.c.failures + (1 if job.last_status == "error" else 0)
+        ))
+        db.commit()
+
+    def run_job(self, job: Job) -> bool:
+        """Run ``job`` now if this worker may; returns whether it ran"""
+        job.next_run = time.monotonic() + job.interval
+        with SessionLocal() as db:
+            now = datetime.now()
+            try:
+                if job.leader_only and not self._acquire(db, job, now):
+                    job.skipped += 1
+                    return False
+            except Exception:
+                db.rollback()
+                logger.exception("Could not take the lease for job %s", job.name)
+                return False
+
+            job.last_started_at = now
+            started = time.perf_counter()
+            try:
+                job.run(db)
+                job.last_status, job.last_error = "ok", None
+            except Exception as exc:
+                db.rollback()
+                job.last_status, job.last_error = "error", repr(exc)
+                job.failures += 1
+                logger.exception("Background job %s failed", job.name)
+            job.runs += 1
+            job.last_duration_ms = (time.perf_counter() - started) * 1000
+            job.last_finished_at = datetime.now()
+            # The next run is measured from the end of this one
+            job.next_run = time.monotonic() + job.interval
+
+            if job.leader_only:
+                try:
+                    self._record(db, job)
+                except Exception:
+                    db.rollback()
+                    logger.exception("Could not record the run of job %s", job.name)
+        return True
+
+    def _release_leases(self):
+        """Let another worker take over this one's jobs straight away"""
+        leader_jobs = [job.name for job in self.jobs.values() if job.leader_only]
+        if not leader_jobs:
+            return
+        table = ScheduledJob.__table__
+        try:
+            with engine.begin() as conn:
+                conn.execute(update(table).where(
+                    table.c.name.in_(leader_jobs), table.c.owner == self.owner
+                ).values(lease_expires_at=None))
+        except Exception:
+            logger.exception("Could not release job leases")
+
+    def status(self, db: Session) -> List[Dict[str, Any]]:
+        """Every configured job with its interval and last run; for leader-only
+        jobs the last run is the cluster's, whichever worker made it"""
+        rows = {row.name: row for row in db.execute(select(ScheduledJob)).scalars()}
+        now = time.monotonic()
+        jobs = []
+        for job in self.jobs.values():
+            source = rows.get(job.name) if job.leader_only else None
+            record = source if source is not None else job
+            jobs.append({
+                "name": job.name,
+                "interval_seconds": job.interval,
+                "leader_only": job.leader_only,
+                "leader": source.owner if source is not None else None,
+                "is_leader": source is not None and source.owner == self.owner,
+                "lease_expires_at": source.lease_expires_at if source is not None else None,
+                "next_run_in_seconds": max(0.0, job.next_run - now),
+                "last_started_at": record.last_started_at,
+                "last_finished_at": record.last_finished_at,
+                "last_duration_ms": record.last_duration_ms,
+                "last_status": record.last_status,
+                "last_error": record.last_error,
+                "runs": record.runs,
+                "failures": record.failures,
+                "skipped": job.skipped,
+            })
+        return jobs
+
+
+scheduler = Scheduler()
@@ -0,0 +1,79 @@
+"""Resolve a dashboard and the data behind all of its widgets in one pass.
+
+Each widget names its series in ``config`` (``city``, ``metric_type`` and
+optionally ``range``, ``points``, ``method``) or in a ``data_source`` query
+string such as ``/metrics/series?city=Seattle&metric_type=temperature``;
+``config`` wins where both set a field. Identical requests are resolved
+once and every distinct request is fetched through
+``downsample.get_series_many``, so the query count depends on the sources
+read, not on the number of widgets.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Dashboard, Widget
+from app.services import downsample
+
+DEFAULT_RANGE = "24h"
+DEFAULT_POINTS = 300
+DEFAULT_METHOD = "lttb"
+MAX_POINTS = 5000
+
+_FIELDS = ("city", "metric_type", "range", "points", "method")
+
+
+def widget_spec(widget: Widget) -> Tuple[Optional[downsample.SeriesRequest], Optional[str]]:
+    """The series request behind a widget, or None and the reason there is none"""
+    spec: Dict[str, Any] = {}
+    if widget.data_source:
+        spec.update(parse_qsl(urlsplit(widget.data_source).query))
+    config = widget.config or {}
+    if "time_range" in config and "range" not in config:
+        config = {**config, "range": config["time_range"]}
+    spec.update({field: config[field] for field in _FIELDS if config.get(field) not in (None, "")})
+
+    if not spec.get("city") or not spec.get("metric_type"):
+        return None, "Widget has no city and metric_type"
+    window = downsample.parse_range(str(spec.get("range", DEFAULT_RANGE)))
+    if window is None:
+        return None, "Invalid range"
+    try:
+        points = int(spec.get("points", DEFAULT_POINTS))
+    except (TypeError, ValueError):
+        return None, "Invalid points"
+    if not 3 <= points <= MAX_POINTS:
+        return None, "Invalid points"
+    method = spec.get("method", DEFAULT_METHOD)
+    if method not in downsample.METHODS:
+        return None, "Invalid downsampling method"
+    return (str(spec["city"]), str(spec["metric_type"]), window, points, method), None
+
+
+def series_key(request: downsample.SeriesRequest) -> str:
+    city, metric_type, window, points, method = request
+    return f"{city}|{metric_type}|{int(window.total_seconds())}s|{points}|{method}"
+
+
+def build_snapshot(db: Session, dashboard: Dashboard) -> Dict[str, Any]:
+    """Layout plus the series for every widget of an already loaded dashboard"""
+    widgets: List[Dict[str, Any]] = []
+    requests: Dict[str, downsample.SeriesRequest] = {}
+    for widget in dashboard.widgets:
+        request, error = widget_spec(widget)
+        key = None
+        if request is not None:
+            key = series_key(request)
+            requests.setdefault(key, request)
+        widgets.append({"widget_id": widget.id, "series_key": key, "error": error})
+
+    keys = list(requests)
+    results = downsample.get_series_many(db, [requests[key] for key in keys]) if keys else []
+    return {
+        "dashboard": dashboard,
+        "widgets": widgets,
+        "series": dict(zip(keys, results)),
+        "generated_at": datetime.now(),
+    }
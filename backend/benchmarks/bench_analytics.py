@@ -0,0 +1,113 @@
+"""Compare the vectorized analytics service against per-row Python loops.
+
+Usage (from backend/):
+    python benchmarks/bench_analytics.py [points]
+
+Works on a synthetic in-memory series (one reading per minute) so only the
+computation is timed, not the database.
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from app.services import analytics
+
+POINTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+WINDOW = timedelta(hours=1)
+
+
+def make_series(n):
+    start = np.datetime64("2024-01-01T00:00:00", "ns")
+    timestamps = start + np.arange(n) * np.timedelta64(60, "s")
+    rng = np.random.default_rng(42)
+    values = 20 + 5 * np.sin(np.arange(n) / 720) + rng.normal(0, 1, n)
+    return analytics.MetricSeries(timestamps, values)
+
+
+def loop_rolling_mean(timestamps, values):
+    result, total, left = [], 0.0, 0
+    for right, (timestamp, value) in enumerate(zip(timestamps, values)):
+        total += value
+        while timestamps[left] <= timestamp - WINDOW:
+            total -= values[left]
+            left += 1
+        result.append(total / (right - left + 1))
+    return result
+
+
+def loop_percentiles(values, qs):
+    ordered = sorted(values)
+    results = []
+    for q in qs:
+        position = (len(ordered) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        results.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+    return results
+
+
+def loop_rate_of_change(timestamps, values):
+    rates = []
+    for i in range(1, len(values)):
+        seconds = (timestamps[i] - timestamps[i - 1]).total_seconds()
+        if seconds:
+            rates.append((values[i] - values[i - 1]) / seconds * 3600)
+    return rates
+
+
+def loop_resample_mean(timestamps, values):
+    buckets = {}
+    for timestamp, value in zip(timestamps, values):
+        key = timestamp.replace(minute=0, second=0, microsecond=0)
+        total, count = buckets.get(key, (0.0, 0))
+        buckets[key] = (total + value, count + 1)
+    return {key: total / count for key, (total, count) in buckets.items()}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    series = make_series(POINTS)
+    # What a per-row implementation works with: Python objects per reading
+    py_timestamps = [datetime(2024, 1, 1) + timedelta(minutes=i) for i in range(POINTS)]
+    py_values = series.values.tolist()
+
+    cases = [
+        ("rolling mean (1h)",
+         lambda: analytics.rolling_mean(series, "1h"),
+         lambda: loop_rolling_mean(py_timestamps, py_values)),
+        ("percentiles p50/p90/p99",
+         lambda: analytics.percentiles(series, [50, 90, 99]),
+         lambda: loop_percentiles(py_values, [50, 90, 99])),
+        ("rate of change (per hour)",
+         lambda: analytics.rate_of_change(series),
+         lambda: loop_rate_of_change(py_timestamps, py_values)),
+        ("resample mean (1h)",
+         lambda: analytics.resample(series, "1h"),
+         lambda: loop_resample_mean(py_timestamps, py_values)),
+    ]
+
+    print(f"{POINTS:,} points\n" + "=" * 66)
+    print(f"{'operation':<28} {'vectorized (ms)':>16} {'loop (ms)':>10} {'speedup':>9}")
+    for name, vectorized, loop in cases:
+        fast, fast_result = timed(vectorized)
+        slow, slow_result = timed(loop)
+        # Sanity check that both implementations agree
+        if name.startswith("rolling"):
+            assert np.allclose(fast_result.to_numpy(), slow_result)
+        elif name.startswith("percentiles"):
+            assert np.allclose(list(fast_result.values()), slow_result)
+        elif name.startswith("rate"):
+            assert np.allclose(fast_result[1], slow_result)
+        else:
+            assert np.allclose(fast_result.to_numpy(), list(slow_result.values()))
+        print(f"{name:<28} {fast * 1000:>16.1f} {slow * 1000:>10.1f} {slow / fast:>8.1f}x")
@@ -0,0 +1,136 @@
+"""Concurrent request throughput of the sync and async database stacks.
+
+Usage (from backend/):
+    python benchmarks/bench_async.py [requests_per_level]
+    DATABASE_URL=postgresql://... python benchmarks/bench_async.py
+
+The async stack is the real application. The sync stack is the same hot
+read endpoints written the way they were before the port: sync ``def``
+handlers on the sync engine, each holding a threadpool worker while it
+waits on the database. Both are driven in-process through ASGI at
+increasing concurrency. The difference grows with database round-trip
+latency, so numbers against a networked Postgres are the ones that matter;
+the default throwaway SQLite database mostly measures driver overhead.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_async.db')}"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.db import dimensions
+from app.db.base import engine
+from app.main import app
+from app.models.models import CityMetric, Dashboard, User, Widget
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+CONCURRENCY = (1, 8, 32, 128)
+CITIES = ["San Francisco", "New York", "Los Angeles", "Chicago", "Seattle"]
+PATHS = [
+    "/api/v1/metrics/?city=Seattle&metric_type=temperature&limit=50",
+    "/api/v1/metrics/cities",
+    "/api/v1/dashboards/1",
+]
+
+sync_app = FastAPI()
+
+
+@sync_app.get("/api/v1/metrics/")
+def sync_get_metrics(city: str, metric_type: str, limit: int = 100, db: Session = Depends(deps.get_db)):
+    start_date = datetime.now() - timedelta(days=7)
+    metrics = db.query(CityMetric).filter(
+        CityMetric.city == city,
+        CityMetric.metric_type == metric_type,
+        CityMetric.timestamp >= start_date
+    ).order_by(CityMetric.timestamp.desc()).limit(limit).all()
+    return [{"id": m.id, "value": m.value, "timestamp": m.timestamp} for m in metrics]
+
+
+@sync_app.get("/api/v1/metrics/cities")
+def sync_get_cities(db: Session = Depends(deps.get_db)):
+    return [city[0] for city in db.query(CityMetric.city).distinct().all()]
+
+
+@sync_app.get("/api/v1/dashboards/{dashboard_id}")
+def sync_get_dashboard(dashboard_id: int, db: Session = Depends(deps.get_db)):
+    dashboard = db.query(Dashboard).filter(Dashboard.id == dashboard_id).first()
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return {"id": dashboard.id, "widgets": [widget.id for widget in dashboard.widgets]}
+
+
+def seed():
+    now = datetime.now()
+    dimensions.ensure_names([{"city": city, "metric_type": "temperature"} for city in CITIES])
+    with engine.begin() as conn:
+        conn.execute(insert(CityMetric), [
+            {
+                "city": city,
+                "metric_type": "temperature",
+                "value": 15 + (i % 150) / 10,
+                "unit": "celsius",
+                "timestamp": now - timedelta(minutes=5 * i)
+            }
+            for city in CITIES
+            for i in range(2000)
+        ])
+        conn.execute(insert(User), [{"email": "bench@citypulse.com", "username": "bench", "hashed_password": "x"}])
+        conn.execute(insert(Dashboard), [{"title": "Bench", "owner_id": 1, "layout_config": {}}])
+        conn.execute(insert(Widget), [
+            {"dashboard_id": 1, "widget_type": "line_chart", "title": f"Widget {i}", "config": {}, "position": {}}
+            for i in range(6)
+        ])
+
+
+async def drive(target, concurrency):
+    """Issue REQUESTS requests round-robin over PATHS, ``concurrency`` at a time"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(PATHS[i % len(PATHS)])
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return REQUESTS / elapsed, latencies[int(len(latencies) * 0.95) - 1] * 1000, statistics.median(latencies) * 1000
+
+
+async def main():
+    async with app.router.lifespan_context(app):
+        print(f"{REQUESTS} requests per level on {engine.dialect.name}\n" + "=" * 72)
+        print(f"{'concurrency':>11} | {'sync req/s':>10} {'p50 ms':>8} {'p95 ms':>8} | {'async req/s':>11} {'p50 ms':>8} {'p95 ms':>8}")
+        for concurrency in CONCURRENCY:
+            sync_rps, sync_p95, sync_p50 = await drive(sync_app, concurrency)
+            async_rps, async_p95, async_p50 = await drive(app, concurrency)
+            print(
+                f"{concurrency:>11} | {sync_rps:>10.0f} {sync_p50:>8.1f} {sync_p95:>8.1f} | "
+                f"{async_rps:>11.0f} {async_p50:>8.1f} {async_p95:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    # Tables already exist: importing app.main runs init_db
+    seed()
+    asyncio.run(main())
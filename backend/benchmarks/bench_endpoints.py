@@ -0,0 +1,359 @@
+"""Latency percentiles and throughput of every API endpoint at several data scales.
+
+Usage (from backend/):
+    python benchmarks/bench_endpoints.py                          # 10k, 100k and 1M rows
+    python benchmarks/bench_endpoints.py --scales 10k,1m --requests 200 --concurrency 8
+    python benchmarks/bench_endpoints.py --compare benchmarks/results/endpoints-1a2b3c4.json
+
+Each scale runs in its own process against its own SQLite fixture, built
+with ``generate_data`` (deterministic for a given --seed). With
+--fixture-dir set, fixtures are kept there and reused by runs within
+FIXTURE_MAX_AGE of their build; windows such as "the last 7 days" are
+relative to now, so an older fixture would measure different data. Every
+run works on a copy, since the write endpoints add rows. The application
+is driven in-process through ASGI with its lifespan, the response cache
+off (so every request does the real work) and background jobs off.
+
+Results go to --out, by default ``benchmarks/results/endpoints-<commit>.json``.
+--compare prints each endpoint's p50 and throughput against an earlier
+results file, so regressions show up as a diff between commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND = Path(__file__).parent.parent
+sys.path.append(str(BACKEND))
+
+CITY = "Seattle"
+METRIC_TYPE = "temperature"
+DASHBOARDS = 20
+WIDGETS = 6
+FIXTURE_MAX_AGE = 6 * 3600  # seconds
+
+SCALE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1:] in SCALE_SUFFIXES:
+        return int(float(text[:-1]) * SCALE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def scale_name(rows: int) -> str:
+    if rows >= 1_000_000 and rows % 1_000_000 == 0:
+        return f"{rows // 1_000_000}m"
+    if rows >= 1_000 and rows % 1_000 == 0:
+        return f"{rows // 1_000}k"
+    return str(rows)
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Endpoint cases: (name, method, build request i -> (path, json body))
+
+Request = Tuple[str, Optional[Any]]
+
+
+def cases(state: Dict[str, Any]) -> List[Tuple[str, str, Callable[[int], Request]]]:
+    series = f"city={CITY}&metric_type={METRIC_TYPE}"
+    metrics = "/api/v1/metrics"
+    analytics = "/api/v1/metrics/analytics"
+    dashboards = "/api/v1/dashboards"
+    dashboard = state["dashboard_id"]
+
+    def created(i: int) -> int:
+        return state["created"][i % len(state["created"])]
+
+    return [
+        ("metrics.get_metrics", "GET", lambda i: (f"{metrics}/?{series}&days=30&limit=100", None)),
+        ("metrics.get_metrics_ndjson", "GET", lambda i: (f"{metrics}/?{series}&days=1&format=ndjson", None)),
+        ("metrics.get_cities", "GET", lambda i: (f"{metrics}/cities", None)),
+        ("metrics.get_metric_types", "GET", lambda i: (f"{metrics}/types", None)),
+        ("metrics.get_series_catalog", "GET", lambda i: (f"{metrics}/catalog?prefix=sea&limit=100", None)),
+        ("metrics.get_aggregated_metrics", "GET", lambda i: (f"{metrics}/aggregate?{series}&days=30&aggregation=avg", None)),
+        ("metrics.get_series", "GET", lambda i: (f"{metrics}/series?{series}&range=7d&points=300", None)),
+        ("metrics.get_latest_metrics", "GET", lambda i: (f"{metrics}/latest", None)),
+        ("metrics.get_latest_metrics_city", "GET", lambda i: (f"{metrics}/latest?city={CITY}", None)),
+        ("metrics.check_latest_cache", "GET", lambda i: (f"{metrics}/latest/check?city={CITY}", None)),
+        ("metrics.create_metric", "POST", lambda i: (f"{metrics}/", {
+            "city": CITY, "metric_type": METRIC_TYPE, "value": 20 + i % 10, "unit": "celsius", "source": "bench"
+        })),
+        ("metrics.bulk_create_metrics", "POST", lambda i: (f"{metrics}/bulk", [
+            {"city": CITY, "metric_type": METRIC_TYPE, "value": 20 + j % 10, "unit": "celsius", "source": "bench"}
+            for j in range(100)
+        ])),
+        ("analytics.rolling", "GET", lambda i: (f"{analytics}/rolling?{series}", None)),
+        ("analytics.percentiles", "GET", lambda i: (f"{analytics}/percentiles?{series}", None)),
+        ("analytics.rate", "GET", lambda i: (f"{analytics}/rate?{series}", None)),
+        ("analytics.resample", "GET", lambda i: (f"{analytics}/resample?{series}", None)),
+        ("dashboard.get_dashboards", "GET", lambda i: (f"{dashboards}/", None)),
+        ("dashboard.get_dashboard", "GET", lambda i: (f"{dashboards}/{dashboard}", None)),
+        ("dashboard.get_dashboard_widgets", "GET", lambda i: (f"{dashboards}/{dashboard}/widgets", None)),
+        ("dashboard.get_dashboard_snapshot", "GET", lambda i: (f"{dashboards}/{dashboard}/snapshot", None)),
+        ("dashboard.create_dashboard", "POST", lambda i: (f"{dashboards}/", {
+            "title": f"Bench {i}", "owner_id": state["owner_id"], "layout_config": {"columns": 12}
+        })),
+        ("dashboard.update_dashboard", "PUT", lambda i: (f"{dashboards}/{created(i)}", {"title": f"Bench {i} renamed"})),
+        ("dashboard.delete_dashboard", "DELETE", lambda i: (f"{dashboards}/{state['created'][i]}", None)),
+        ("admin.get_pool_stats", "GET", lambda i: ("/api/v1/admin/pool", None)),
+        ("admin.get_live_stats", "GET", lambda i: ("/api/v1/admin/live", None)),
+        ("admin.get_recent_store_stats", "GET", lambda i: ("/api/v1/admin/recent", None)),
+        ("admin.get_partitions", "GET", lambda i: ("/api/v1/admin/partitions", None)),
+        ("admin.get_jobs", "GET", lambda i: ("/api/v1/admin/jobs", None)),
+        ("health_check", "GET", lambda i: ("/health", None)),
+    ]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict[str, float]:
+    latencies = sorted(latencies)
+
+    def percentile(share: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * share))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "rps": len(latencies) / elapsed,
+    }
+
+
+async def measure(client, method: str, build: Callable[[int], Request], requests: int, warmup: int,
+                  concurrency: int, on_response: Optional[Callable[[Any], None]] = None) -> Dict[str, float]:
+    async def send(i: int):
+        path, body = build(i)
+        return await client.request(method, path, json=body)
+
+    for i in range(warmup):
+        response = await send(i)
+        if on_response is not None:
+            on_response(response)
+
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send(warmup + i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            elif on_response is not None:
+                on_response(response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def build_fixture(rows: int, seed: int):
+    """Generate ``rows`` readings over 30 days plus the dashboard fixtures"""
+    import generate_data
+    from app.db.base import SessionLocal
+    from app.db.init_db import init_db
+    from app.services import catalog, rollups
+
+    init_db()
+    types = len(generate_data.METRIC_TYPES)
+    cities = min(generate_data.MAX_DIMENSION_ROWS, max(5, rows // 20_000))
+    interval = max(1, 30 * 86400 * cities * types // rows)
+    args = generate_data.parser.parse_args([
+        "--cities", str(cities), "--days", "30", "--interval", str(interval), "--seed", str(seed)
+    ])
+    end = datetime.now().replace(microsecond=0)
+    plan = generate_data.Plan(args, end)
+    generate_data.load_metrics(plan, args.workers)
+    print()
+    with SessionLocal() as db:
+        rollups.rebuild(db)
+        catalog.rebuild(db)
+    generate_data.create_fixtures(seed, DASHBOARDS, WIDGETS)
+
+
+async def run_scale(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from sqlalchemy import func, select
+
+    from app.db.base import SessionLocal
+    from app.main import app
+    from app.models.models import CityMetric, Dashboard
+
+    with SessionLocal() as db:
+        state = {
+            "rows": db.execute(select(func.count()).select_from(CityMetric)).scalar(),
+            "dashboard_id": db.execute(select(func.min(Dashboard.id))).scalar(),
+            "owner_id": db.execute(select(func.min(Dashboard.owner_id))).scalar(),
+            "created": [],
+        }
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name, method, build in cases(state):
+                if args.only and not any(part in name for part in args.only.split(",")):
+                    continue
+                on_response = None
+                if name == "dashboard.create_dashboard":
+                    on_response = lambda response: state["created"].append(response.json()["id"])
+                elif name in ("dashboard.update_dashboard", "dashboard.delete_dashboard") and not state["created"]:
+                    continue
+                requests = args.requests
+                warmup = args.warmup
+                if name == "dashboard.delete_dashboard":
+                    # One delete per created dashboard, sequentially
+                    requests, warmup = len(state["created"]), 0
+                    result = await measure(client, method, build, requests, 0, 1)
+                else:
+                    result = await measure(client, method, build, requests, warmup, args.concurrency, on_response)
+                results[name] = result
+                print(
+                    f"  {name:<36} p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                    f"p99 {result['p99_ms']:>8.2f} ms  {result['rps']:>9,.0f} req/s"
+                    + (f"  {result['errors']} errors" if result["errors"] else ""),
+                    flush=True
+                )
+    return {"rows": state["rows"], "endpoints": results}
+
+
+def child(args: argparse.Namespace):
+    """Build the fixture for one scale, or benchmark a copy of it"""
+    from app.db.base import engine
+
+    if args.build:
+        build_fixture(args.rows, args.seed)
+        return
+    result = asyncio.run(run_scale(args))
+    result["database"] = engine.dialect.name
+    with open(args.child_out, "w") as out:
+        json.dump(result, out)
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"\nAgainst {baseline_path} ({baseline.get('commit', '?')}): p50 and req/s, new / old")
+    for scale, result in current["scales"].items():
+        old_scale = baseline.get("scales", {}).get(scale)
+        if old_scale is None:
+            continue
+        print(f"  {scale} rows")
+        for name, new in result["endpoints"].items():
+            old = old_scale["endpoints"].get(name)
+            if old is None:
+                continue
+            p50 = new["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("nan")
+            rps = new["rps"] / old["rps"] if old["rps"] else float("nan")
+            flag = "  <- slower" if p50 > 1.2 else ""
+            print(f"    {name:<36} p50 x{p50:>5.2f}  req/s x{rps:>5.2f}{flag}")
+
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--scales", default="10k,100k,1m", help="comma-separated row counts, e.g. 10k,100k,1m")
+parser.add_argument("--requests", type=int, default=100, help="timed requests per endpoint (default 100)")
+parser.add_argument("--warmup", type=int, default=5, help="untimed requests per endpoint first (default 5)")
+parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once (default 1)")
+parser.add_argument("--seed", type=int, default=42, help="fixture seed (default 42)")
+parser.add_argument("--only", help="comma-separated substrings of endpoint names to run")
+parser.add_argument("--fixture-dir", help="keep fixtures here and reuse them on later runs")
+parser.add_argument("--out", help="results file (default benchmarks/results/endpoints-<commit>.json)")
+parser.add_argument("--compare", help="earlier results file to compare against")
+parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+parser.add_argument("--child-out", help=argparse.SUPPRESS)
+parser.add_argument("--build", action="store_true", help=argparse.SUPPRESS)
+
+
+def main(args: argparse.Namespace):
+    fixture_dir = args.fixture_dir or tempfile.mkdtemp(prefix="bench_endpoints_")
+    os.makedirs(fixture_dir, exist_ok=True)
+    results = {
+        "commit": commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "scales": {},
+    }
+
+    for rows in sorted(parse_scale(scale) for scale in args.scales.split(",")):
+        name = scale_name(rows)
+        fixture = os.path.join(fixture_dir, f"endpoints-{name}-seed{args.seed}.db")
+        reused = os.path.exists(fixture) and time.time() - os.path.getmtime(fixture) < FIXTURE_MAX_AGE
+        print(f"{name} rows ({'reusing' if reused else 'building'} {fixture})", flush=True)
+        env = {
+            **os.environ,
+            "RESPONSE_CACHE_BACKEND": "off",
+            "SCHEDULER_ENABLED": "false",
+        }
+        command = [
+            sys.executable, __file__, "--rows", str(rows), "--seed", str(args.seed),
+            "--requests", str(args.requests), "--warmup", str(args.warmup), "--concurrency", str(args.concurrency),
+        ] + (["--only", args.only] if args.only else [])
+        if not reused:
+            if os.path.exists(fixture):
+                os.remove(fixture)
+            subprocess.run(command + ["--build"], env={**env, "DATABASE_URL": f"sqlite:///{fixture}"}, cwd=BACKEND, check=True)
+
+        scratch = os.path.join(fixture_dir, f"endpoints-{name}-run.db")
+        child_out = os.path.join(fixture_dir, f"endpoints-{name}.json")
+        shutil.copyfile(fixture, scratch)
+        try:
+            subprocess.run(
+                command + ["--child-out", child_out], env={**env, "DATABASE_URL": f"sqlite:///{scratch}"},
+                cwd=BACKEND, check=True
+            )
+        finally:
+            os.remove(scratch)
+        with open(child_out) as child_file:
+            results["scales"][name] = json.load(child_file)
+
+    if not args.fixture_dir:
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    out = args.out or str(BACKEND / "benchmarks" / "results" / f"endpoints-{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as out_file:
+        json.dump(results, out_file, indent=2)
+    print(f"\nResults written to {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    arguments = parser.parse_args()
+    if arguments.child_out or arguments.build:
+        child(arguments)
+    else:
+        main(arguments)
@@ -0,0 +1,82 @@
+"""Compare single-row metric ingestion against the bulk endpoint.
+
+Usage (from backend/):
+    python benchmarks/bench_ingest.py [rows] [batch_size]
+
+Runs against a throwaway SQLite database so it never touches real data.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_ingest.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+BATCH_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+CITIES = ["San Francisco", "New York", "Los Angeles", "Chicago", "Seattle"]
+
+
+def make_records(n):
+    return [
+        {
+            "city": CITIES[i % len(CITIES)],
+            "metric_type": "temperature",
+            "value": 15 + (i % 150) / 10,
+            "unit": "celsius",
+            "source": "City Sensors Network",
+            "meta_data": {"sensor_id": f"SENSOR-{1000 + i % 9000}"}
+        }
+        for i in range(n)
+    ]
+
+
+def bench_single(client, records):
+    start = time.perf_counter()
+    for record in records:
+        response = client.post("/api/v1/metrics/", json=record)
+        assert response.status_code == 200, response.text
+    return time.perf_counter() - start
+
+
+def bench_bulk_json(client, records):
+    start = time.perf_counter()
+    response = client.post(f"/api/v1/metrics/bulk?batch_size={BATCH_SIZE}", json=records)
+    assert response.status_code == 200 and response.json()["accepted"] == len(records), response.text
+    return time.perf_counter() - start
+
+
+def bench_bulk_ndjson(client, records):
+    body = "\n".join(json.dumps(record) for record in records)
+    start = time.perf_counter()
+    response = client.post(
+        f"/api/v1/metrics/bulk?batch_size={BATCH_SIZE}",
+        content=body,
+        headers={"content-type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200 and response.json()["accepted"] == len(records), response.text
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    client = TestClient(app)
+    records = make_records(ROWS)
+
+    print(f"Ingesting {ROWS} rows (batch size {BATCH_SIZE}) into {DB_PATH}\n" + "=" * 60)
+    results = [
+        ("single-row POST /metrics/", bench_single(client, records)),
+        ("bulk POST /metrics/bulk (JSON)", bench_bulk_json(client, records)),
+        ("bulk POST /metrics/bulk (NDJSON)", bench_bulk_ndjson(client, records)),
+    ]
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"{name:<36} {ROWS / elapsed:>12,.0f} rows/s  ({baseline / elapsed:.1f}x)")
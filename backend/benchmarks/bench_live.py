@@ -0,0 +1,155 @@
+"""Sustained live-stream subscribers on a single worker.
+
+Usage (from backend/):
+    python benchmarks/bench_live.py [seconds_per_level]
+
+Starts one uvicorn worker on a throwaway SQLite database, opens increasing
+numbers of SSE subscribers spread over a handful of topics, and ingests one
+reading per topic every 100 ms through ``POST /metrics/bulk`` while they are
+connected. Each reading carries its send time, so subscribers measure
+end-to-end latency from ingestion request to delivery. The clients share
+this machine and one Python process with the producer, so at high levels
+client-side parsing contributes to the latency figures.
+"""
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).parent.parent
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+LEVELS = (10, 100, 500, 1000)
+TOPICS = [f"Bench City {i}" for i in range(10)]
+INTERVAL = 0.1
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port):
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_live.db')}")
+    env.setdefault("RESPONSE_CACHE_BACKEND", "memory")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND,
+        env=env
+    )
+
+
+async def wait_ready(client):
+    for _ in range(100):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def subscriber(client, city, latencies, connected):
+    async with client.stream("GET", "/api/v1/live/sse", params={"topic": f"{city}:temperature"}) as response:
+        assert response.status_code == 200
+        connected.release()
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                reading = json.loads(line[6:])
+                latencies.append(time.time() - reading["meta_data"]["sent"])
+
+
+async def producer(client, stop):
+    sent = 0
+    next_tick = time.perf_counter()
+    while not stop.is_set():
+        now = time.time()
+        response = await client.post("/api/v1/metrics/bulk", json=[
+            {"city": city, "metric_type": "temperature", "value": 20.0, "unit": "celsius", "meta_data": {"sent": now}}
+            for city in TOPICS
+        ])
+        assert response.status_code == 200, response.text
+        sent += 1
+        next_tick += INTERVAL
+        await asyncio.sleep(max(0, next_tick - time.perf_counter()))
+    return sent
+
+
+async def run_level(base_url, subscribers):
+    limits = httpx.Limits(max_connections=subscribers + 10, max_keepalive_connections=subscribers + 10)
+    timeout = httpx.Timeout(30, read=None)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        latencies, stop = [], asyncio.Event()
+        connected = asyncio.Semaphore(0)
+        tasks = [
+            asyncio.create_task(subscriber(client, TOPICS[i % len(TOPICS)], latencies, connected))
+            for i in range(subscribers)
+        ]
+        for _ in range(subscribers):
+            await connected.acquire()
+
+        producing = asyncio.create_task(producer(client, stop))
+        await asyncio.sleep(SECONDS)
+        stop.set()
+        ticks = await producing
+        # Let in-flight readings arrive before disconnecting
+        await asyncio.sleep(1)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        stats = (await client.get("/api/v1/admin/live")).json()
+
+    expected = ticks * subscribers
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else float("nan")
+    return {
+        "subscribers": subscribers,
+        "delivered": len(latencies),
+        "expected": expected,
+        "per_second": len(latencies) / SECONDS,
+        "p50": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "dropped": stats["dropped"],
+    }
+
+
+async def main():
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port)
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            await wait_ready(client)
+
+        print(f"{len(TOPICS)} topics, 1 reading per topic every {INTERVAL * 1000:.0f} ms, {SECONDS:g}s per level\n" + "=" * 78)
+        print(f"{'subscribers':>11} {'delivered':>10} {'expected':>10} {'msgs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'dropped':>8}")
+        for level in LEVELS:
+            result = await run_level(base_url, level)
+            print(
+                f"{result['subscribers']:>11} {result['delivered']:>10} {result['expected']:>10} "
+                f"{result['per_second']:>9.0f} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+                f"{result['p99']:>8.1f} {result['dropped']:>8}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    # Each subscriber holds a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * max(LEVELS) + 256)), hard))
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Compare offset and cursor pagination of GET /metrics at increasing depth.
+
+Usage (from backend/):
+    python benchmarks/bench_pagination.py [page_size]
+
+Loads page_size * 10,000 rows of one series into a throwaway SQLite
+database, then times fetching pages 1, 100 and 10,000 both ways.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_pagination.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from app.api.pagination import encode_cursor
+from app.db.base import engine
+from app.main import app
+from app.db import dimensions
+from app.models.models import CityMetric
+
+PAGE_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+PAGES = (1, 100, 10_000)
+REPEAT = 20
+ROWS = PAGE_SIZE * max(PAGES) + PAGE_SIZE
+PARAMS = {"city": "Seattle", "metric_type": "temperature", "days": 365, "limit": PAGE_SIZE}
+
+
+def load_rows():
+    now = datetime.now()
+    dimensions.ensure_names([{"city": "Seattle", "metric_type": "temperature"}])
+    with engine.begin() as conn:
+        for offset in range(0, ROWS, 10_000):
+            conn.execute(insert(CityMetric), [
+                {
+                    "city": "Seattle",
+                    "metric_type": "temperature",
+                    "value": 15 + (i % 150) / 10,
+                    "unit": "celsius",
+                    # Two readings per second exercises the id tie-break
+                    "timestamp": now - timedelta(seconds=i // 2)
+                }
+                for i in range(offset, min(offset + 10_000, ROWS))
+            ])
+
+
+def cursor_before(page):
+    """Cursor a client would hold after walking to ``page`` (untimed)"""
+    if page == 1:
+        return None
+    with engine.connect() as conn:
+        timestamp, metric_id = conn.execute(
+            select(CityMetric.timestamp, CityMetric.id)
+            .order_by(CityMetric.timestamp.desc(), CityMetric.id.desc())
+            .offset((page - 1) * PAGE_SIZE - 1)
+            .limit(1)
+        ).one()
+    return encode_cursor(timestamp, metric_id)
+
+
+def timed(client, params):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        response = client.get("/api/v1/metrics/", params=params)
+        assert response.status_code == 200 and len(response.json()) == PAGE_SIZE, response.text
+    return (time.perf_counter() - start) / REPEAT * 1000, response.json()
+
+
+if __name__ == "__main__":
+    load_rows()
+    client = TestClient(app)
+
+    print(f"{ROWS:,} rows, page size {PAGE_SIZE}\n" + "=" * 60)
+    print(f"{'page':>8} {'offset (ms)':>14} {'cursor (ms)':>14}")
+    for page in PAGES:
+        offset_ms, offset_rows = timed(client, {**PARAMS, "skip": (page - 1) * PAGE_SIZE})
+        cursor = cursor_before(page)
+        cursor_ms, cursor_rows = timed(client, {**PARAMS, **({"cursor": cursor} if cursor else {})})
+        assert [r["id"] for r in offset_rows] == [r["id"] for r in cursor_rows]
+        print(f"{page:>8,} {offset_ms:>14.2f} {cursor_ms:>14.2f}")
@@ -0,0 +1,127 @@
+"""Rows per second served by GET /metrics and GET /metrics/latest, before
+and after the plain-column read path.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [repeat]
+
+"Before" is the previous handlers mounted on a side app: ORM entities for
+/metrics, and both endpoints validated through ``response_model`` and
+dumped with the stdlib encoder. "After" is the real application: column
+tuples dumped with orjson. Both are driven in-process through ASGI against
+the same throwaway SQLite database, with the response cache off.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}"
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.db import dimensions
+from app.db.base import SessionLocal, engine
+from app.main import app
+from app.models.models import CityMetric
+from app.schemas.metrics import MetricResponse
+from app.services.latest_cache import latest_values
+
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+PAGE_SIZES = (100, 1000, 10_000)
+CITIES = [f"City {i}" for i in range(200)]
+TYPES = [f"metric_{i}" for i in range(25)]
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/api/v1/metrics/", response_model=List[MetricResponse])
+async def legacy_get_metrics(
+    city: str,
+    metric_type: str,
+    limit: int = 100,
+    db: AsyncSession = Depends(deps.get_async_db)
+):
+    start_date = datetime.now() - timedelta(days=7)
+    result = await db.execute(
+        select(CityMetric).where(
+            CityMetric.city == city,
+            CityMetric.metric_type == metric_type,
+            CityMetric.timestamp >= start_date
+        ).order_by(CityMetric.timestamp.desc(), CityMetric.id.desc()).limit(limit + 1)
+    )
+    return result.scalars().all()[:limit]
+
+
+@legacy_app.get("/api/v1/metrics/latest", response_model=List[MetricResponse])
+async def legacy_get_latest(city: Optional[str] = None):
+    return latest_values.get(city)
+
+
+def load_rows():
+    now = datetime.now()
+    dimensions.ensure_names(
+        [{"city": "Seattle", "metric_type": "temperature", "source": "bench"}]
+        + [{"city": city, "metric_type": metric_type} for city in CITIES for metric_type in TYPES]
+    )
+    with engine.begin() as conn:
+        conn.execute(insert(CityMetric), [
+            {
+                "city": "Seattle",
+                "metric_type": "temperature",
+                "value": 15 + (i % 150) / 10,
+                "unit": "celsius",
+                "source": "bench",
+                "meta_data": {"sensor": i % 40},
+                "timestamp": now - timedelta(seconds=10 * i)
+            }
+            for i in range(max(PAGE_SIZES) + 1)
+        ])
+        # One reading per series for /latest
+        conn.execute(insert(CityMetric), [
+            {"city": city, "metric_type": metric_type, "value": 1.0, "unit": "count", "timestamp": now}
+            for city in CITIES
+            for metric_type in TYPES
+        ])
+    with SessionLocal() as db:
+        latest_values.warm(db)
+
+
+async def rows_per_second(target, path):
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        rows = len((await client.get(path)).json())  # warm up
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            response = await client.get(path)
+            assert response.status_code == 200, response.text
+        elapsed = time.perf_counter() - start
+    return rows, rows * REPEAT / elapsed
+
+
+async def main():
+    cases = [
+        (f"get_metrics limit={size}", f"/api/v1/metrics/?city=Seattle&metric_type=temperature&limit={size}")
+        for size in PAGE_SIZES
+    ] + [("get_latest_metrics", "/api/v1/metrics/latest")]
+
+    print(f"{'endpoint':<26} {'rows':>7} {'before rows/s':>14} {'after rows/s':>14} {'speedup':>8}")
+    for name, path in cases:
+        rows, before = await rows_per_second(legacy_app, path)
+        _, after = await rows_per_second(app, path)
+        print(f"{name:<26} {rows:>7,} {before:>14,.0f} {after:>14,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    load_rows()
+    asyncio.run(main())
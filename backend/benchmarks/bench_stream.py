@@ -0,0 +1,140 @@
+"""Peak server memory and time to first byte of GET /metrics exports.
+
+Usage (from backend/):
+    python benchmarks/bench_stream.py [max_rows]
+
+Loads max_rows readings (default 1,000,000) of one series into a throwaway
+SQLite database, then exports 1%, 10% and 100% of them as one json page
+and as streamed ndjson and csv. Each export runs against a fresh uvicorn
+worker so its peak RSS is the export's own. Buffered json is skipped above
+100,000 rows, where it would need several GB.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_stream.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert
+
+from app.db import dimensions
+from app.db.base import SessionLocal, engine
+from app.db.init_db import init_db
+from app.models.models import CityMetric
+from app.services import catalog, rollups
+
+BACKEND = Path(__file__).parent.parent
+MAX_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SIZES = sorted({max(1, MAX_ROWS // 100), max(1, MAX_ROWS // 10), MAX_ROWS})
+JSON_MAX_ROWS = 100_000
+
+
+def load_rows():
+    init_db()
+    now = datetime.now()
+    dimensions.ensure_names([{"city": "Seattle", "metric_type": "temperature", "source": "bench"}])
+    with engine.begin() as conn:
+        for offset in range(0, MAX_ROWS, 50_000):
+            conn.execute(insert(CityMetric), [
+                {
+                    "city": "Seattle",
+                    "metric_type": "temperature",
+                    "value": 15 + (i % 150) / 10,
+                    "unit": "celsius",
+                    "source": "bench",
+                    "meta_data": {"sensor": i % 40},
+                    "timestamp": now - timedelta(seconds=i)
+                }
+                for i in range(offset, min(offset + 50_000, MAX_ROWS))
+            ])
+    # Once here rather than at every worker's startup
+    with SessionLocal() as db:
+        rollups.rebuild(db)
+        catalog.rebuild(db)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+
+
+def export(format, rows):
+    port = free_port()
+    env = dict(os.environ, RESPONSE_CACHE_BACKEND="off", METRICS_PARTITIONING="false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND,
+        env=env
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            for _ in range(300):
+                try:
+                    client.get("/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            else:
+                raise RuntimeError("server did not start")
+            idle = peak_rss_mb(server.pid)
+
+            params = {"city": "Seattle", "metric_type": "temperature", "days": 3650, "limit": rows, "format": format}
+            start = time.perf_counter()
+            first_byte, size, lines = None, 0, 0
+            with client.stream("GET", "/api/v1/metrics/", params=params) as response:
+                assert response.status_code == 200, response.read()
+                for chunk in response.iter_bytes():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - start
+                    size += len(chunk)
+                    lines += chunk.count(b"\n")
+            total = time.perf_counter() - start
+            if format == "ndjson":
+                assert lines == rows, (lines, rows)
+            elif format == "csv":
+                assert lines == rows + 1, (lines, rows)
+            return {
+                "first_byte": first_byte * 1000,
+                "total": total,
+                "mb": size / 1e6,
+                "idle_rss": idle,
+                "peak_rss": peak_rss_mb(server.pid),
+            }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    print(f"Loading {MAX_ROWS:,} rows...")
+    load_rows()
+
+    print(f"{'rows':>10} {'format':>7} {'first byte ms':>14} {'total s':>8} {'body MB':>8} {'peak RSS MB':>12} {'over idle':>10}")
+    for rows in SIZES:
+        for format in ("json", "ndjson", "csv"):
+            if format == "json" and rows > JSON_MAX_ROWS:
+                print(f"{rows:>10,} {format:>7} {'skipped':>14}")
+                continue
+            result = export(format, rows)
+            print(
+                f"{rows:>10,} {format:>7} {result['first_byte']:>14.1f} {result['total']:>8.2f} "
+                f"{result['mb']:>8.1f} {result['peak_rss']:>12.0f} {result['peak_rss'] - result['idle_rss']:>10.0f}"
+            )
@@ -0,0 +1,322 @@
+"""Generate synthetic city metrics and dashboard fixtures for load testing.
+
+Every city reports every metric type once per --interval seconds over the
+last --days days: a daily cycle around a per-series level plus noise,
+computed with NumPy a whole chunk of readings at a time. Work is split
+into (city, time range) chunks of about --chunk-rows rows, and each chunk
+is seeded from --seed and its position, so a given seed and set of sizes
+always produces the same rows, whatever the number of workers.
+
+Chunks are generated in --workers processes. On Postgres each worker
+COPYs its own chunks; SQLite takes one writer, so workers only generate
+and the main process loads the chunks in time order with executemany.
+Rollups are rebuilt and partitions maintained afterwards, as at startup.
+
+Usage (from backend/):
+    python generate_data.py                                   # 5 cities x 9 types, hourly, 30 days
+    python generate_data.py --cities 2000 --types 20 --interval 60 --days 90 --workers 8
+    python generate_data.py --cities 0 --dashboards 10 --widgets 8   # fixtures only
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select, true
+
+from app.core.config import settings
+from app.db import dimensions
+from app.db.base import SessionLocal, engine
+from app.db.init_db import init_db
+from app.models.models import City, CityMetric, Dashboard, MetricType, User, Widget
+from app.services import catalog, partitions, rollups
+
+# (name, unit, low, high, decimals, daily swing as a share of the range)
+METRIC_TYPES = [
+    ("temperature", "celsius", 15, 30, 1, 0.3),
+    ("air_quality", "AQI", 20, 150, 0, 0.2),
+    ("traffic_flow", "vehicles/hour", 100, 5000, 0, 0.45),
+    ("crime_incidents", "count", 0, 50, 0, 0.1),
+    ("public_transport_usage", "passengers", 1000, 50000, 0, 0.4),
+    ("energy_consumption", "MWh", 100, 500, 2, 0.25),
+    ("water_usage", "gallons", 10000, 100000, 0, 0.2),
+    ("waste_collection", "tons", 50, 200, 1, 0.05),
+    ("population", "people", 800000, 900000, 0, 0.0),
+]
+CITY_NAMES = ["San Francisco", "New York", "Los Angeles", "Chicago", "Seattle"]
+AREAS = ["Downtown", "Suburbs", "Industrial", "Waterfront"]
+SOURCE = "City Sensors Network"
+
+WIDGET_TYPES = ["line_chart", "bar_chart", "metric_card"]
+WIDGET_RANGES = ["1h", "24h", "7d", "30d"]
+
+# Dimension ids are SMALLINT
+MAX_DIMENSION_ROWS = 32767
+
+# Columns written per reading; id and created_at come from the database
+COLUMNS = ("city_id", "metric_type_id", "value", "unit", "timestamp", "source_id", "meta_data")
+
+
+def city_names(count: int) -> List[str]:
+    return CITY_NAMES[:count] + [f"City {i:05d}" for i in range(len(CITY_NAMES), count)]
+
+
+def metric_types(count: int) -> List[Tuple[str, str, float, float, int, float]]:
+    extra = [(f"sensor_{i}", "units", 0, 100, 2, 0.2) for i in range(len(METRIC_TYPES), count)]
+    return METRIC_TYPES[:count] + extra
+
+
+class Plan:
+    """What to generate: the series, the time grid and its split into chunks"""
+
+    def __init__(self, args: argparse.Namespace, end: datetime):
+        self.seed = args.seed
+        self.cities = city_names(args.cities)
+        self.types = metric_types(args.types)
+        self.interval = args.interval
+        self.points = args.days * 86400 // args.interval
+        self.start = end - timedelta(seconds=self.points * args.interval)
+        self.chunk_points = max(1, args.chunk_rows // max(1, len(self.types)))
+        self.chunks = -(-self.points // self.chunk_points)
+        self.city_ids: Dict[str, int] = {}
+        self.type_ids: Dict[str, int] = {}
+        self.source_id: Optional[int] = None
+
+    @property
+    def rows(self) -> int:
+        return len(self.cities) * len(self.types) * self.points
+
+    def units(self) -> List[Tuple[int, int]]:
+        """(chunk, city) work units, oldest time range first"""
+        return [(chunk, city) for chunk in range(self.chunks) for city in range(len(self.cities))]
+
+
+def generate_chunk(plan: Plan, chunk: int, city: int) -> pd.DataFrame:
+    """The readings of every metric type of one city over one chunk of the
+    time grid, ordered by timestamp"""
+    first = chunk * plan.chunk_points
+    count = min(plan.chunk_points, plan.points - first)
+    offsets = (first + np.arange(count)) * plan.interval
+    timestamps = np.datetime64(plan.start, "us") + offsets.astype("timedelta64[s]")
+    day_fraction = (timestamps - timestamps.astype("datetime64[D]")) / np.timedelta64(1, "D")
+
+    columns = []
+    for type_index, (name, unit, low, high, decimals, swing) in enumerate(plan.types):
+        # Level, phase and sensor belong to the series; noise to the chunk
+        series = np.random.default_rng([plan.seed, city, type_index])
+        level = low + (high - low) * series.uniform(0.3, 0.7)
+        phase = series.uniform(0, 2 * np.pi)
+        meta_data = json.dumps({
+            "area": AREAS[series.integers(len(AREAS))],
+            "sensor_id": f"SENSOR-{series.integers(1000, 10000)}"
+        })
+        noise = np.random.default_rng([plan.seed, city, type_index, chunk]).normal(0, 0.05 * (high - low), count)
+        values = level + swing * (high - low) / 2 * np.sin(2 * np.pi * day_fraction - phase) + noise
+        columns.append((
+            plan.type_ids[name], np.round(np.clip(values, low, high), decimals), unit, meta_data
+        ))
+
+    types = len(columns)
+    frame = pd.DataFrame({
+        "city_id": np.full(count * types, plan.city_ids[plan.cities[city]], dtype=np.int16),
+        "metric_type_id": np.tile(np.array([column[0] for column in columns], dtype=np.int16), count),
+        "value": np.column_stack([column[1] for column in columns]).ravel(),
+        "unit": np.tile(np.array([column[2] for column in columns], dtype=object), count),
+        "timestamp": np.repeat(timestamps, types),
+        "source_id": np.full(count * types, plan.source_id, dtype=np.int16),
+        "meta_data": np.tile(np.array([column[3] for column in columns], dtype=object), count),
+    })
+    return frame
+
+
+# Worker processes
+
+_plan: Optional[Plan] = None
+
+
+def _init_worker(plan: Plan):
+    global _plan
+    _plan = plan
+    # Connections inherited over fork belong to the parent
+    engine.dispose(close=False)
+
+
+def _generate(unit: Tuple[int, int]) -> pd.DataFrame:
+    return generate_chunk(_plan, *unit)
+
+
+def _copy(unit: Tuple[int, int]) -> int:
+    """Generate one chunk and COPY it into Postgres"""
+    frame = generate_chunk(_plan, *unit)
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S.%f")
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {CityMetric.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        connection.commit()
+    finally:
+        connection.close()
+    return len(frame)
+
+
+def _sqlite_rows(frame: pd.DataFrame) -> List[Tuple[Any, ...]]:
+    # The format SQLAlchemy stores SQLite datetimes in
+    timestamps = frame["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return list(zip(
+        frame["city_id"].tolist(), frame["metric_type_id"].tolist(), frame["value"].tolist(),
+        frame["unit"].tolist(), timestamps.tolist(), frame["source_id"].tolist(), frame["meta_data"].tolist()
+    ))
+
+
+def load_metrics(plan: Plan, workers: int) -> int:
+    """Generate and load every chunk of ``plan``; returns the rows written"""
+    dimensions.cities.ensure(plan.cities)
+    dimensions.metric_types.ensure(name for name, *_ in plan.types)
+    dimensions.sources.ensure([SOURCE])
+    plan.city_ids = {name: dimensions.cities.id_for(name) for name in plan.cities}
+    plan.type_ids = {name: dimensions.metric_types.id_for(name) for name, *_ in plan.types}
+    plan.source_id = dimensions.sources.id_for(SOURCE)
+
+    written = 0
+    units = plan.units()
+    postgres = engine.dialect.name == "postgresql"
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(plan,)) as pool:
+        if postgres:
+            for rows in pool.imap_unordered(_copy, units):
+                written += rows
+                _progress(written, plan.rows)
+            return written
+
+        statement = (
+            f"INSERT INTO {CityMetric.__tablename__} ({', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+        )
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            # Durability is pointless for a dataset that can be regenerated
+            cursor.execute("PRAGMA synchronous = OFF")
+            # In order, so ids follow time as they do for live ingestion
+            for frame in pool.imap(_generate, units):
+                cursor.executemany(statement, _sqlite_rows(frame))
+                connection.commit()
+                written += len(frame)
+                _progress(written, plan.rows)
+        finally:
+            connection.close()
+    return written
+
+
+def _progress(written: int, total: int):
+    print(f"\r  {written:,} / {total:,} rows ({100 * written / total:.0f}%)", end="", flush=True)
+
+
+def create_fixtures(seed: int, dashboard_count: int, widgets_per_dashboard: int) -> int:
+    """Dashboards for the test user whose widgets chart random known series"""
+    rng = np.random.default_rng([seed, dashboard_count])
+    with engine.begin() as conn:
+        owner_id = conn.execute(select(User.id).where(User.username == "testuser")).scalar()
+        if owner_id is None:
+            owner_id = conn.execute(insert(User).returning(User.id), [{
+                "email": "test@citypulse.com",
+                "username": "testuser",
+                "hashed_password": "hashed_password_here",
+                "is_active": 1
+            }]).scalar()
+        # Every city reports every type, so the dimension tables name the series
+        series = conn.execute(
+            select(City.name, MetricType.name).join(MetricType, true()).order_by(City.name, MetricType.name)
+        ).all()
+        if not series:
+            raise SystemExit("No metrics to chart; generate some first")
+
+        dashboard_ids = conn.execute(insert(Dashboard).returning(Dashboard.id, sort_by_parameter_order=True), [
+            {
+                "title": f"Load test dashboard {i + 1}",
+                "description": f"{widgets_per_dashboard} generated widgets",
+                "owner_id": owner_id,
+                "is_public": 1,
+                "layout_config": {"columns": 12, "rowHeight": 50}
+            }
+            for i in range(dashboard_count)
+        ]).scalars().all()
+
+        widgets = []
+        for dashboard_id in dashboard_ids:
+            for position in range(widgets_per_dashboard):
+                city, metric_type = series[rng.integers(len(series))]
+                widgets.append({
+                    "dashboard_id": dashboard_id,
+                    "widget_type": WIDGET_TYPES[rng.integers(len(WIDGET_TYPES))],
+                    "title": f"{city} {metric_type.replace('_', ' ')}",
+                    "config": {
+                        "city": city,
+                        "metric_type": metric_type,
+                        "range": WIDGET_RANGES[rng.integers(len(WIDGET_RANGES))],
+                        "points": 300
+                    },
+                    "position": {"x": (position % 3) * 4, "y": (position // 3) * 4, "w": 4, "h": 4},
+                    "refresh_interval": 60
+                })
+        if widgets:
+            conn.execute(insert(Widget), widgets)
+    return len(widgets)
+
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--cities", type=int, default=5, help="number of cities (default 5)")
+parser.add_argument("--types", type=int, default=len(METRIC_TYPES), help=f"metric types per city (default {len(METRIC_TYPES)})")
+parser.add_argument("--days", type=int, default=30, help="days of history ending now (default 30)")
+parser.add_argument("--interval", type=int, default=3600, help="seconds between readings of a series (default 3600)")
+parser.add_argument("--seed", type=int, default=42, help="random seed (default 42)")
+parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="generator processes (default: CPU count)")
+parser.add_argument("--chunk-rows", type=int, default=100_000, help="rows per work unit (default 100000)")
+parser.add_argument("--dashboards", type=int, default=0, help="dashboards to create for the test user")
+parser.add_argument("--widgets", type=int, default=6, help="widgets per dashboard (default 6)")
+parser.add_argument("--skip-rollups", action="store_true", help="don't rebuild rollups after loading")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.cities > MAX_DIMENSION_ROWS or args.types > MAX_DIMENSION_ROWS:
+        parser.error(f"at most {MAX_DIMENSION_ROWS} cities and types")
+    if args.interval <= 0 or args.chunk_rows <= 0 or args.workers <= 0:
+        parser.error("--interval, --chunk-rows and --workers must be positive")
+
+    init_db()
+    end = datetime.now().replace(microsecond=0)
+    plan = Plan(args, end - timedelta(seconds=end.timestamp() % args.interval))
+    if plan.rows:
+        print(
+            f"Generating {plan.rows:,} rows: {len(plan.cities)} cities x {len(plan.types)} types x "
+            f"{plan.points:,} readings, {plan.chunks * len(plan.cities):,} chunks on {args.workers} workers"
+        )
+        started = time.perf_counter()
+        written = load_metrics(plan, args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"\n✅ Loaded {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+        db = SessionLocal()
+        try:
+            catalog.rebuild(db)
+            print("✅ Rebuilt the series catalog")
+            if not args.skip_rollups:
+                started = time.perf_counter()
+                rollups.rebuild(db)
+                print(f"✅ Rebuilt rollups in {time.perf_counter() - started:.1f}s")
+            if settings.METRICS_PARTITIONING:
+                result = partitions.maintain(db)
+                print(f"✅ Partitions: {len(result['created'])} created, {len(result['dropped'])} dropped")
+        finally:
+            db.close()
+
+    if args.dashboards:
+        widgets = create_fixtures(args.seed, args.dashboards, args.widgets)
+        print(f"✅ Created {args.dashboards} dashboards with {widgets} widgets")
@@ -0,0 +1,92 @@
+"""Shared fixtures: the app on a throwaway SQLite database.
+
+Set TEST_DATABASE_URL to run the suite against an empty scratch database
+instead, e.g. Postgres:
+
+    TEST_DATABASE_URL=postgresql://.../scratch python -m pytest
+
+Settings and engines are created when ``app`` is first imported, so the
+environment is set here before any test module imports it. All tests share
+one database and one app; each test writes under its own city names so
+they do not see each other's readings.
+"""
+import os
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/tests.db"
+os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["PROFILE_ENABLED"] = "false"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from app.db import dimensions
+from app.db.base import SessionLocal, async_engine, engine
+from app.main import app
+from app.models.models import CityMetric, User
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def owner(client):
+    """Id of a user to own test dashboards"""
+    session = SessionLocal()
+    try:
+        user = User(email="tests@citypulse.com", username="tests", hashed_password="x")
+        session.add(user)
+        session.commit()
+        return user.id
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def city():
+    """A city name no other test uses"""
+    return f"Testville {uuid.uuid4().hex[:8]}"
+
+
+def insert_outside_ingestion(rows):
+    """Write metric rows straight to the table, as a seed script or another
+    process would: no rollups, catalog or in-memory caches are updated"""
+    dimensions.ensure_names(rows)
+    with engine.begin() as conn:
+        conn.execute(insert(CityMetric), rows)
+
+
+@contextmanager
+def count_statements():
+    """Collect the statements the API sends to the database inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    target = async_engine.sync_engine
+    event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime, timedelta
+
+CACHE_STATUS = "X-Cache"
+
+
+def get(client, path, **params):
+    response = client.get(path, params=params)
+    response.raise_for_status()
+    return response
+
+
+def test_new_city_invalidates_cached_cities(client, city):
+    get(client, "/api/v1/metrics/cities")
+    cached = get(client, "/api/v1/metrics/cities")
+    assert cached.headers[CACHE_STATUS] == "HIT"
+    assert city not in cached.json()
+
+    client.post("/api/v1/metrics/", json={"city": city, "metric_type": "temperature", "value": 12.5}).raise_for_status()
+
+    refreshed = get(client, "/api/v1/metrics/cities")
+    assert refreshed.headers[CACHE_STATUS] == "MISS"
+    assert city in refreshed.json()
+
+
+def test_new_metric_type_invalidates_cached_types(client, city):
+    metric_type = f"pollen_{uuid.uuid4().hex[:8]}"
+    get(client, "/api/v1/metrics/types")
+    assert get(client, "/api/v1/metrics/types").headers[CACHE_STATUS] == "HIT"
+
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": metric_type, "value": 3.0, "unit": "grains/m³"}
+    ]).raise_for_status()
+
+    refreshed = get(client, "/api/v1/metrics/types")
+    assert refreshed.headers[CACHE_STATUS] == "MISS"
+    assert metric_type in refreshed.json()
+
+
+def test_known_series_keeps_cached_cities(client, city):
+    reading = {"city": city, "metric_type": "temperature", "value": 1.0}
+    client.post("/api/v1/metrics/", json=reading).raise_for_status()
+    get(client, "/api/v1/metrics/cities")
+
+    client.post("/api/v1/metrics/", json=reading).raise_for_status()
+
+    assert get(client, "/api/v1/metrics/cities").headers[CACHE_STATUS] == "HIT"
+
+
+def test_catalog_counts_ingested_series(client, city):
+    now = datetime.now().replace(microsecond=0)
+    first, last = now - timedelta(hours=3), now - timedelta(hours=1)
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": "traffic_flow", "value": 10.0, "unit": "vph", "timestamp": first.isoformat()},
+        {"city": city, "metric_type": "traffic_flow", "value": 20.0, "unit": "vph", "timestamp": last.isoformat()},
+        {"city": city, "metric_type": "traffic_flow", "value": 30.0, "timestamp": last.isoformat()},
+    ]).raise_for_status()
+
+    series = get(client, "/api/v1/metrics/catalog", city=city).json()
+
+    assert [(entry["metric_type"], entry["unit"], entry["row_count"]) for entry in series] == [
+        ("traffic_flow", None, 1),
+        ("traffic_flow", "vph", 2),
+    ]
+    assert series[1]["first_seen"] == first.isoformat()
+    assert series[1]["last_seen"] == last.isoformat()
+
+
+def test_catalog_prefix_search_is_case_insensitive_and_paged(client, city):
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": metric_type, "value": 1.0}
+        for metric_type in ("air_quality", "humidity", "noise_level")
+    ]).raise_for_status()
+
+    first = get(client, "/api/v1/metrics/catalog", prefix=city.upper(), limit=2)
+    second = get(client, "/api/v1/metrics/catalog", prefix=city.upper(), limit=2, cursor=first.headers["X-Next-Cursor"])
+
+    assert [entry["metric_type"] for entry in first.json() + second.json()] == ["air_quality", "humidity", "noise_level"]
+    assert "X-Next-Cursor" not in second.headers
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.downsample import choose_resolution, lttb, min_max, parse_range
+
+
+def spiky(n):
+    """A gentle wave with one spike up and one down, far from the ends"""
+    x = np.arange(n, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[n // 3] = 100.0
+    y[2 * n // 3] = -100.0
+    return x, y
+
+
+@pytest.mark.parametrize("threshold", [3, 10, 99, 500])
+def test_lttb_keeps_the_ends_and_the_spikes(threshold):
+    x, y = spiky(1000)
+
+    indices = lttb(x, y, threshold)
+
+    assert len(indices) == threshold
+    assert (indices[0], indices[-1]) == (0, 999)
+    assert np.all(np.diff(indices) > 0)
+    if threshold > 3:
+        assert {333, 666} <= set(indices.tolist())
+
+
+def test_lttb_returns_short_series_unchanged():
+    x, y = spiky(50)
+
+    assert lttb(x, y, 50).tolist() == list(range(50))
+    assert lttb(x, y, 2).tolist() == list(range(50))
+
+
+@pytest.mark.parametrize("threshold", [2, 11, 100])
+def test_min_max_keeps_every_extreme_within_the_threshold(threshold):
+    _, y = spiky(1000)
+
+    picks = min_max(y, y, threshold)
+
+    assert len(picks) <= threshold
+    assert [i for i, _ in picks] == sorted(i for i, _ in picks)
+    assert (333, "high") in picks
+    assert (666, "low") in picks
+
+
+def test_min_max_returns_short_series_unchanged():
+    _, y = spiky(10)
+
+    assert min_max(y, y, 10) == [(i, "value") for i in range(10)]
+
+
+def test_range_and_resolution():
+    assert parse_range("90m") == timedelta(minutes=90)
+    assert parse_range("0h") is None
+    assert parse_range("1w") is None
+    assert choose_resolution(timedelta(days=30), 20) == "day"
+    assert choose_resolution(timedelta(hours=24), 24) == "hour"
+    assert choose_resolution(timedelta(hours=24), 300) == "minute"
+    assert choose_resolution(timedelta(hours=1), 300) is None
+
+
+@pytest.mark.parametrize("spacing, time_range, points, method, source", [
+    (3, "1h", 100, "lttb", "raw"),
+    (3, "1h", 101, "minmax", "raw"),
+    (70, "24h", 100, "minmax", "minute"),
+])
+def test_series_endpoint_keeps_the_extremes(client, city, spacing, time_range, points, method, source):
+    now = datetime.now().replace(microsecond=0)
+    values = [float(i % 7) for i in range(1000)]
+    values[300], values[700] = 500.0, -500.0
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": "noise_level", "value": value,
+         "timestamp": (now - timedelta(seconds=spacing * i)).isoformat()}
+        for i, value in enumerate(values)
+    ]).raise_for_status()
+
+    response = client.get("/api/v1/metrics/series", params={
+        "city": city, "metric_type": "noise_level", "range": time_range, "points": points, "method": method
+    })
+    response.raise_for_status()
+    series = response.json()
+
+    assert series["source"] == source
+    assert series["total_points"] > points
+    assert len(series["points"]) <= points
+    kept = [point["value"] for point in series["points"]]
+    assert (max(kept), min(kept)) == (500.0, -500.0)
+
+
+def test_series_rejects_bad_parameters(client, city):
+    params = {"city": city, "metric_type": "noise_level"}
+    assert client.get("/api/v1/metrics/series", params={**params, "range": "1w"}).status_code == 400
+    assert client.get("/api/v1/metrics/series", params={**params, "method": "mean"}).status_code == 400
+    assert client.get("/api/v1/metrics/series", params={**params, "points": 2}).status_code == 422
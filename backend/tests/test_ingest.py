@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timedelta
+
+
+def records(city, count, start=0):
+    now = datetime.now()
+    return [
+        {
+            "city": city,
+            "metric_type": "temperature",
+            "value": float(i),
+            "unit": "°C",
+            "timestamp": (now - timedelta(minutes=i)).isoformat()
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def stored(client, city):
+    response = client.get("/api/v1/metrics/", params={"city": city, "limit": 1000})
+    response.raise_for_status()
+    return response.json()
+
+
+def test_bulk_json_acks_each_batch(client, city):
+    response = client.post("/api/v1/metrics/bulk", params={"batch_size": 4}, json=records(city, 10))
+    response.raise_for_status()
+    body = response.json()
+
+    assert body["accepted"] == 10
+    assert body["rejected"] == 0
+    assert [(ack["batch"], ack["start_index"], ack["accepted"]) for ack in body["batches"]] == [
+        (0, 0, 4), (1, 4, 4), (2, 8, 2)
+    ]
+    assert len(stored(client, city)) == 10
+
+
+def test_bulk_ndjson_acks_each_batch(client, city):
+    lines = "\n".join(json.dumps(record) for record in records(city, 5)) + "\n"
+    response = client.post(
+        "/api/v1/metrics/bulk",
+        params={"batch_size": 2},
+        content=lines,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    response.raise_for_status()
+    body = response.json()
+
+    assert body["accepted"] == 5
+    assert [ack["accepted"] for ack in body["batches"]] == [2, 2, 1]
+    assert len(stored(client, city)) == 5
+
+
+def test_bulk_rejects_only_the_invalid_batch(client, city):
+    batch = records(city, 6)
+    batch[4]["value"] = "not a number"
+    response = client.post("/api/v1/metrics/bulk", params={"batch_size": 3}, json=batch)
+    response.raise_for_status()
+    body = response.json()
+
+    assert (body["accepted"], body["rejected"]) == (3, 3)
+    first, second = body["batches"]
+    assert (first["accepted"], first["rejected"], first["errors"]) == (3, 0, [])
+    assert (second["accepted"], second["rejected"]) == (0, 3)
+    # Indexed into the whole request
+    assert [(error["index"], error["loc"]) for error in second["errors"]] == [(4, ["value"])]
+    assert len(stored(client, city)) == 3
+
+
+def test_bulk_rejects_a_body_that_is_not_an_array(client):
+    response = client.post("/api/v1/metrics/bulk", json={"city": "Seattle"})
+    assert response.status_code == 400
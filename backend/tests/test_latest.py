@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app.services.latest_cache import latest_values, query_latest
+from tests.conftest import insert_outside_ingestion
+
+FIELDS = ("id", "city", "metric_type", "value", "unit", "timestamp")
+
+
+def test_latest_matches_sql_after_ingest(client, db, city):
+    now = datetime.now().replace(microsecond=0)
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": metric_type, "value": float(i), "unit": "u",
+         "timestamp": (now - timedelta(minutes=i)).isoformat()}
+        for metric_type in ("air_quality", "humidity")
+        for i in range(5)
+    ]).raise_for_status()
+    # A late reading does not replace the newer one
+    client.post("/api/v1/metrics/", json={
+        "city": city, "metric_type": "humidity", "value": 99.0, "timestamp": (now - timedelta(hours=1)).isoformat()
+    }).raise_for_status()
+
+    response = client.get("/api/v1/metrics/latest", params={"city": city})
+    response.raise_for_status()
+    expected = sorted(query_latest(db, city), key=lambda row: row["metric_type"])
+
+    assert [row["value"] for row in response.json()] == [0.0, 0.0]
+    assert [{field: row[field] for field in FIELDS} for row in response.json()] == [
+        {field: (row[field].isoformat() if field == "timestamp" else row[field]) for field in FIELDS}
+        for row in expected
+    ]
+
+
+def test_check_reports_writes_the_cache_missed(client, db, city):
+    now = datetime.now().replace(microsecond=0)
+    client.post("/api/v1/metrics/", json={
+        "city": city, "metric_type": "humidity", "value": 1.0, "timestamp": (now - timedelta(minutes=5)).isoformat()
+    }).raise_for_status()
+    check = client.get("/api/v1/metrics/latest/check", params={"city": city}).json()
+    assert (check["consistent"], check["series"]) == (True, 1)
+
+    insert_outside_ingestion([
+        {"city": city, "metric_type": "humidity", "value": 2.0, "timestamp": now},
+        {"city": city, "metric_type": "pressure", "value": 3.0, "timestamp": now},
+    ])
+
+    check = client.get("/api/v1/metrics/latest/check", params={"city": city}).json()
+    assert not check["consistent"]
+    assert check["stale"] == [{"city": city, "metric_type": "humidity"}]
+    assert check["missing"] == [{"city": city, "metric_type": "pressure"}]
+
+    latest_values.warm(db)
+
+    assert client.get("/api/v1/metrics/latest/check", params={"city": city}).json()["consistent"]
+    assert [row["value"] for row in client.get("/api/v1/metrics/latest", params={"city": city}).json()] == [2.0, 3.0]
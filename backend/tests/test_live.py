@@ -0,0 +1,56 @@
+import time
+from datetime import datetime
+
+from app.services.live import live_hub
+
+
+def sync_with(ws):
+    """Messages are handled in order, so once the reply to a bad one arrives
+    every earlier (un)subscribe has taken effect"""
+    ws.send_text("sync")
+    assert "error" in ws.receive_json()
+
+
+def ingest(client, city, metric_type, value):
+    client.post("/api/v1/metrics/bulk", json=[{
+        "city": city, "metric_type": metric_type, "value": value, "unit": "u",
+        "timestamp": datetime.now().replace(microsecond=0).isoformat()
+    }]).raise_for_status()
+
+
+def test_websocket_subscriber_receives_ingested_readings(client, city):
+    with client.websocket_connect("/api/v1/live/ws") as ws:
+        ws.send_json({"action": "subscribe", "topics": [f"{city}:humidity"]})
+        sync_with(ws)
+
+        ingest(client, city, "temperature", 1.0)
+        ingest(client, city, "humidity", 2.0)
+
+        # The same shape as GET /metrics
+        listed = client.get("/api/v1/metrics/", params={"city": city, "metric_type": "humidity"}).json()
+        assert ws.receive_json() == listed[0]
+        assert listed[0]["value"] == 2.0
+
+        ws.send_json({"action": "unsubscribe", "topics": [f"{city}:humidity"]})
+        ws.send_json({"action": "subscribe", "topics": [f"{city}:*"]})
+        sync_with(ws)
+        ingest(client, city, "humidity", 3.0)
+        ingest(client, city, "temperature", 4.0)
+
+        assert [ws.receive_json()["value"] for _ in range(2)] == [3.0, 4.0]
+
+    # The server side notices the close on its own schedule
+    deadline = time.monotonic() + 2
+    while live_hub.stats()["subscriptions"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert live_hub.stats()["subscriptions"] == 0
+
+
+def test_websocket_rejects_malformed_topics(client):
+    with client.websocket_connect("/api/v1/live/ws") as ws:
+        ws.send_json({"action": "subscribe", "topics": ["no-metric-type"]})
+        assert "city:metric_type" in ws.receive_json()["error"]
+
+
+def test_sse_rejects_malformed_topics(client):
+    assert client.get("/api/v1/live/sse", params={"topic": "no-metric-type"}).status_code == 400
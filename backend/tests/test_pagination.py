@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Dashboard
+
+NEXT_CURSOR = "X-Next-Cursor"
+
+
+def walk(client, path, params):
+    """Every page of a listing, following X-Next-Cursor until it stops"""
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(path, params=dict(params, **({"cursor": cursor} if cursor else {})))
+        response.raise_for_status()
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR)
+        if cursor is None:
+            return pages
+
+
+def test_metrics_cursor_walk_returns_every_row_once(client, city):
+    now = datetime.now().replace(microsecond=0)
+    # Pairs of readings share a timestamp, so pages must break ties on id
+    client.post("/api/v1/metrics/bulk", json=[
+        {
+            "city": city,
+            "metric_type": "humidity",
+            "value": float(i),
+            "timestamp": (now - timedelta(minutes=i // 2)).isoformat()
+        }
+        for i in range(11)
+    ]).raise_for_status()
+
+    params = {"city": city, "limit": 3}
+    pages = walk(client, "/api/v1/metrics/", params)
+    rows = [row for page in pages for row in page]
+
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    everything = client.get("/api/v1/metrics/", params={"city": city, "limit": 100}).json()
+    assert rows == everything
+    keys = [(row["timestamp"], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_dashboard_cursor_walk_returns_every_dashboard_once(client, db, owner):
+    db.add_all([Dashboard(title=f"Paged {i}", owner_id=owner, layout_config={}) for i in range(7)])
+    db.commit()
+
+    pages = walk(client, "/api/v1/dashboards/", {"limit": 2})
+    ids = [dashboard["id"] for page in pages for dashboard in page]
+
+    assert all(len(page) == 2 for page in pages[:-1])
+    everything = client.get("/api/v1/dashboards/", params={"limit": 1000}).json()
+    assert ids == [dashboard["id"] for dashboard in everything]
+    assert ids == sorted(set(ids))
+
+
+@pytest.mark.parametrize("path", ["/api/v1/metrics/", "/api/v1/dashboards/"])
+@pytest.mark.parametrize("limit", [0, -1])
+def test_non_positive_limit_is_rejected(client, path, limit):
+    assert client.get(path, params={"limit": limit}).status_code == 422
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30"])
+def test_malformed_cursor_is_rejected(client, cursor):
+    assert client.get("/api/v1/metrics/", params={"cursor": cursor}).status_code == 400
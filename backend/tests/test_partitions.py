@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select, text
+
+from app.core.config import settings
+from app.models.models import CityMetric, MetricRollup
+from app.services import archive, partitions
+from app.services.latest_cache import query_latest
+from app.services.response_cache import response_cache
+from tests.test_rollups import raw_daily
+
+HOT_MONTHS = 2
+# Months before the current one that get seeded, oldest first
+SEEDED_MONTHS = (-5, -4, -3)
+
+
+@pytest.fixture
+def partitioning(db, monkeypatch):
+    """Partitioning on, two hot months and no response cache. Month tables
+    are folded back into city_metrics afterwards, so later tests see a
+    plain table again."""
+    monkeypatch.setattr(settings, "METRICS_PARTITIONING", True)
+    monkeypatch.setattr(settings, "METRICS_HOT_MONTHS", HOT_MONTHS)
+    monkeypatch.setattr(response_cache, "backend", None)
+    yield
+    db.rollback()
+    columns = list(CityMetric.__table__.c.keys())
+    for month in partitions._months(db):
+        table = partitions.partition_table(partitions.partition_name(month))
+        db.execute(insert(CityMetric.__table__).from_select(columns, select(*[table.c[column] for column in columns])))
+        db.execute(text(f"DROP TABLE {table.name}"))
+    db.commit()
+
+
+def month(offset):
+    return partitions.add_months(partitions.month_start(datetime.now()), offset)
+
+
+def seed_months(client, city):
+    """Readings every 13 hours through the seeded months, plus one now so
+    the newest id stays in the hot table"""
+    records = []
+    for offset in SEEDED_MONTHS:
+        timestamp, end = month(offset), month(offset + 1)
+        i = 0
+        while timestamp < end:
+            records.append({
+                "city": city,
+                # pm25 stops with the seeded months, so its latest reading moves out
+                "metric_type": "noise_level" if i % 3 else "pm25",
+                "value": float(i % 17),
+                "unit": "dB" if i % 3 else "µg/m³",
+                "timestamp": timestamp.isoformat()
+            })
+            timestamp += timedelta(hours=13)
+            i += 1
+    records.append({"city": city, "metric_type": "noise_level", "value": 1.0, "unit": "dB",
+                    "timestamp": datetime.now().replace(microsecond=0).isoformat()})
+    client.post("/api/v1/metrics/bulk", json=records).raise_for_status()
+    return records
+
+
+def reads(client, db, city):
+    """What the API serves for the city, across every seeded month"""
+    days = (datetime.now() - month(SEEDED_MONTHS[0])).days + 1
+    metrics = client.get("/api/v1/metrics/", params={"city": city, "days": days, "limit": 1000})
+    aggregates = {
+        metric_type: client.get("/api/v1/metrics/aggregate", params={
+            "city": city, "metric_type": metric_type, "days": days, "aggregation": "sum"
+        }).json()
+        for metric_type in ("noise_level", "pm25")
+    }
+    latest = sorted(query_latest(db, city), key=lambda row: row["metric_type"])
+    return metrics.json(), aggregates, latest
+
+
+def hot_rows(db, city, start, end):
+    return db.execute(select(func.count()).select_from(CityMetric).where(
+        CityMetric.city == city, CityMetric.timestamp >= start, CityMetric.timestamp < end
+    )).scalar()
+
+
+def test_retention_without_partitioning_keeps_live_aggregates(client, db, city, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "METRICS_PARTITIONING", False)
+    monkeypatch.setattr(settings, "METRICS_RETENTION_DAYS", 1)
+    monkeypatch.setattr(settings, "METRICS_ARCHIVE_DIR", str(tmp_path))
+    now = datetime.now().replace(microsecond=0)
+    # Starts part way through a day, before the aggregate window does
+    first = now - timedelta(days=3, hours=5, minutes=-30)
+    records = [
+        {
+            "city": city,
+            "metric_type": "noise_level",
+            "value": float(i % 7),
+            "unit": "dB",
+            "timestamp": (first + timedelta(hours=i)).isoformat()
+        }
+        for i in range(3 * 24 + 4)
+    ]
+    client.post("/api/v1/metrics/bulk", json=records).raise_for_status()
+    archive.export(db, CityMetric.__table__)
+    # Live rows the archive does not have
+    late = {"city": city, "metric_type": "noise_level", "value": 50.0, "unit": "dB",
+            "timestamp": (now - timedelta(days=2)).isoformat()}
+    client.post("/api/v1/metrics/bulk", json=[late]).raise_for_status()
+
+    assert partitions.retention_cutoff() is None
+    start = now - timedelta(days=3)
+    response = client.get("/api/v1/metrics/aggregate", params={
+        "city": city, "metric_type": "noise_level", "days": 3, "aggregation": "sum"
+    })
+    response.raise_for_status()
+
+    expected = raw_daily(records + [late], start)
+    assert [(result["date"], result["value"]) for result in response.json()] == [
+        (result["date"], pytest.approx(result["sum"])) for result in expected
+    ]
+
+
+def test_maintain_is_refused_without_partitioning(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_PARTITIONING", False)
+    old = datetime.now() - timedelta(days=400)
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": "Maintainville", "metric_type": "humidity", "value": 1.0, "timestamp": old.isoformat()}
+    ]).raise_for_status()
+
+    assert client.post("/api/v1/admin/partitions/maintain").status_code == 409
+    assert partitions.list_partitions(db) == []
+
+
+def test_rotation_keeps_reads_unchanged(client, db, city, partitioning):
+    records = seed_months(client, city)
+    before = reads(client, db, city)
+    assert len(before[0]) == len(records)
+
+    response = client.post("/api/v1/admin/partitions/maintain")
+    response.raise_for_status()
+
+    moved = {partitions.partition_name(month(offset)) for offset in SEEDED_MONTHS}
+    assert moved <= set(response.json()["created"])
+    assert response.json()["dropped"] == []
+    assert hot_rows(db, city, month(SEEDED_MONTHS[0]), month(SEEDED_MONTHS[-1] + 1)) == 0
+    # Reads now union the hot table with the month tables
+    assert reads(client, db, city) == before
+
+
+def test_rotation_leaves_the_month_holding_the_newest_id(client, db, city, partitioning):
+    seed_months(client, city)
+    # Written last, so it holds the newest id while sitting in an old month
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": "noise_level", "value": 2.0, "timestamp": (month(-4) + timedelta(days=2)).isoformat()}
+    ]).raise_for_status()
+
+    created = partitions.maintain(db)["created"]
+
+    assert partitions.partition_name(month(-4)) not in created
+    assert {partitions.partition_name(month(-5)), partitions.partition_name(month(-3))} <= set(created)
+    assert hot_rows(db, city, month(-4), month(-3)) > 0
+
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": "noise_level", "value": 3.0, "timestamp": datetime.now().isoformat()}
+    ]).raise_for_status()
+
+    assert partitions.partition_name(month(-4)) in partitions.maintain(db)["created"]
+    assert hot_rows(db, city, month(-4), month(-3)) == 0
+
+
+def test_retention_compacts_then_drops_old_months(client, db, city, partitioning, monkeypatch):
+    seed_months(client, city)
+    partitions.maintain(db)
+    # The cutoff falls just before month -2, so months -5 and -4 have ended
+    # before it and month -3 has not
+    monkeypatch.setattr(settings, "METRICS_RETENTION_DAYS", (datetime.now() - month(-2)).days + 1)
+    metrics, aggregates, latest = reads(client, db, city)
+
+    dropped = partitions.apply_retention(db)
+
+    assert partitions.partition_name(month(-5)) in dropped
+    assert partitions.partition_name(month(-4)) in dropped
+    assert partitions.partition_name(month(-3)) not in dropped
+    buckets = db.execute(select(MetricRollup.resolution, func.count()).where(
+        MetricRollup.city == city, MetricRollup.bucket_start < month(-3)
+    ).group_by(MetricRollup.resolution)).all()
+    assert [resolution for resolution, _ in buckets] == ["day"]
+
+    after_metrics, after_aggregates, _ = reads(client, db, city)
+    assert after_aggregates == aggregates
+    kept = [row for row in metrics if datetime.fromisoformat(row["timestamp"]) >= month(-3)]
+    assert after_metrics == kept
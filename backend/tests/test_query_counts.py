@@ -0,0 +1,95 @@
+"""Dashboard endpoints issue a fixed number of statements however many
+widgets or dashboards they return; an N+1 lazy load shows up as a count
+that grows with the larger fixture. Runs against Postgres too with
+TEST_DATABASE_URL set (see conftest)."""
+import pytest
+
+from app.api.pagination import encode_cursor
+from app.models.models import Dashboard, Widget
+from tests.conftest import count_statements
+
+MANY_WIDGETS = 25
+PAGE_SIZE = 5
+
+# (method, path template, expected statements)
+DASHBOARD_ENDPOINTS = {
+    "get_dashboard": ("GET", "/api/v1/dashboards/{id}", 1),
+    "get_dashboard_widgets": ("GET", "/api/v1/dashboards/{id}/widgets", 1),
+    # Dashboard, then one rollup read for the single series all widgets share;
+    # 7d is past the recent store's window, so it is read from SQL
+    "get_dashboard_snapshot": ("GET", "/api/v1/dashboards/{id}/snapshot", 2),
+    # Load, UPDATE, reload
+    "update_dashboard": ("PUT", "/api/v1/dashboards/{id}", 3),
+}
+
+# (query string, expected statements per page)
+LISTINGS = {
+    "get_dashboards": (f"limit={PAGE_SIZE}", 1),
+    "get_dashboards (include_widgets)": (f"limit={PAGE_SIZE}&include_widgets=true", 2),
+}
+
+
+def create_dashboards(db, owner, city, widget_counts):
+    dashboards = [
+        Dashboard(
+            title=f"Counted {i}",
+            owner_id=owner,
+            layout_config={},
+            widgets=[
+                Widget(
+                    widget_type="line_chart",
+                    title=f"Widget {j}",
+                    config={"city": city, "metric_type": "temperature", "range": "7d"},
+                    position={}
+                )
+                for j in range(count)
+            ]
+        )
+        for i, count in enumerate(widget_counts)
+    ]
+    db.add_all(dashboards)
+    db.commit()
+    return [dashboard.id for dashboard in dashboards]
+
+
+def call(client, method, path):
+    if method == "PUT":
+        response = client.put(path, json={"description": "counted"})
+    else:
+        response = client.get(path)
+    response.raise_for_status()
+    return response
+
+
+@pytest.mark.parametrize("name", DASHBOARD_ENDPOINTS)
+def test_dashboard_statement_count_is_fixed(client, db, owner, city, name):
+    method, template, expected = DASHBOARD_ENDPOINTS[name]
+    client.post("/api/v1/metrics/", json={"city": city, "metric_type": "temperature", "value": 1.0}).raise_for_status()
+    small, large = create_dashboards(db, owner, city, [1, MANY_WIDGETS])
+
+    counts = []
+    # Fresh dashboards, so the response cache has nothing for them yet
+    for dashboard_id in (small, large):
+        with count_statements() as statements:
+            call(client, method, template.format(id=dashboard_id))
+        counts.append(len(statements))
+
+    assert counts == [expected, expected]
+
+
+@pytest.mark.parametrize("name", LISTINGS)
+def test_dashboard_listing_statement_count_is_fixed(client, db, owner, city, name):
+    query, expected = LISTINGS[name]
+    # Page one holds a dashboard with a single widget, page two only large ones
+    ids = create_dashboards(db, owner, city, [1] + [MANY_WIDGETS] * (PAGE_SIZE * 2 - 1))
+    first_page = f"/api/v1/dashboards/?{query}&cursor={encode_cursor(ids[0] - 1)}"
+
+    counts = []
+    with count_statements() as statements:
+        response = call(client, "GET", first_page)
+    counts.append(len(statements))
+    with count_statements() as statements:
+        call(client, "GET", f"/api/v1/dashboards/?{query}&cursor={response.headers['X-Next-Cursor']}")
+    counts.append(len(statements))
+
+    assert counts == [expected, expected]
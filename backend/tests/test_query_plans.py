@@ -0,0 +1,167 @@
+"""The metrics endpoints never scan city_metrics in full.
+
+Each hot endpoint is called in-process, the SQL it sends against
+``city_metrics`` is captured and every statement is EXPLAINed. A plan
+fails if it reads the whole table or the whole of one of its indexes:
+on SQLite any ``SCAN city_metrics``, including ``USING [COVERING] INDEX``;
+on Postgres a Seq Scan, or an index scan without an Index Cond, of the
+table or one of its partitions. On Postgres ``enable_seqscan`` is switched
+off for the EXPLAIN so the planner only falls back to a sequential scan
+when no index can serve the query.
+
+Runs on the suite's SQLite database; the Postgres cases are skipped unless
+TEST_DATABASE_URL points at a Postgres scratch database (see conftest).
+"""
+import asyncio
+import json
+import re
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.base import async_engine, get_async_database_url
+from app.services.recent_store import recent_store
+from app.services.response_cache import response_cache
+
+METRICS_TABLE = "city_metrics"
+CITY, OTHER_CITY = (f"Planville {uuid.uuid4().hex[:8]}" for _ in range(2))
+
+# /cities and /types read the series catalog, not city_metrics
+ENDPOINTS = {
+    "get_metrics": ("/api/v1/metrics/", {"city": CITY, "metric_type": "temperature"}),
+    "get_metrics (city only)": ("/api/v1/metrics/", {"city": CITY}),
+    "get_metrics (no filters)": ("/api/v1/metrics/", {}),
+    "get_aggregated_metrics": ("/api/v1/metrics/aggregate", {"city": CITY, "metric_type": "temperature"}),
+    # Short windows read raw rows
+    "get_metric_series (raw)": ("/api/v1/metrics/series", {"city": CITY, "metric_type": "temperature", "range": "90m"}),
+    # /latest answers from memory; its SQL runs on warm-up and here
+    "check_latest_cache": ("/api/v1/metrics/latest/check", {"city": CITY}),
+    "check_latest_cache (all cities)": ("/api/v1/metrics/latest/check", {}),
+}
+
+# The table, its aliases (city_metrics_1) and its month tables or partitions
+_METRICS_RELATION = re.compile(rf"^{METRICS_TABLE}(?:_\d+)*$")
+_SQLITE_FULL_SCAN = re.compile(rf"\bSCAN ({METRICS_TABLE}\w*)")
+
+
+def sqlite_full_scans(details):
+    return [
+        detail for detail in details
+        if any(_METRICS_RELATION.match(name) for name in _SQLITE_FULL_SCAN.findall(detail))
+    ]
+
+
+def explain_sqlite(conn, statement, parameters):
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return sqlite_full_scans([row[3] for row in rows])
+
+
+def explain_postgresql(conn, statement, parameters):
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        # asyncpg returns json columns undecoded
+        plan = json.loads(plan)
+    full_scans = []
+
+    def walk(node):
+        if _METRICS_RELATION.match(node.get("Relation Name", "")):
+            if node["Node Type"] == "Seq Scan" or (
+                node["Node Type"] in ("Index Scan", "Index Only Scan") and "Index Cond" not in node
+            ):
+                full_scans.append(f"{node['Node Type']} {node['Relation Name']} {node.get('Index Name', '')}".strip())
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return full_scans
+
+
+EXPLAINERS = {"sqlite": explain_sqlite, "postgresql": explain_postgresql}
+
+
+async def explain_all(explain, statements):
+    """EXPLAIN statements on the endpoints' own async driver, so captured
+    SQL and parameters are replayed exactly as they were sent"""
+    explain_engine = create_async_engine(get_async_database_url(), poolclass=NullPool)
+    try:
+        async with explain_engine.connect() as conn:
+            return [
+                await conn.run_sync(explain, statement, parameters)
+                for statement, parameters in statements
+            ]
+    finally:
+        await explain_engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def seeded(client):
+    now = datetime.now()
+    client.post("/api/v1/metrics/bulk", json=[
+        {
+            "city": city,
+            "metric_type": metric_type,
+            "value": float(i),
+            "unit": "unit",
+            "timestamp": (now - timedelta(minutes=17 * i)).isoformat()
+        }
+        for city in (CITY, OTHER_CITY)
+        for metric_type in ("temperature", "air_quality")
+        for i in range(50)
+    ]).raise_for_status()
+
+
+@pytest.fixture
+def sql_only(monkeypatch):
+    """Send every read to the database: no cached responses, and the recent
+    store answers nothing, as with RECENT_STORE_ENABLED off"""
+    monkeypatch.setattr(response_cache, "backend", None)
+    monkeypatch.setattr(recent_store, "warmed", False)
+
+
+def capture(client, path, params):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and METRICS_TABLE in statement:
+            statements.append((statement, parameters))
+
+    target = async_engine.sync_engine
+    event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        client.get(path, params=params).raise_for_status()
+    finally:
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+@pytest.mark.parametrize("dialect", EXPLAINERS)
+@pytest.mark.parametrize("name", ENDPOINTS)
+def test_endpoint_does_not_scan_metrics(client, seeded, sql_only, dialect, name):
+    if async_engine.dialect.name != dialect:
+        pytest.skip(f"needs TEST_DATABASE_URL pointing at a {dialect} scratch database")
+    path, params = ENDPOINTS[name]
+
+    statements = capture(client, path, params)
+    full_scans = asyncio.run(explain_all(EXPLAINERS[dialect], statements))
+
+    assert statements
+    assert full_scans == [[] for _ in statements]
+
+
+@pytest.mark.parametrize("detail, full_scan", [
+    ("SCAN city_metrics", True),
+    ("SCAN city_metrics USING COVERING INDEX ix_city_metrics_city_type_ts", True),
+    ("SCAN city_metrics USING INDEX ix_city_metrics_timestamp", True),
+    ("SCAN city_metrics_2026_09", True),
+    ("SEARCH city_metrics USING INDEX ix_city_metrics_city_type_ts (city_id=?)", False),
+    ("SEARCH city_metrics_1 USING COVERING INDEX ix_city_metrics_city_type_ts (city_id=? AND metric_type_id=?)", False),
+    ("SCAN metric_types", False),
+    ("SCAN city_metrics_all", False),
+])
+def test_sqlite_full_scan_detection(detail, full_scan):
+    assert bool(sqlite_full_scans([detail])) is full_scan
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.services.recent_store import RecentStore, recent_store
+
+
+def reading(city, i, timestamp):
+    return {"id": 10_000_000 + i, "city": city, "metric_type": "noise_level", "value": float(i),
+            "unit": "dB", "timestamp": timestamp}
+
+
+def ingest(client, city, count, spacing):
+    """``count`` readings ``spacing`` apart ending now, in bulk; offset half a
+    second from whole seconds so window bounds never land on one"""
+    now = datetime.now().replace(microsecond=500_000)
+    client.post("/api/v1/metrics/bulk", json=[
+        {
+            "city": city,
+            "metric_type": "noise_level",
+            "value": float((i * 37) % 101),
+            "unit": "dB",
+            "timestamp": (now - spacing * i).isoformat()
+        }
+        for i in range(count)
+    ]).raise_for_status()
+
+
+def series(client, city, time_range, points, method):
+    response = client.get("/api/v1/metrics/series", params={
+        "city": city, "metric_type": "noise_level", "range": time_range, "points": points, "method": method
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+def assert_same_series(from_memory, from_sql):
+    assert {key: value for key, value in from_memory.items() if key != "points"} == \
+        {key: value for key, value in from_sql.items() if key != "points"}
+    assert [point["timestamp"] for point in from_memory["points"]] == \
+        [point["timestamp"] for point in from_sql["points"]]
+    # Bucket means are summed in a different order than SQL sums them
+    assert [point["value"] for point in from_memory["points"]] == \
+        pytest.approx([point["value"] for point in from_sql["points"]])
+
+
+@pytest.fixture
+def store(db, monkeypatch):
+    monkeypatch.setattr(settings, "RECENT_STORE_CAPACITY", 100)
+    store = RecentStore()
+    store.warm(db)
+    return store
+
+
+def test_buffer_keeps_the_newest_readings_at_capacity(store, city):
+    start = datetime.now() - timedelta(hours=1)
+    timestamps = [start + timedelta(seconds=i) for i in range(250)]
+    store.add([reading(city, i, timestamp) for i, timestamp in enumerate(timestamps)])
+
+    held, values, units = store.readings(city, "noise_level", start)
+
+    assert held == timestamps[150:]
+    assert values.tolist() == [float(i) for i in range(150, 250)]
+    assert units == ["dB"] * 100
+
+
+def test_covers_starts_after_the_last_overwritten_reading(store, city):
+    start = datetime.now() - timedelta(hours=1)
+    timestamps = [start + timedelta(seconds=i) for i in range(101)]
+    store.add([reading(city, i, timestamp) for i, timestamp in enumerate(timestamps)])
+
+    assert not store.covers(city, "noise_level", timestamps[0])
+    assert store.covers(city, "noise_level", timestamps[0] + timedelta(microseconds=1))
+    assert store.covers(city, "noise_level", timestamps[1])
+
+
+def test_covers_the_warmed_window_only(store, city):
+    edge = datetime.now() - timedelta(hours=settings.RECENT_STORE_HOURS)
+
+    # A series first seen after warming has every reading since the warm
+    assert store.covers(city, "noise_level", edge + timedelta(minutes=1))
+    assert not store.covers(city, "noise_level", edge - timedelta(minutes=1))
+
+
+@pytest.mark.parametrize("time_range, points, source", [
+    ("1h", 100, "raw"),
+    ("24h", 300, "minute"),
+    ("24h", 20, "hour"),
+])
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_series_from_memory_matches_sql(client, city, monkeypatch, time_range, points, source, method):
+    ingest(client, city, 4000, timedelta(seconds=21))
+    assert recent_store.covers(city, "noise_level", datetime.now() - timedelta(hours=24))
+
+    from_memory = series(client, city, time_range, points, method)
+    monkeypatch.setattr(recent_store, "warmed", False)
+    from_sql = series(client, city, time_range, points, method)
+
+    assert from_memory["source"] == source
+    assert from_memory["total_points"] > points
+    assert_same_series(from_memory, from_sql)
+
+
+def test_window_past_capacity_falls_back_to_sql(client, city, monkeypatch):
+    monkeypatch.setattr(settings, "RECENT_STORE_CAPACITY", 500)
+    ingest(client, city, 1000, timedelta(seconds=3))
+    assert not recent_store.covers(city, "noise_level", datetime.now() - timedelta(hours=1))
+    assert recent_store.covers(city, "noise_level", datetime.now() - timedelta(minutes=20))
+
+    overflowing = series(client, city, "1h", 300, "lttb")
+    monkeypatch.setattr(recent_store, "warmed", False)
+    from_sql = series(client, city, "1h", 300, "lttb")
+
+    assert overflowing["total_points"] == 1000
+    assert_same_series(overflowing, from_sql)
@@ -0,0 +1,117 @@
+"""The response cache on its Redis backend, served by the in-process FakeRedis"""
+import asyncio
+
+import pytest
+
+from app.core import fake_redis
+from app.core.config import settings
+from app.core.fake_redis import FakeRedis
+from app.models.models import Dashboard
+from app.services.response_cache import PREFIX, RedisBackend, response_cache
+
+CACHE_STATUS = "X-Cache"
+
+
+class Clock:
+    """Stands in for the ``time`` module FakeRedis expires keys by"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fake_redis, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def redis(monkeypatch, clock):
+    server = FakeRedis()
+    monkeypatch.setattr(response_cache, "backend", RedisBackend(server))
+    return server
+
+
+def cache_status(client, path, **params):
+    response = client.get(path, params=params)
+    response.raise_for_status()
+    return response.headers[CACHE_STATUS]
+
+
+def aggregate(client, city, metric_type="temperature"):
+    return cache_status(client, "/api/v1/metrics/aggregate", city=city, metric_type=metric_type)
+
+
+def ingest(client, city, metric_type="temperature"):
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": metric_type, "value": 4.0}
+    ]).raise_for_status()
+
+
+def test_second_read_is_a_hit_under_the_cache_namespace(client, redis, city):
+    ingest(client, city)
+
+    assert aggregate(client, city) == "MISS"
+    assert aggregate(client, city) == "HIT"
+    keys = [key.decode() for key in redis._data]
+    assert any(key.startswith(f"{PREFIX}:aggregate:") for key in keys)
+    assert all(key.startswith(f"{PREFIX}:") for key in keys)
+
+
+def test_entries_expire_after_the_ttl(client, redis, clock, city):
+    ingest(client, city)
+    aggregate(client, city)
+
+    clock.now += settings.RESPONSE_CACHE_TTL - 1
+    assert aggregate(client, city) == "HIT"
+    clock.now += 1
+    assert aggregate(client, city) == "MISS"
+
+
+def test_tag_versions_do_not_expire(client, redis, clock, city):
+    ingest(client, city)
+    ingest(client, city)
+
+    clock.now += settings.RESPONSE_CACHE_TTL * 10
+    version = asyncio.run(redis.get(f"{PREFIX}:tag:series:{city}:temperature"))
+    assert int(version) >= 2
+
+
+def test_ingest_invalidates_only_the_series_written(client, redis, city, monkeypatch):
+    # /latest only goes through the response cache without the last-value cache
+    monkeypatch.setattr(settings, "LATEST_CACHE_ENABLED", False)
+    ingest(client, city, "temperature")
+    ingest(client, city, "humidity")
+    aggregate(client, city, "temperature")
+    aggregate(client, city, "humidity")
+    cache_status(client, "/api/v1/metrics/latest", city=city)
+
+    ingest(client, city, "temperature")
+
+    assert aggregate(client, city, "temperature") == "MISS"
+    assert aggregate(client, city, "humidity") == "HIT"
+    assert cache_status(client, "/api/v1/metrics/latest", city=city) == "MISS"
+
+
+def test_dashboard_put_and_delete_invalidate_it(client, db, owner, redis):
+    dashboard = Dashboard(title="Cached", description="before", owner_id=owner, layout_config={})
+    db.add(dashboard)
+    db.commit()
+    path = f"/api/v1/dashboards/{dashboard.id}"
+    assert cache_status(client, path) == "MISS"
+    assert cache_status(client, path) == "HIT"
+
+    client.put(path, json={"description": "after"}).raise_for_status()
+
+    response = client.get(path)
+    assert response.headers[CACHE_STATUS] == "MISS"
+    assert response.json()["description"] == "after"
+    assert cache_status(client, path) == "HIT"
+
+    client.delete(path).raise_for_status()
+
+    assert client.get(path).status_code == 404
@@ -0,0 +1,83 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.models import MetricRollup
+from app.services import rollups
+
+
+@pytest.fixture
+def readings(client, city):
+    """Four days of irregularly spaced readings in two units, ingested in bulk"""
+    now = datetime.now().replace(microsecond=0)
+    records = []
+    timestamp = now - timedelta(days=4)
+    i = 0
+    while timestamp < now:
+        records.append({
+            "city": city,
+            "metric_type": "noise_level",
+            "value": round((i * 37 % 101) / 3, 3),
+            "unit": "dB" if i % 5 else "dBA",
+            "timestamp": timestamp.isoformat()
+        })
+        timestamp += timedelta(minutes=7, seconds=13)
+        i += 1
+    client.post("/api/v1/metrics/bulk", json=records).raise_for_status()
+    return records
+
+
+def raw_daily(records, start):
+    """What aggregate_daily should return, computed straight from the readings"""
+    stats = defaultdict(list)
+    for record in records:
+        timestamp = datetime.fromisoformat(record["timestamp"])
+        if timestamp >= start:
+            stats[(timestamp.date().isoformat(), record["unit"])].append(record["value"])
+    return [
+        {"date": date, "unit": unit, "count": len(values), "sum": sum(values), "min": min(values), "max": max(values)}
+        for (date, unit), values in sorted(stats.items())
+    ]
+
+
+@pytest.mark.parametrize("offset", [
+    timedelta(days=3),
+    timedelta(days=2, hours=5, minutes=17, seconds=23),  # raw head, minute and hour buckets
+    timedelta(minutes=50, seconds=40),
+])
+def test_rollup_aggregates_match_raw_rows(db, city, readings, offset):
+    start = datetime.now().replace(microsecond=0) - offset
+    results = rollups.aggregate_daily(db, city, "noise_level", start)
+    expected = raw_daily(readings, start)
+
+    assert [(result["date"], result["unit"], result["count"]) for result in results] == [
+        (result["date"], result["unit"], result["count"]) for result in expected
+    ]
+    for result, raw in zip(results, expected):
+        assert result["sum"] == pytest.approx(raw["sum"])
+        assert (result["min"], result["max"]) == (raw["min"], raw["max"])
+
+
+def test_incremental_rollups_match_a_rebuild(db, city, readings):
+    def buckets():
+        return db.execute(
+            select(
+                MetricRollup.resolution,
+                MetricRollup.bucket_start,
+                MetricRollup.unit,
+                MetricRollup.value_count,
+                MetricRollup.value_min,
+                MetricRollup.value_max
+            ).where(MetricRollup.city == city).order_by(
+                MetricRollup.resolution, MetricRollup.bucket_start, MetricRollup.unit
+            )
+        ).all()
+
+    incremental = buckets()
+    rollups.rebuild(db)
+    db.expire_all()
+
+    assert incremental
+    assert buckets() == incremental
@@ -0,0 +1,217 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.models.models import MetricRollup, ScheduledJob
+from app.schemas.metrics import MetricCreate
+from app.services import rollups, scheduler
+from app.services.ingest import insert_batch
+from tests.conftest import insert_outside_ingestion
+
+
+@pytest.fixture
+def workers():
+    """Two schedulers sharing the test database, as two worker processes would"""
+    first, second = scheduler.Scheduler(), scheduler.Scheduler()
+    first.owner, second.owner = "worker-1", "worker-2"
+    return first, second
+
+
+def make_job(name, leader_only=True, run=None):
+    calls = []
+
+    def record(db):
+        calls.append(db)
+        if run is not None:
+            run(db)
+
+    job = scheduler.Job(name, 60, record, leader_only=leader_only)
+    job.calls = calls
+    return job
+
+
+def job_name():
+    return f"test_job_{uuid.uuid4().hex[:8]}"
+
+
+def expire_lease(db, name):
+    db.execute(update(ScheduledJob).where(ScheduledJob.name == name).values(
+        lease_expires_at=datetime.now() - timedelta(seconds=1)
+    ))
+    db.commit()
+
+
+def rollup_buckets(db, city):
+    db.expire_all()
+    return db.execute(
+        select(
+            MetricRollup.resolution,
+            MetricRollup.bucket_start,
+            MetricRollup.unit,
+            MetricRollup.value_count,
+            MetricRollup.value_min,
+            MetricRollup.value_max
+        ).where(MetricRollup.city == city).order_by(
+            MetricRollup.resolution, MetricRollup.bucket_start, MetricRollup.unit
+        )
+    ).all()
+
+
+def test_rollup_refresh_alongside_ingestion(db, city, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_ROLLUP_REFRESH_DAYS", 1)
+    now = datetime.now().replace(microsecond=0)
+    # A reading outside the ingestion service, so refreshes have days to rebuild
+    insert_outside_ingestion([{"city": city, "metric_type": "humidity", "value": -1.0, "timestamp": now}])
+
+    errors = []
+
+    def ingest():
+        try:
+            with SessionLocal() as session:
+                for batch in range(30):
+                    insert_batch(session, [
+                        MetricCreate(
+                            city=city,
+                            metric_type="humidity",
+                            value=float(batch * 20 + i),
+                            timestamp=now - timedelta(minutes=(batch * 20 + i) * 3)
+                        )
+                        for i in range(20)
+                    ])
+        except Exception as exc:
+            errors.append(exc)
+
+    writer = threading.Thread(target=ingest)
+    writer.start()
+    while writer.is_alive():
+        scheduler.refresh_rollups(db)
+    writer.join()
+    scheduler.refresh_rollups(db)
+
+    assert errors == []
+    refreshed = rollup_buckets(db, city)
+    rollups.rebuild(db)
+    assert refreshed == rollup_buckets(db, city)
+    assert sum(count for resolution, _, _, count, _, _ in refreshed if resolution == "day") == 601
+
+
+def test_refresh_only_rebuilds_days_missing_readings(db, city):
+    today = rollups.truncate(datetime.now(), "day")
+    yesterday = today - timedelta(days=1)
+    end = today + timedelta(days=1)
+    rollups.refresh_range(db, yesterday, end)
+
+    insert_batch(db, [MetricCreate(city=city, metric_type="humidity", value=1.0, timestamp=yesterday + timedelta(hours=3))])
+    assert rollups.refresh_range(db, yesterday, end) == []
+
+    insert_outside_ingestion([
+        {"city": city, "metric_type": "humidity", "value": 5.0, "timestamp": yesterday + timedelta(hours=4)}
+    ])
+
+    assert rollups.refresh_range(db, yesterday, end) == [yesterday]
+    day_buckets = [bucket for bucket in rollup_buckets(db, city) if bucket.resolution == "day"]
+    assert [(bucket.bucket_start, bucket.value_count, bucket.value_max) for bucket in day_buckets] == [
+        (yesterday, 2, 5.0)
+    ]
+
+
+def test_only_one_worker_runs_a_leader_only_job(workers):
+    name = job_name()
+    jobs = [make_job(name), make_job(name)]
+
+    for _ in range(3):
+        for worker, job in zip(workers, jobs):
+            worker.run_job(job)
+
+    assert [len(job.calls) for job in jobs] == [3, 0]
+    assert [job.skipped for job in jobs] == [0, 3]
+
+
+def test_racing_workers_run_a_leader_only_job_once(workers):
+    name = job_name()
+    jobs = [make_job(name), make_job(name)]
+    start = threading.Barrier(2)
+    ran = []
+
+    def run(worker, job):
+        start.wait()
+        ran.append(worker.run_job(job))
+
+    threads = [threading.Thread(target=run, args=pair) for pair in zip(workers, jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(ran) == [False, True]
+    assert sum(len(job.calls) for job in jobs) == 1
+
+
+def test_expired_lease_passes_to_another_worker(db, workers):
+    name = job_name()
+    first_job, second_job = make_job(name), make_job(name)
+    first, second = workers
+    assert first.run_job(first_job)
+    assert not second.run_job(second_job)
+
+    expire_lease(db, name)
+
+    assert second.run_job(second_job)
+    assert not first.run_job(first_job)
+    row = db.get(ScheduledJob, name)
+    assert (row.owner, row.runs) == ("worker-2", 2)
+
+
+def test_released_lease_is_taken_at_once(workers):
+    name = job_name()
+    first_job, second_job = make_job(name), make_job(name)
+    first, second = workers
+    first.jobs = {name: first_job}
+    first.run_job(first_job)
+
+    first._release_leases()
+
+    assert second.run_job(second_job)
+
+
+def test_every_worker_job_runs_on_each_worker(workers):
+    name = job_name()
+    jobs = [make_job(name, leader_only=False), make_job(name, leader_only=False)]
+
+    for worker, job in zip(workers, jobs):
+        assert worker.run_job(job)
+
+    assert [len(job.calls) for job in jobs] == [1, 1]
+
+
+def test_admin_jobs_reports_the_shared_lease(client, workers, monkeypatch):
+    name, local_name = job_name(), job_name()
+
+    def fail(db):
+        raise RuntimeError("boom")
+
+    first, second = workers
+    leader_job, follower_job = make_job(name, run=fail), make_job(name)
+    local_job = make_job(local_name, leader_only=False)
+    first.run_job(leader_job)
+    second.run_job(follower_job)
+    second.run_job(local_job)
+    monkeypatch.setattr(scheduler.scheduler, "owner", second.owner)
+    monkeypatch.setattr(scheduler.scheduler, "jobs", {name: follower_job, local_name: local_job})
+
+    response = client.get("/api/v1/admin/jobs")
+    response.raise_for_status()
+    status = {job["name"]: job for job in response.json()}
+
+    assert status[name]["leader"] == "worker-1"
+    assert not status[name]["is_leader"]
+    assert (status[name]["runs"], status[name]["failures"], status[name]["skipped"]) == (1, 1, 1)
+    assert status[name]["last_status"] == "error"
+    assert "boom" in status[name]["last_error"]
+    assert status[local_name]["leader"] is None
+    assert (status[local_name]["runs"], status[local_name]["last_status"]) == (1, "ok")
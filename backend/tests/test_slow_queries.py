@@ -0,0 +1,24 @@
+import pytest
+
+
+def test_report_ranks_fingerprints_and_honours_limit(client, city):
+    client.delete("/api/v1/admin/slow-queries").raise_for_status()
+    for _ in range(3):
+        client.get("/api/v1/metrics/", params={"city": city}).raise_for_status()
+    client.get("/api/v1/metrics/aggregate", params={"city": city, "metric_type": "humidity"}).raise_for_status()
+
+    response = client.get("/api/v1/admin/slow-queries", params={"sort": "calls", "limit": 2})
+    response.raise_for_status()
+    report = response.json()
+
+    assert len(report) == 2
+    assert report[0]["calls"] >= report[1]["calls"]
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_limit_must_be_positive(client, limit):
+    assert client.get("/api/v1/admin/slow-queries", params={"limit": limit}).status_code == 422
+
+
+def test_unknown_sort_is_rejected(client):
+    assert client.get("/api/v1/admin/slow-queries", params={"sort": "rows"}).status_code == 400
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from app.models.models import Dashboard, Widget
+from tests.conftest import count_statements
+
+
+def widget(config=None, data_source=None):
+    return Widget(widget_type="line_chart", title="Widget", config=config or {}, position={}, data_source=data_source)
+
+
+def test_widgets_sharing_a_series_load_it_once(client, db, owner, city):
+    now = datetime.now().replace(microsecond=0)
+    client.post("/api/v1/metrics/bulk", json=[
+        {"city": city, "metric_type": metric_type, "value": float(i), "unit": "u",
+         "timestamp": (now - timedelta(hours=i)).isoformat()}
+        for metric_type in ("temperature", "humidity")
+        for i in range(100)
+    ]).raise_for_status()
+    temperature = {"city": city, "metric_type": "temperature", "range": "7d"}
+    # Four spellings of one series, a second series, and a widget with none
+    dashboard = Dashboard(title="Snapshot", owner_id=owner, layout_config={}, widgets=[
+        widget(temperature),
+        widget(temperature),
+        widget({"city": city, "metric_type": "temperature", "time_range": "7d", "points": 300}),
+        widget({"range": "7d"}, data_source=f"/api/v1/metrics/series?city={city}&metric_type=temperature"),
+        widget({**temperature, "metric_type": "humidity"}),
+        widget({"title": "Notes"}),
+    ])
+    db.add(dashboard)
+    db.commit()
+
+    with count_statements() as statements:
+        response = client.get(f"/api/v1/dashboards/{dashboard.id}/snapshot")
+    response.raise_for_status()
+    body = response.json()
+
+    # The dashboard, then one minute-rollup read for both series
+    assert len(statements) == 2
+    keys = [entry["series_key"] for entry in body["widgets"]]
+    assert len(set(keys[:4])) == 1
+    assert keys[4] != keys[0]
+    assert keys[5] is None
+    assert body["widgets"][5]["error"] == "Widget has no city and metric_type"
+    assert sorted(body["series"]) == sorted({keys[0], keys[4]})
+
+    for key, metric_type in ((keys[0], "temperature"), (keys[4], "humidity")):
+        expected = client.get("/api/v1/metrics/series", params={
+            "city": city, "metric_type": metric_type, "range": "7d"
+        }).json()
+        assert body["series"][key] == expected
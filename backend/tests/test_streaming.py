@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+
+NEXT_CURSOR = "X-Next-Cursor"
+
+
+@pytest.fixture
+def readings(client, city, monkeypatch):
+    """Eleven readings, pairs sharing a timestamp; small chunks so the
+    streams span several fetches"""
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 4)
+    now = datetime.now().replace(microsecond=0)
+    client.post("/api/v1/metrics/bulk", json=[
+        {
+            "city": city,
+            "metric_type": "humidity",
+            "value": i + 0.5,
+            "unit": "%" if i % 3 else None,
+            "timestamp": (now - timedelta(minutes=i // 2)).isoformat(),
+            "meta_data": {"sensor": i} if i % 2 else None
+        }
+        for i in range(11)
+    ]).raise_for_status()
+    return client.get("/api/v1/metrics/", params={"city": city}).json()
+
+
+def stream(client, format, **params):
+    response = client.get("/api/v1/metrics/", params={**params, "format": format})
+    response.raise_for_status()
+    assert NEXT_CURSOR not in response.headers
+    return response
+
+
+def from_ndjson(response):
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def as_csv_cells(rows):
+    """JSON listing rows as the CSV export writes them"""
+    return [
+        {
+            key: "" if value is None else json.dumps(value) if key == "meta_data" else str(value)
+            for key, value in row.items()
+        }
+        for row in rows
+    ]
+
+
+def from_csv(response):
+    assert response.headers["content-type"].startswith("text/csv")
+    return list(csv.DictReader(io.StringIO(response.text)))
+
+
+def test_ndjson_rows_match_the_json_listing(client, city, readings):
+    assert len(readings) == 11
+    assert from_ndjson(stream(client, "ndjson", city=city)) == readings
+
+
+def test_csv_rows_match_the_json_listing(client, city, readings):
+    response = stream(client, "csv", city=city)
+
+    assert response.headers["content-disposition"] == 'attachment; filename="metrics.csv"'
+    assert response.text.splitlines()[0].split(",") == list(readings[0])
+    assert from_csv(response) == as_csv_cells(readings)
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_stream_resumes_from_a_listing_cursor(client, city, readings, format):
+    first_page = client.get("/api/v1/metrics/", params={"city": city, "limit": 3})
+    cursor = first_page.headers[NEXT_CURSOR]
+
+    response = stream(client, format, city=city, cursor=cursor)
+    limited = stream(client, format, city=city, cursor=cursor, limit=5)
+
+    if format == "ndjson":
+        assert from_ndjson(response) == readings[3:]
+        assert from_ndjson(limited) == readings[3:8]
+    else:
+        assert from_csv(response) == as_csv_cells(readings[3:])
+        assert from_csv(limited) == as_csv_cells(readings[3:8])
+
+
+def test_unknown_format_is_rejected(client, city):
+    assert client.get("/api/v1/metrics/", params={"city": city, "format": "xml"}).status_code == 400
@@ -22,45 +22,35 @@ import { metricsService } from '../../services/metrics';
 import MetricsChart from '../Charts/MetricsChart';
 import MetricCard from '../Metrics/MetricCard';
 
-const WidgetWithTimeRange = ({ widget, onDelete, onEdit }) => {
+const toChartPoints = (series) =>
+  series.points.map(point => ({
+    ...point,
+    unit: series.unit,
+    timestamp: new Date(point.timestamp).toLocaleDateString(),
+    value: parseFloat(point.value),
+  }));
+
+// initialSeries is this widget's series from the dashboard snapshot, used
+// until the time range changes
+const WidgetWithTimeRange = ({ widget, initialSeries, onDelete, onEdit }) => {
   const [anchorEl, setAnchorEl] = React.useState(null);
-  const [timeRange, setTimeRange] = useState('24h');
+  const initialRange = widget.config?.range || '24h';
+  const [timeRange, setTimeRange] = useState(initialRange);
 
   const { data: metrics = [], isLoading, error } = useQuery({
     queryKey: ['widget-metrics', widget.id, widget.config, timeRange],
     queryFn: async () => {
-      const allMetrics = await metricsService.getAll();
-
-      // Filter by metric type and city
-      let filteredMetrics = allMetrics.filter(m =>
-        m.metric_type === widget.config?.metric_type &&
-        m.city === widget.config?.city
-      );
-
-      // Filter by time range
-      const now = new Date();
-      const timeRanges = {
-        '1h': 60 * 60 * 1000,
-        '24h': 24 * 60 * 60 * 1000,
-        '7d': 7 * 24 * 60 * 60 * 1000,
-        '30d': 30 * 24 * 60 * 60 * 1000,
-      };
-
-      if (timeRanges[timeRange]) {
-        const cutoffTime = now.getTime() - timeRanges[timeRange];
-        filteredMetrics = filteredMetrics.filter(m =>
-          new Date(m.timestamp).getTime() > cutoffTime
-        );
-      }
-
-      return filteredMetrics
-        .map(m => ({
-          ...m,
-          timestamp: new Date(m.timestamp).toLocaleDateString(),
-          value: parseFloat(m.value),
-        }))
-        .sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
+      // The backend filters by city/type/range and downsamples, so the
+      // payload stays at a few hundred points however much history exists
+      const series = await metricsService.getSeries({
+        city: widget.config?.city,
+        metricType: widget.config?.metric_type,
+        range: timeRange,
+      });
+
+      return toChartPoints(series);
     },
+    initialData: initialSeries && timeRange === initialRange ? toChartPoints(initialSeries) : undefined,
     enabled: !!widget.config?.metric_type && !!widget.config?.city,
   });
 
@@ -28,12 +28,16 @@ function DashboardDetail() {
   const queryClient = useQueryClient();
   const [dialogOpen, setDialogOpen] = useState(false);
 
-  // Fetch dashboard details
-  const { data: dashboard, isLoading, error } = useQuery({
+  // Fetch the dashboard together with the data for all of its widgets
+  const { data: snapshot, isLoading, error } = useQuery({
     queryKey: ['dashboard', id],
-    queryFn: () => dashboardsService.getById(id),
+    queryFn: () => dashboardsService.getSnapshot(id),
     enabled: !!id,
   });
+  const dashboard = snapshot?.dashboard;
+  const seriesKeys = Object.fromEntries(
+    (snapshot?.widgets || []).map(({ widget_id, series_key }) => [widget_id, series_key])
+  );
 
   // Mutation for creating a widget
   const createWidgetMutation = useMutation({
@@ -155,6 +159,7 @@ function DashboardDetail() {
               <Grid item xs={12} md={6} lg={4} key={widget.id}>
                 <WidgetWithTimeRange
                   widget={widget}
+                  initialSeries={snapshot.series[seriesKeys[widget.id]]}
                   onDelete={handleDeleteWidget}
                   onEdit={handleEditWidget}
                 />
@@ -12,6 +12,12 @@ export const dashboardsService = {
     const response = await axios.get(`${API_URL}/dashboards/${id}`);
     return response.data;
   },
+  // Layout plus data for every widget: { dashboard, widgets: [{ widget_id,
+  // series_key, error }], series: { [series_key]: series } }
+  getSnapshot: async (id) => {
+    const response = await axios.get(`${API_URL}/dashboards/${id}/snapshot`);
+    return response.data;
+  },
   create: async (payload) => {
     const response = await axios.post(`${API_URL}/dashboards`, payload);
     return response.data;
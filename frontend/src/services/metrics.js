@@ -7,6 +7,21 @@ export const metricsService = {
     const response = await axios.get(`${API_URL}/metrics`);
     return response.data;
   },
+  // Downsampled series for charts: { points: [{ timestamp, value }], ... }
+  getSeries: async ({ city, metricType, range, points = 300, method = 'lttb' }) => {
+    const response = await axios.get(`${API_URL}/metrics/series`, {
+      params: { city, metric_type: metricType, range, points, method },
+    });
+    return response.data;
+  },
+  // Live readings pushed over SSE for topics like 'Seattle:temperature';
+  // returns a function that closes the stream
+  subscribe: (topics, onReading) => {
+    const params = new URLSearchParams(topics.map(topic => ['topic', topic]));
+    const source = new EventSource(`${API_URL}/live/sse?${params}`);
+    source.addEventListener('metric', event => onReading(JSON.parse(event.data)));
+    return () => source.close();
+  },
   getById: async (id) => {
     const response = await axios.get(`${API_URL}/metrics/${id}`);
     return response.data;